@@ -5,14 +5,32 @@ so that `init_db.py` can import `DB_ENABLED`, `init_db` and `app`.
 """
 
 import os
+import sys
 import json
+import hmac
+import hashlib
+import secrets
+from collections import OrderedDict
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from passlib.context import CryptContext
 import time
+import threading
+import uuid
 import jwt
 
-pwd_ctx = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+import hashing
+import keys
+import logconfig
+import ratelimit
+
+# structured, sampled and redacted events (see logconfig.py)
+log = logconfig.from_env()
+# CPU-bound hashing runs in a worker pool (see hashing.py)
+hasher = hashing.from_env()
+# login attempts per email and per client address (see ratelimit.py)
+login_limiter = ratelimit.from_env()
+LOGIN_RATE_TRUST_PROXY = os.environ.get("LOGIN_RATE_TRUST_PROXY", "").lower() in ("1", "true")
 PORT = int(os.environ.get("PORT", "9001"))
 USERS_JSON = os.environ.get(
     "USERS_JSON",
@@ -23,21 +41,52 @@ USERS_JSON = os.environ.get(
 DATABASE_URL = os.environ.get("DATABASE_URL")
 DB_ENABLED = bool(DATABASE_URL)
 
-# token expiry (minutes)
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# token expiry (minutes); access tokens are short-lived and renewed with a refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+REFRESH_CACHE_SIZE = int(os.environ.get("REFRESH_CACHE_SIZE", "10000"))
+# /auth/users/bulk: records per request, and rows per multi-row INSERT (keeps SQLite under its variable limit)
+BULK_USERS_MAX = int(os.environ.get("BULK_USERS_MAX", "5000"))
+# /auth/revocations hands out a cursor this far in the past, so rows whose revoked_at was
+# stamped before a slow commit (or on a replica with a lagging clock) are not skipped
+REVOCATION_SYNC_MARGIN = float(os.environ.get("REVOCATION_SYNC_MARGIN", "60"))
+BULK_INSERT_CHUNK = 150
 JWT_SECRET = os.environ.get("JWT_SECRET", "supersecret")
+# HS256 signs with JWT_SECRET; RS256/EdDSA sign with the keys in JWT_KEYS_DIR (see keys.py)
+JWT_ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
+keyring = keys.from_env(JWT_ALGORITHM) if JWT_ALGORITHM != "HS256" else None
+# after switching to RS256/EdDSA, HS256 tokens issued before the switch keep verifying until they
+# expire: by default for one access-token lifetime after startup, or until JWT_HS256_ACCEPT_UNTIL
+# (unix seconds, 0 = never). Needs JWT_SECRET set explicitly, never the built-in default.
+HS256_ACCEPT_UNTIL = (
+    float(os.environ.get("JWT_HS256_ACCEPT_UNTIL") or time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    if keyring is not None and "JWT_SECRET" in os.environ else 0.0
+)
 
 USERS = None
 db = None
+# revoked tokens (jti -> {'exp', 'revoked_at'}) when running without a database
+REVOKED = {}
+_revoked_lock = threading.Lock()
+_revocations_purged_at = 0.0
+# refresh tokens by SHA-256 when running without a database; in DB mode a bounded
+# cache of tokens issued by this process spares the lookup on refresh
+REFRESH_TOKENS = {}
+_refresh_cache = OrderedDict()
+_refresh_lock = threading.Lock()
+_refresh_purged_at = 0.0
 
 if not DB_ENABLED:
-    data = json.loads(USERS_JSON)
-    USERS = {u["email"]: {"pwd_hash": pwd_ctx.hash(u["password"]), "role": u["role"]} for u in data}
-    
     def load_users():
-        """Return in-memory USERS dict (helpers for tests)."""
+        """Return the in-memory USERS dict.
+
+        Seed users are not hashed here; each keeps its configured password
+        (already present in USERS_JSON) until the first successful login
+        replaces it with a hash, so startup pays for no hashing at all."""
         data = json.loads(USERS_JSON)
-        return {u["email"]: {"pwd_hash": pwd_ctx.hash(u["password"]), "role": u["role"]} for u in data}
+        return {u["email"]: {"pwd_hash": None, "seed_password": u["password"], "role": u["role"]} for u in data}
+
+    USERS = load_users()
 
 else:
     # SQLAlchemy is only imported/used when DB is enabled
@@ -66,6 +115,26 @@ else:
         user_id = db.Column(db.Integer, nullable=False, index=True)
         role = db.Column(db.String(100), nullable=False)
 
+    class RevokedToken(db.Model):
+        # read by other services through GET /auth/revocations
+        __tablename__ = 'revoked_tokens'
+        jti = db.Column(db.String(64), primary_key=True)
+        exp = db.Column(db.Integer, nullable=False, index=True)
+        revoked_at = db.Column(db.Float, nullable=False, index=True)
+
+    class RefreshToken(db.Model):
+        # only the SHA-256 of the token is stored; family links every rotation of one login
+        __tablename__ = 'refresh_tokens'
+        token_hash = db.Column(db.String(64), primary_key=True)
+        family = db.Column(db.String(32), nullable=False, index=True)
+        sub = db.Column(db.String(255), nullable=False)
+        expires_at = db.Column(db.Integer, nullable=False, index=True)
+        rotated_at = db.Column(db.Float, nullable=True)
+        revoked = db.Column(db.Boolean, nullable=False, default=False)
+        # access token issued with this refresh token, revoked along with the family
+        access_jti = db.Column(db.String(64), nullable=True)
+        access_exp = db.Column(db.Integer, nullable=True)
+
     globals()["User"] = User
 
     def init_db(app):
@@ -109,7 +178,7 @@ else:
                     if "email" in cols:
                         insert_data["email"] = u["email"]
                     if "pwd_hash" in cols:
-                        insert_data["pwd_hash"] = pwd_ctx.hash(u["password"])
+                        insert_data["pwd_hash"] = hasher.hash(u["password"])
                     elif "password" in cols:
                         # roles-api uses plaintext password column; seed plaintext there
                         insert_data["password"] = u["password"]
@@ -208,83 +277,78 @@ else:
                 except Exception:
                     pass
 
-    def get_user_from_db(email: str):
-        # Use a resilient raw-SQL approach: detect which columns exist and select only them.
-        try:
-            with app.app_context():
-                try:
-                    inspector = inspect(db.engine)
-                    cols = {c['name'] for c in inspector.get_columns('users')}
-                except Exception:
-                    cols = set()
+            # the schema is settled now; choose the login query once instead of per request
+            prepare_login_query()
 
-                wanted = ['id', 'email', 'names', 'pwd_hash', 'password', 'role']
-                sel_cols = [c for c in wanted if c in cols]
-                if not sel_cols:
-                    return None
+    LOGIN_COLUMNS = ['id', 'email', 'names', 'pwd_hash', 'password', 'role']
+    _login_query = None
 
-                q = text(f"SELECT {', '.join(sel_cols)} FROM users WHERE email=:email LIMIT 1")
-                row = db.session.execute(q, {'email': email}).fetchone()
-                if not row:
-                    return None
+    def build_login_query():
+        """Inspect the schema once and compile the login lookup into one statement.
 
-                # Build a simple object with expected attributes
-                from types import SimpleNamespace
-                obj = SimpleNamespace()
-                for idx, col in enumerate(sel_cols):
-                    setattr(obj, col, row[idx])
+        Columns missing from `users` are selected as NULL. The role is resolved
+        in the same statement: users.role, then the first roles.name linked via
+        user_roles, then auth_user_roles, each lookup included only when its
+        tables exist. Correlated subqueries keep one row per user even when a
+        user has several role rows (a plain join would fan out)."""
+        inspector = inspect(db.engine)
+        tables = set(inspector.get_table_names())
+        if 'users' not in tables:
+            return None
+        cols = {c['name'] for c in inspector.get_columns('users')}
+        if 'email' not in cols:
+            return None
+        select_cols = [f"u.{c}" if c in cols else f"NULL AS {c}" for c in LOGIN_COLUMNS if c != 'role']
+        role_sources = []
+        if 'role' in cols:
+            role_sources.append("NULLIF(u.role, '')")
+        if 'id' in cols and {'user_roles', 'roles'} <= tables:
+            role_sources.append("(SELECT r.name FROM roles r JOIN user_roles ur ON ur.role_id = r.id WHERE ur.user_id = u.id LIMIT 1)")
+        if 'id' in cols and 'auth_user_roles' in tables:
+            role_sources.append("(SELECT aur.role FROM auth_user_roles aur WHERE aur.user_id = u.id LIMIT 1)")
+        if not role_sources:
+            role_expr = 'NULL'
+        elif len(role_sources) == 1:
+            role_expr = role_sources[0]
+        else:
+            role_expr = f"COALESCE({', '.join(role_sources)})"
+        return text(f"SELECT {', '.join(select_cols)}, {role_expr} AS role FROM users u WHERE u.email = :email LIMIT 1")
 
-                # Ensure attributes exist even if column missing
-                for col in wanted:
-                    if not hasattr(obj, col):
-                        setattr(obj, col, None)
+    def reset_login_query():
+        """Forget the compiled login query (after schema changes)."""
+        global _login_query
+        _login_query = None
 
-                # If role missing, try to resolve via user_roles -> roles
-                if not getattr(obj, 'role', None):
-                    if 'user_roles' in inspect(db.engine).get_table_names():
-                        try:
-                            # Prefer lookup by user id when available, otherwise join by email
-                            if getattr(obj, 'id', None):
-                                r = db.session.execute(
-                                    text(
-                                        "SELECT r.name FROM roles r JOIN user_roles ur ON ur.role_id=r.id WHERE ur.user_id=:uid LIMIT 1"
-                                    ),
-                                    {"uid": obj.id},
-                                ).fetchone()
-                            else:
-                                # Some schemas / selects may not include `id` column; join using email
-                                r = db.session.execute(
-                                    text(
-                                        "SELECT r.name FROM roles r JOIN user_roles ur ON ur.role_id=r.id JOIN users u ON u.id=ur.user_id WHERE u.email=:email LIMIT 1"
-                                    ),
-                                    {"email": getattr(obj, 'email', None)},
-                                ).fetchone()
-                            if r:
-                                obj.role = r[0]
-                        except Exception:
-                            try:
-                                db.session.rollback()
-                            except Exception:
-                                pass
-                # If still missing, check our auth_user_roles fallback table
-                if not getattr(obj, 'role', None) and 'auth_user_roles' in inspect(db.engine).get_table_names():
+    def prepare_login_query():
+        global _login_query
+        try:
+            _login_query = build_login_query()
+        except Exception:
+            _login_query = None
+
+    def get_user_from_db(email: str):
+        """Look up a user and their resolved role with a single statement."""
+        global _login_query
+        from types import SimpleNamespace
+        try:
+            with app.app_context():
+                for attempt in range(2):
+                    if _login_query is None:
+                        _login_query = build_login_query()
+                        if _login_query is None:
+                            return None
                     try:
-                        if getattr(obj, 'id', None):
-                            r2 = db.session.execute(text("SELECT role FROM auth_user_roles WHERE user_id=:uid LIMIT 1"), {"uid": obj.id}).fetchone()
-                        else:
-                            r2 = db.session.execute(
-                                text("SELECT aur.role FROM auth_user_roles aur JOIN users u ON u.id=aur.user_id WHERE u.email=:email LIMIT 1"),
-                                {"email": getattr(obj, 'email', None)},
-                            ).fetchone()
-                        if r2:
-                            obj.role = r2[0]
+                        row = db.session.execute(_login_query, {'email': email}).fetchone()
+                        break
                     except Exception:
-                        try:
-                            db.session.rollback()
-                        except Exception:
-                            pass
-
-                return obj
+                        # the schema changed under the compiled query; rebuild it once
+                        db.session.rollback()
+                        _login_query = None
+                        if attempt:
+                            raise
+                if not row:
+                    return None
+                return SimpleNamespace(**dict(zip(LOGIN_COLUMNS, row)))
         except Exception:
             try:
                 db.session.rollback()
@@ -312,21 +376,289 @@ if DB_ENABLED:
             pass
 
 
-def create_token(sub: str, role: str):
+def access_claims(sub: str, role: str):
     now = int(time.time())
-    payload = {"sub": sub, "role": role, "iat": now, "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60}
+    # jti identifies the token in the revocation list
+    return {"sub": sub, "role": role, "iat": now, "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            "jti": uuid.uuid4().hex}
+
+
+def sign_claims(payload: dict):
+    if keyring is not None:
+        return keyring.sign(payload)
     return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
 
+def create_token(sub: str, role: str):
+    return sign_claims(access_claims(sub, role))
+
+
 def decode_token(token: str):
+    if keyring is not None:
+        if time.time() < HS256_ACCEPT_UNTIL and jwt.get_unverified_header(token).get("alg") == "HS256":
+            return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        return keyring.decode(token)
     return jwt.decode(token, JWT_SECRET, algorithms=["HS256"]) 
 
 
+def revoke_token(jti: str, exp: int):
+    now = time.time()
+    if not DB_ENABLED:
+        with _revoked_lock:
+            REVOKED.setdefault(jti, {'exp': exp, 'revoked_at': now})
+    else:
+        with app.app_context():
+            if db.session.get(RevokedToken, jti) is None:
+                db.session.add(RevokedToken(jti=jti, exp=exp, revoked_at=now))
+                db.session.commit()
+    purge_revocations()
+
+
+def is_token_revoked(jti) -> bool:
+    if not jti:
+        return False
+    if not DB_ENABLED:
+        return jti in REVOKED
+    with app.app_context():
+        return db.session.get(RevokedToken, jti) is not None
+
+
+def list_revocations(since: float | None = None):
+    """Unexpired revocations, only those recorded at or after `since` when given.
+
+    Expired rows are filtered out here and deleted by purge_revocations."""
+    now = time.time()
+    if not DB_ENABLED:
+        with _revoked_lock:
+            return [{'jti': j, 'exp': r['exp']} for j, r in REVOKED.items()
+                    if r['exp'] > now and (since is None or r['revoked_at'] >= since)]
+    with app.app_context():
+        query = db.session.query(RevokedToken.jti, RevokedToken.exp).filter(RevokedToken.exp > now)
+        if since is not None:
+            query = query.filter(RevokedToken.revoked_at >= since)
+        return [{'jti': jti, 'exp': exp} for jti, exp in query]
+
+
+def purge_revocations(interval: float = 3600.0):
+    """Delete expired revocations, at most once per interval."""
+    global _revocations_purged_at
+    now = time.time()
+    if now - _revocations_purged_at < interval:
+        return
+    _revocations_purged_at = now
+    if not DB_ENABLED:
+        with _revoked_lock:
+            for jti in [j for j, r in REVOKED.items() if r['exp'] <= now]:
+                del REVOKED[jti]
+        return
+    with app.app_context():
+        db.session.query(RevokedToken).filter(RevokedToken.exp <= now).delete()
+        db.session.commit()
+
+
+def refresh_hash(token: str) -> str:
+    # refresh tokens are 256 random bits, so a plain digest is enough (no password hashing)
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _cache_refresh(token_hash: str, record: dict):
+    with _refresh_lock:
+        _refresh_cache[token_hash] = record
+        while len(_refresh_cache) > REFRESH_CACHE_SIZE:
+            _refresh_cache.popitem(last=False)
+
+
+def store_refresh_token(token_hash: str, family: str, sub: str, access_jti: str, access_exp: int):
+    record = {'family': family, 'sub': sub, 'expires_at': int(time.time()) + REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+              'access_jti': access_jti, 'access_exp': access_exp}
+    purge_refresh_tokens()
+    if not DB_ENABLED:
+        with _refresh_lock:
+            REFRESH_TOKENS[token_hash] = {**record, 'rotated_at': None, 'revoked': False}
+        return
+    with app.app_context():
+        db.session.add(RefreshToken(token_hash=token_hash, revoked=False, **record))
+        db.session.commit()
+    _cache_refresh(token_hash, record)
+
+
+def issue_tokens(sub: str, role: str, family: str | None = None):
+    """Response body with a new access token and a refresh token in `family` (new login when None)."""
+    claims = access_claims(sub, role)
+    refresh_token = secrets.token_urlsafe(32)
+    store_refresh_token(refresh_hash(refresh_token), family or uuid.uuid4().hex, sub, claims['jti'], claims['exp'])
+    return {
+        'access_token': sign_claims(claims),
+        'token_type': 'Bearer',
+        'expires_in': ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        'refresh_token': refresh_token,
+        'refresh_expires_in': REFRESH_TOKEN_EXPIRE_DAYS * 86400,
+        'role': role,
+    }
+
+
+def use_refresh_token(token: str):
+    """Consume a refresh token. Returns (record, None) or (None, 'invalid' | 'expired' | 'reused').
+
+    Each token is single use: presenting one that was already rotated means it
+    leaked, so its whole family (and the access tokens it produced) is revoked."""
+    token_hash = refresh_hash(token)
+    now = time.time()
+    if not DB_ENABLED:
+        with _refresh_lock:
+            record = REFRESH_TOKENS.get(token_hash)
+            if record is None:
+                return None, 'invalid'
+            reused = record['revoked'] or record['rotated_at'] is not None
+            if not reused:
+                if record['expires_at'] <= now:
+                    return None, 'expired'
+                record['rotated_at'] = now
+                return record, None
+        revoke_refresh_family(record['family'])
+        return None, 'reused'
+
+    with _refresh_lock:
+        cached = _refresh_cache.pop(token_hash, None)
+    with app.app_context():
+        # the conditional UPDATE is the single-use check, also across replicas
+        result = db.session.execute(
+            RefreshToken.__table__.update()
+            .where(RefreshToken.token_hash == token_hash, RefreshToken.rotated_at.is_(None),
+                   RefreshToken.revoked.is_(False), RefreshToken.expires_at > now)
+            .values(rotated_at=now))
+        db.session.commit()
+        if result.rowcount == 1 and cached is not None:
+            return cached, None
+        row = db.session.get(RefreshToken, token_hash)
+        if row is None:
+            return None, 'invalid'
+        record = {'family': row.family, 'sub': row.sub, 'expires_at': row.expires_at,
+                  'access_jti': row.access_jti, 'access_exp': row.access_exp}
+    if result.rowcount == 1:
+        return record, None
+    if row.revoked or row.rotated_at is not None:
+        revoke_refresh_family(row.family)
+        return None, 'reused'
+    return None, 'expired'
+
+
+def refresh_family(token: str):
+    token_hash = refresh_hash(token)
+    if not DB_ENABLED:
+        record = REFRESH_TOKENS.get(token_hash)
+        return record['family'] if record else None
+    with app.app_context():
+        row = db.session.get(RefreshToken, token_hash)
+        return row.family if row else None
+
+
+def revoke_refresh_family(family: str):
+    """Revoke every refresh token of a login and the unexpired access tokens issued with them."""
+    now = time.time()
+    if not DB_ENABLED:
+        with _refresh_lock:
+            records = [r for r in REFRESH_TOKENS.values() if r['family'] == family]
+            for r in records:
+                r['revoked'] = True
+        issued = [(r['access_jti'], r['access_exp']) for r in records]
+    else:
+        with app.app_context():
+            issued = db.session.query(RefreshToken.access_jti, RefreshToken.access_exp).filter(
+                RefreshToken.family == family).all()
+            db.session.query(RefreshToken).filter(RefreshToken.family == family).update({'revoked': True})
+            db.session.commit()
+        with _refresh_lock:
+            for token_hash in [h for h, r in _refresh_cache.items() if r['family'] == family]:
+                del _refresh_cache[token_hash]
+    for jti, exp in issued:
+        if jti and exp and exp > now:
+            revoke_token(jti, exp)
+
+
+def purge_refresh_tokens(interval: float = 3600.0):
+    """Delete expired refresh tokens, at most once per interval."""
+    global _refresh_purged_at
+    now = time.time()
+    if now - _refresh_purged_at < interval:
+        return
+    _refresh_purged_at = now
+    if not DB_ENABLED:
+        with _refresh_lock:
+            for token_hash in [h for h, r in REFRESH_TOKENS.items() if r['expires_at'] <= now]:
+                del REFRESH_TOKENS[token_hash]
+        return
+    with app.app_context():
+        db.session.query(RefreshToken).filter(RefreshToken.expires_at <= now).delete()
+        db.session.commit()
+
+
+def client_address():
+    # behind a proxy every request shares its address; trust X-Forwarded-For only when configured
+    if LOGIN_RATE_TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr
+
+
+def bearer_token():
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return auth.split(None, 1)[1].strip()
+    return None
+
+
+def check_memory_password(user: dict, password: str) -> bool:
+    """Verify against an in-memory user, hashing lazily-seeded passwords on first use."""
+    if user.get('pwd_hash') is None:
+        seed = user.get('seed_password')
+        if seed is None or not hmac.compare_digest(seed.encode('utf-8'), password.encode('utf-8')):
+            return False
+        user['pwd_hash'] = hasher.hash(password)
+        user.pop('seed_password', None)
+        return True
+    valid, new_hash = hasher.verify(password, user['pwd_hash'])
+    if valid and new_hash:
+        user['pwd_hash'] = new_hash
+    return valid
+
+
+def rehash_db_password(email: str, old_hash: str, new_hash: str):
+    # guarded on the old hash so a concurrent password change is never overwritten
+    try:
+        with app.app_context():
+            db.session.execute(text("UPDATE users SET pwd_hash=:new WHERE email=:email AND pwd_hash=:old"),
+                               {'new': new_hash, 'email': email, 'old': old_hash})
+            db.session.commit()
+    except Exception:
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+
+
 @app.get('/health')
 def health():
     return {'ok': True}
 
 
+@app.get('/auth/metrics')
+def metrics():
+    return jsonify({'login_rate_limit': login_limiter.snapshot()})
+
+
+@app.get('/.well-known/jwks.json')
+def jwks():
+    """Public signing keys; empty with HS256, whose secret is never published."""
+    resp = jsonify(keyring.jwks() if keyring is not None else {'keys': []})
+    # verifiers cache the set and refetch on an unknown kid, so a short max-age is enough
+    resp.headers['Cache-Control'] = 'public, max-age=300'
+    return resp
+
+
+def _log_login_failed(email, reason):
+    log.info('login_failed', extra={'event': 'login_failed', 'email': email, 'reason': reason, 'ip': client_address()})
+
+
 @app.post('/auth/login')
 def login():
     # Use explicit parsing and a helpful debug path if anything's wrong.
@@ -335,79 +667,156 @@ def login():
     except Exception as e:
         return jsonify({'error': f'invalid json: {e}'}), 400
 
+    if not isinstance(body, dict):
+        return jsonify({'error': 'email and password are required'}), 400
     email = body.get('email')
     password = body.get('password')
     if not email or not password:
         return jsonify({'error': 'email and password are required'}), 400
+    if not isinstance(email, str) or not isinstance(password, str):
+        return jsonify({'error': 'email and password must be strings'}), 400
+
+    # counted before any lookup or hashing so rejected attempts cost no DB or CPU work
+    allowed, retry_after, scope = login_limiter.hit(ip=client_address(), email=email.lower())
+    if not allowed:
+        log.warning('login_rate_limited', extra={'event': 'login_rate_limited', 'email': email, 'ip': client_address(),
+                                                 'scope': scope, 'retry_after': retry_after})
+        resp = jsonify({'error': 'too many login attempts', 'retry_after': retry_after})
+        resp.headers['Retry-After'] = str(retry_after)
+        return resp, 429
 
     if not DB_ENABLED:
         user = USERS.get(email)
-        if not user or not pwd_ctx.verify(password, user['pwd_hash']):
+        if not user or not check_memory_password(user, password):
+            _log_login_failed(email, 'bad_password' if user else 'user_not_found')
             return jsonify({'error': 'invalid credentials'}), 401
-        # create JWT
-        now = int(time.time())
-        payload = {"sub": email, "role": user["role"], "iat": now, "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60}
-        token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
-        return jsonify({
-            'access_token': token,
-            'token_type': 'Bearer',
-            'expires_in': ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-            'role': user['role']
-        })
+        login_limiter.reset('email', email.lower())
+        log.info('login_succeeded', extra={**logconfig.SAMPLED, 'event': 'login_succeeded', 'email': email})
+        return jsonify(issue_tokens(email, user["role"]))
 
     # DB-backed
     u = get_user_from_db(email)
     if not u:
-        print(f"[auth-debug] login: user not found for email={email}")
+        _log_login_failed(email, 'user_not_found')
         return jsonify({'error': 'invalid credentials'}), 401
 
     # Accept either a stored password hash (`pwd_hash`) or a legacy/plain `password` column.
     valid = False
-    print(f"[auth-debug] login: found user email={getattr(u,'email',None)} pwd_hash_present={bool(getattr(u,'pwd_hash',None))} password_field={getattr(u,'password',None)!r}")
     if getattr(u, 'pwd_hash', None):
         try:
-            valid = pwd_ctx.verify(password, u.pwd_hash)
+            valid, new_hash = hasher.verify(password, u.pwd_hash)
         except Exception:
-            valid = False
+            valid, new_hash = False, None
+        if valid and new_hash:
+            # stored with a different cost than AUTH_PBKDF2_ROUNDS: upgrade it now
+            rehash_db_password(email, u.pwd_hash, new_hash)
     if not valid and getattr(u, 'password', None):
         # fallback: compare plaintext (insecure, but compatible with roles-api)
         valid = (password == u.password)
 
-    print(f"[auth-debug] login: password check result={valid}")
-
     if not valid:
+        _log_login_failed(email, 'bad_password')
         return jsonify({'error': 'invalid credentials'}), 401
-    now = int(time.time())
-    payload = {"sub": email, "role": u.role, "iat": now, "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60}
-    token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
-    return jsonify({
-        'access_token': token,
-        'token_type': 'Bearer',
-        'expires_in': ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        'role': u.role
-    })
+    login_limiter.reset('email', email.lower())
+    log.info('login_succeeded', extra={**logconfig.SAMPLED, 'event': 'login_succeeded', 'email': email})
+    return jsonify(issue_tokens(email, u.role))
+
+
+@app.post('/auth/refresh')
+def refresh():
+    """Exchange a refresh token for a new access token and a new refresh token (rotation).
+
+    No password is verified; the role is re-read so role changes apply on the next refresh."""
+    body = request.get_json(silent=True) or {}
+    token = body.get('refresh_token')
+    if not token:
+        return jsonify({'error': 'refresh_token is required'}), 400
+
+    record, reason = use_refresh_token(token)
+    if record is None:
+        errors = {'expired': 'refresh token expired', 'reused': 'refresh token reuse detected'}
+        return jsonify({'error': errors.get(reason, 'invalid refresh token')}), 401
+
+    sub = record['sub']
+    if not DB_ENABLED:
+        role = USERS[sub]['role'] if sub in USERS else None
+    else:
+        u = get_user_from_db(sub)
+        role = u.role if u else None
+    if role is None:
+        # the user was removed since login
+        revoke_refresh_family(record['family'])
+        return jsonify({'error': 'invalid refresh token'}), 401
+    return jsonify(issue_tokens(sub, role, record['family']))
 
 
 
 @app.get('/auth/verify')
 def verify():
     # Accept token via query param `token` or Authorization header `Bearer <token>`
-    token = request.args.get('token')
-    if not token:
-        auth = request.headers.get('Authorization', '')
-        if auth.startswith('Bearer '):
-            token = auth.split(None, 1)[1].strip()
+    token = request.args.get('token') or bearer_token()
 
     if not token:
         return jsonify({'valid': False}), 400
 
     try:
         payload = decode_token(token)
-        return jsonify({'valid': True, 'role': payload.get('role'), 'sub': payload.get('sub')}), 200
     except jwt.ExpiredSignatureError:
         return jsonify({'valid': False, 'error': 'token expired'}), 401
     except Exception:
         return jsonify({'valid': False, 'error': 'invalid token'}), 401
+    if is_token_revoked(payload.get('jti')):
+        return jsonify({'valid': False, 'error': 'token revoked'}), 401
+    return jsonify({'valid': True, 'role': payload.get('role'), 'sub': payload.get('sub')}), 200
+
+
+@app.post('/auth/revoke')
+def revoke():
+    """Revoke a token (logout). The token comes from the body `token` or the Bearer header.
+
+    A body `refresh_token` also ends the session it belongs to: every refresh token
+    of that login and the access tokens issued with them are revoked."""
+    body = request.get_json(silent=True) or {}
+    refresh_token = body.get('refresh_token')
+    if refresh_token:
+        family = refresh_family(refresh_token)
+        if family is None:
+            return jsonify({'error': 'invalid refresh token'}), 401
+        revoke_refresh_family(family)
+        if not (body.get('token') or bearer_token()):
+            return jsonify({'revoked': True}), 200
+    token = body.get('token') or bearer_token()
+    if not token:
+        return jsonify({'error': 'token is required'}), 400
+    try:
+        payload = decode_token(token)
+    except jwt.ExpiredSignatureError:
+        # already unusable; nothing to record
+        return jsonify({'revoked': False, 'reason': 'token expired'}), 200
+    except Exception:
+        return jsonify({'error': 'invalid token'}), 401
+    jti = payload.get('jti')
+    if not jti:
+        return jsonify({'error': 'token has no jti'}), 400
+    revoke_token(jti, int(payload['exp']))
+    return jsonify({'revoked': True, 'jti': jti}), 200
+
+
+@app.get('/auth/revocations')
+def revocations():
+    """Revocation list for services that verify tokens locally.
+
+    Pass the previous response's `generated_at` as `since` to receive only newer entries.
+    Consecutive syncs overlap by REVOCATION_SYNC_MARGIN; clients key entries by jti."""
+    since = request.args.get('since')
+    try:
+        since = float(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'since must be a unix timestamp'}), 400
+    # revoked_at is stamped before the row commits, so a cursor of "now" could skip a
+    # revocation committed just after this read; back it off by the margin instead
+    generated_at = time.time() - REVOCATION_SYNC_MARGIN
+    return jsonify({'revoked': list_revocations(since), 'generated_at': generated_at}), 200
 
 
 
@@ -432,7 +841,7 @@ def create_user_api():
 
     if not DB_ENABLED:
         # In-memory mode: create in USERS dict
-        USERS[email] = {'pwd_hash': pwd_ctx.hash(password), 'role': role or 'viewer'}
+        USERS[email] = {'pwd_hash': hasher.hash(password), 'role': role or 'viewer'}
         return jsonify({'email': email, 'role': role or 'viewer'}), 201
 
     # DB-enabled: insert using SQLAlchemy, writing to columns that exist
@@ -446,7 +855,7 @@ def create_user_api():
             if 'email' in cols:
                 insert_data['email'] = email
             if 'pwd_hash' in cols:
-                insert_data['pwd_hash'] = pwd_ctx.hash(password)
+                insert_data['pwd_hash'] = hasher.hash(password)
             elif 'password' in cols:
                 insert_data['password'] = password
             if 'names' in cols and names:
@@ -485,6 +894,131 @@ def create_user_api():
         return jsonify({'error': 'could_not_create_user', 'detail': str(e)}), 500
 
 
+def _bulk_records(body):
+    """Validate a bulk payload. Returns (valid records, per-record results) in input order."""
+    items = body.get('users') if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        return None, None
+    results, valid, seen = [], [], set()
+    for i, item in enumerate(items):
+        email = item.get('email') if isinstance(item, dict) else None
+        result = {'index': i, 'email': email}
+        results.append(result)
+        password = item.get('password') if isinstance(item, dict) else None
+        if not email or not password:
+            result.update(status='error', error='email and password are required')
+        elif not isinstance(email, str) or not isinstance(password, str):
+            result.update(status='error', error='email and password must be strings')
+        elif item.get('role') is not None and not isinstance(item['role'], str):
+            result.update(status='error', error='role must be a string')
+        elif email in seen:
+            result.update(status='error', error='duplicate email in request')
+        else:
+            seen.add(email)
+            valid.append((result, item))
+    return valid, results
+
+
+def _existing_emails(emails):
+    found = set()
+    for i in range(0, len(emails), BULK_INSERT_CHUNK):
+        chunk = emails[i:i + BULK_INSERT_CHUNK]
+        found.update(r[0] for r in db.session.execute(User.__table__.select().with_only_columns(User.email)
+                                                      .where(User.email.in_(chunk))))
+    return found
+
+
+def _insert_users(records, cols):
+    """Insert users (and auth_user_roles rows when users has no role column) with multi-row INSERTs."""
+    rows = []
+    for result, item in records:
+        row = {'email': result['email']}
+        if 'pwd_hash' in cols:
+            row['pwd_hash'] = item['pwd_hash']
+        elif 'password' in cols:
+            # roles-api schema keeps a plaintext column, as in /auth/users
+            row['password'] = item['password']
+        if 'names' in cols:
+            row['names'] = item.get('names') or result['email']
+        if 'role' in cols:
+            row['role'] = item.get('role') or 'viewer'
+        rows.append(row)
+    # same key set for every row so each chunk is one INSERT ... VALUES (...), (...)
+    for i in range(0, len(rows), BULK_INSERT_CHUNK):
+        db.session.execute(User.__table__.insert().values(rows[i:i + BULK_INSERT_CHUNK]))
+    if 'role' in cols:
+        return
+    roles = {result['email']: item.get('role') for result, item in records if item.get('role')}
+    emails = list(roles)
+    mappings = []
+    for i in range(0, len(emails), BULK_INSERT_CHUNK):
+        chunk = emails[i:i + BULK_INSERT_CHUNK]
+        query = User.__table__.select().with_only_columns(User.id, User.email).where(User.email.in_(chunk))
+        for uid, email in db.session.execute(query):
+            mappings.append({'user_id': uid, 'role': roles[email]})
+    for i in range(0, len(mappings), BULK_INSERT_CHUNK):
+        db.session.execute(AuthUserRole.__table__.insert().values(mappings[i:i + BULK_INSERT_CHUNK]))
+
+
+@app.post('/auth/users/bulk')
+def create_users_bulk():
+    """Create many users in one call: `{"users": [{email, password, names?, role?}, ...]}`.
+
+    Passwords are hashed in parallel on the hasher's worker pool, and all new users
+    (plus role mappings) are written in one transaction with multi-row INSERTs.
+    Returns one result per input record, in order: status `created`, `exists` or `error`."""
+    body = request.get_json(silent=True)
+    valid, results = _bulk_records(body)
+    if valid is None:
+        return jsonify({'error': 'users must be a list'}), 400
+    if len(results) > BULK_USERS_MAX:
+        return jsonify({'error': f'at most {BULK_USERS_MAX} users per request'}), 413
+
+    if not DB_ENABLED:
+        new = [(r, item) for r, item in valid if r['email'] not in USERS]
+        for result, item in valid:
+            if result['email'] in USERS:
+                result.update(status='exists')
+        hashes = hasher.hash_many([item['password'] for _, item in new])
+        for (result, item), pwd_hash in zip(new, hashes):
+            USERS[result['email']] = {'pwd_hash': pwd_hash, 'role': item.get('role') or 'viewer'}
+            result.update(status='created', role=item.get('role') or 'viewer')
+    else:
+        try:
+            with app.app_context():
+                inspector = inspect(db.engine)
+                cols = [c['name'] for c in inspector.get_columns('users')] if 'users' in inspector.get_table_names() else []
+                if 'email' not in cols:
+                    return jsonify({'error': 'no writable columns available'}), 500
+                existing = _existing_emails([r['email'] for r, _ in valid])
+                new = []
+                for result, item in valid:
+                    if result['email'] in existing:
+                        result.update(status='exists')
+                    else:
+                        new.append((result, item))
+                if 'pwd_hash' in cols:
+                    hashes = hasher.hash_many([item['password'] for _, item in new])
+                    new = [(r, {**item, 'pwd_hash': h}) for (r, item), h in zip(new, hashes)]
+                _insert_users(new, cols)
+                db.session.commit()
+                for result, item in new:
+                    result.update(status='created', role=item.get('role'))
+        except Exception as e:
+            # one transaction: nothing from this request was written
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+            log.error('bulk_users_failed', extra={'event': 'bulk_users_failed', 'records': len(results)}, exc_info=True)
+            return jsonify({'error': 'could_not_create_users', 'detail': str(e)}), 500
+
+    summary = {s: sum(1 for r in results if r.get('status') == s) for s in ('created', 'exists', 'error')}
+    # one event per request, not per user
+    log.info('bulk_users', extra={'event': 'bulk_users', 'counts': summary})
+    return jsonify({**summary, 'results': results}), 200
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=PORT)
 
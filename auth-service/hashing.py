@@ -0,0 +1,139 @@
+"""Password hashing off the request threads.
+
+pbkdf2_sha256 costs tens of milliseconds of CPU per hash or verify. Hasher runs
+that work in a process pool (AUTH_HASH_EXECUTOR=process, the default) so the
+GIL stays free for request handling; `thread` and `inline` are available for
+constrained environments and tests.
+
+The pool is small (AUTH_HASH_WORKERS, default 2) because every server process
+gets its own: with N server workers (e.g. gunicorn -w N) there are N x
+AUTH_HASH_WORKERS hashing processes, and that product should stay at or below
+the CPU count. Workers are started with `forkserver` (or `spawn` where it is
+unavailable), never plain fork: forking a server that already runs request,
+logging and sync threads can copy a lock held by one of them into the child,
+which then deadlocks.
+
+The cost is AUTH_PBKDF2_ROUNDS. Hashes created with a different round count
+still verify, and verify() returns a replacement hash at the configured cost
+so callers can upgrade stored hashes transparently on login.
+"""
+
+import functools
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+
+# passlib's pbkdf2_sha256 default
+DEFAULT_ROUNDS = 29000
+MODES = ('process', 'thread', 'inline')
+DEFAULT_WORKERS = 2
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+@functools.lru_cache(maxsize=4)
+def context(rounds: int) -> CryptContext:
+    # min == max == default: any other round count is reported as needing an update
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+    )
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return context(rounds).hash(password)
+
+
+def verify_password(password: str, pwd_hash: str, rounds: int):
+    """Return (valid, new_hash); new_hash is set when the stored cost differs from rounds."""
+    try:
+        return context(rounds).verify_and_update(password, pwd_hash)
+    except (ValueError, TypeError):
+        return False, None
+
+
+class Hasher:
+    def __init__(self, rounds: int = DEFAULT_ROUNDS, mode: str = 'process', workers: int | None = None, timeout: float = 30.0):
+        if mode not in MODES:
+            raise ValueError(f"hash executor must be one of {', '.join(MODES)}")
+        self.rounds = rounds
+        self.mode = mode
+        self.workers = workers or DEFAULT_WORKERS
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # created on first use so importing the app does not start workers; the lock keeps
+        # concurrent first requests from each starting (and leaking) a pool
+        with self._lock:
+            if self._executor is None:
+                if self.mode == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hasher')
+            return self._executor
+
+    def _discard(self, pool):
+        # only the broken pool is dropped; another thread may already have replaced it
+        with self._lock:
+            if self._executor is pool:
+                self._executor = None
+
+    def _run(self, fn, *args):
+        if self.mode == 'inline':
+            return fn(*args)
+        pool = self._pool()
+        try:
+            return pool.submit(fn, *args).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            # a crashed worker poisons the pool; start a fresh one and fall back for this call
+            self._discard(pool)
+            return fn(*args)
+
+    def hash(self, password: str) -> str:
+        return self._run(hash_password, password, self.rounds)
+
+    def verify(self, password: str, pwd_hash: str):
+        return self._run(verify_password, password, pwd_hash, self.rounds)
+
+    def hash_many(self, passwords) -> list:
+        """Hash a batch across all workers; results keep the input order."""
+        passwords = list(passwords)
+        if self.mode == 'inline' or len(passwords) < 2:
+            return [hash_password(p, self.rounds) for p in passwords]
+        # a few chunks per worker amortise the IPC without leaving workers idle at the end
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        pool = self._pool()
+        try:
+            return list(pool.map(hash_password, passwords, itertools.repeat(self.rounds),
+                                         chunksize=chunksize,
+                                         timeout=self.timeout * max(1, len(passwords) // self.workers)))
+        except BrokenProcessPool:
+            self._discard(pool)
+            return [hash_password(p, self.rounds) for p in passwords]
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._executor = self._executor, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def from_env() -> Hasher:
+    return Hasher(
+        rounds=int(os.environ.get("AUTH_PBKDF2_ROUNDS", str(DEFAULT_ROUNDS))),
+        mode=os.environ.get("AUTH_HASH_EXECUTOR", "process"),
+        workers=int(os.environ.get("AUTH_HASH_WORKERS", str(DEFAULT_WORKERS))) or None,
+    )
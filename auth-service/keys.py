@@ -0,0 +1,211 @@
+"""Asymmetric signing keys for access tokens.
+
+With JWT_ALGORITHM=RS256 or EdDSA, tokens are signed with a private key and
+carry its `kid` in the header; the public keys are published at
+GET /.well-known/jwks.json, so other services verify tokens without holding
+any secret. HS256 (the default) keeps signing with JWT_SECRET.
+
+Keys live in JWT_KEYS_DIR as `<kid>.pem` (PKCS#8). Kids sort by creation
+time and the newest key signs; older keys stay published so tokens they
+signed keep verifying until they expire. Rotate with `python keys.py rotate`
+and remove retired keys with `python keys.py prune --older-than SECONDS`: a
+key is removed once it has been retired (replaced by the next kid) for that
+long, which must be at least the access-token lifetime
+(ACCESS_TOKEN_EXPIRE_MINUTES), so no unexpired token can reference it. Running replicas pick up changes
+to the directory on their next sign or JWKS request. Without JWT_KEYS_DIR a
+key is generated in memory, which only suits a single replica.
+"""
+
+import argparse
+import calendar
+import os
+import sys
+import threading
+import time
+import uuid
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+ALGORITHMS = ('RS256', 'EdDSA')
+RSA_KEY_SIZE = 2048
+# access tokens signed by a key can outlive its retirement by this much
+ACCESS_TOKEN_TTL = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', '15')) * 60
+
+
+def generate_key(algorithm: str):
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(public_exponent=65537, key_size=RSA_KEY_SIZE)
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f"signing algorithm must be one of {', '.join(ALGORITHMS)}")
+
+
+def new_kid(after: str | None = None) -> str:
+    """Kid that sorts after `after`: a microsecond UTC timestamp plus a random suffix."""
+    while True:
+        ns = time.time_ns()
+        kid = time.strftime('%Y%m%d%H%M%S', time.gmtime(ns // 10**9)) + f'{ns // 1000 % 10**6:06d}-' + uuid.uuid4().hex[:8]
+        if after is None or kid > after:
+            return kid
+
+
+def kid_created(kid: str) -> float | None:
+    """Creation time encoded in a kid from new_kid(), or None for other names."""
+    try:
+        return calendar.timegm(time.strptime(kid[:14], '%Y%m%d%H%M%S')) + int(kid[14:20]) / 1e6
+    except ValueError:
+        return None
+
+
+def public_jwk(private_key, kid: str, algorithm: str) -> dict:
+    public_key = private_key.public_key()
+    if algorithm == 'RS256':
+        jwk = jwt.algorithms.RSAAlgorithm.to_jwk(public_key, as_dict=True)
+    else:
+        jwk = jwt.algorithms.OKPAlgorithm.to_jwk(public_key, as_dict=True)
+    jwk.update({'kid': kid, 'alg': algorithm, 'use': 'sig'})
+    return jwk
+
+
+class KeyRing:
+    def __init__(self, algorithm: str, directory: str | None = None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"signing algorithm must be one of {', '.join(ALGORITHMS)}")
+        self.algorithm = algorithm
+        self.directory = directory
+        self._keys = {}
+        self._jwks = {'keys': []}
+        self._stamp = None
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            if not self._kids_on_disk():
+                self.rotate()
+            self._reload()
+        else:
+            kid = new_kid()
+            self._set({kid: generate_key(algorithm)})
+
+    def _kids_on_disk(self):
+        return sorted(n[:-4] for n in os.listdir(self.directory) if n.endswith('.pem'))
+
+    def _set(self, keys):
+        self._keys = dict(sorted(keys.items()))
+        self._jwks = {'keys': [public_jwk(k, kid, self.algorithm) for kid, k in self._keys.items()]}
+
+    def _reload(self):
+        """Re-read the directory when its listing changed (one stat per call otherwise)."""
+        if not self.directory:
+            return
+        stamp = os.stat(self.directory).st_mtime_ns
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            keys = {}
+            for kid in self._kids_on_disk():
+                with open(os.path.join(self.directory, kid + '.pem'), 'rb') as f:
+                    keys[kid] = serialization.load_pem_private_key(f.read(), password=None)
+            if keys:
+                self._set(keys)
+            self._stamp = stamp
+
+    @property
+    def active_kid(self) -> str:
+        self._reload()
+        return next(reversed(self._keys))
+
+    def rotate(self) -> str:
+        """Create a new key and make it the signing key. Returns its kid."""
+        current = self._kids_on_disk() if self.directory else list(self._keys)
+        kid = new_kid(max(current) if current else None)
+        key = generate_key(self.algorithm)
+        if not self.directory:
+            with self._lock:
+                self._set({**self._keys, kid: key})
+            return kid
+        pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+        path = os.path.join(self.directory, kid + '.pem')
+        tmp = path + '.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pem)
+        os.replace(tmp, path)
+        self._reload()
+        return kid
+
+    def prune(self, older_than: float, token_ttl: float = ACCESS_TOKEN_TTL) -> list:
+        """Delete keys retired more than `older_than` seconds ago, never the active one.
+
+        A key retires when the next kid is created, so its age counts from that
+        kid's creation, not from its own. `older_than` below the access-token
+        lifetime would drop keys that unexpired tokens still reference."""
+        if older_than < token_ttl:
+            raise ValueError(f'older_than must be at least the access-token lifetime ({token_ttl:g}s)')
+        if not self.directory:
+            return []
+        cutoff = time.time() - older_than
+        kids = self._kids_on_disk()
+        removed = []
+        for kid, successor in zip(kids, kids[1:]):
+            retired = kid_created(successor)
+            if retired is None:
+                retired = os.path.getmtime(os.path.join(self.directory, successor + '.pem'))
+            if retired < cutoff:
+                os.remove(os.path.join(self.directory, kid + '.pem'))
+                removed.append(kid)
+        self._reload()
+        return removed
+
+    def sign(self, payload: dict) -> str:
+        kid = self.active_kid
+        return jwt.encode(payload, self._keys[kid], algorithm=self.algorithm, headers={'kid': kid})
+
+    def decode(self, token: str) -> dict:
+        self._reload()
+        kid = jwt.get_unverified_header(token).get('kid')
+        key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError('unknown kid')
+        return jwt.decode(token, key.public_key(), algorithms=[self.algorithm])
+
+    def jwks(self) -> dict:
+        self._reload()
+        return self._jwks
+
+
+def from_env(algorithm: str) -> KeyRing:
+    return KeyRing(algorithm, os.environ.get('JWT_KEYS_DIR') or None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='manage auth-service signing keys')
+    parser.add_argument('command', choices=('rotate', 'prune', 'list'))
+    parser.add_argument('--dir', default=os.environ.get('JWT_KEYS_DIR'), help='key directory (JWT_KEYS_DIR)')
+    parser.add_argument('--algorithm', default=os.environ.get('JWT_ALGORITHM', 'RS256'), choices=ALGORITHMS)
+    parser.add_argument('--older-than', type=float, default=7 * 86400, help='prune: age in seconds')
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error('--dir or JWT_KEYS_DIR is required')
+    ring = KeyRing(args.algorithm, args.dir)
+    if args.command == 'rotate':
+        print(ring.rotate())
+    elif args.command == 'prune':
+        try:
+            removed = ring.prune(args.older_than)
+        except ValueError as e:
+            parser.error(str(e))
+        for kid in removed:
+            print(kid)
+    else:
+        for jwk in ring.jwks()['keys']:
+            print(jwk['kid'] + (' (active)' if jwk['kid'] == ring.active_kid else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Structured logging for auth-service.
+
+Records go through a QueueHandler: the request thread only enqueues and a
+QueueListener thread formats and writes them to stderr, so log I/O is off the
+login path. Events are one JSON object per line (LOG_FORMAT=json, the default)
+with the `extra` fields as keys; LOG_FORMAT=text keeps a plain format.
+
+Successful, repetitive events are logged with `extra=SAMPLED` and kept with
+probability LOG_SAMPLE_RATE (default 0.1); failures and warnings are always
+kept. Credential fields (password, token, secret, ...) are replaced with
+'[REDACTED]' in the extras and in the message before the record is queued,
+and again in the traceback text that QueueHandler.prepare renders.
+
+inventory-service and crm-service carry a copy of redact() and the filters in
+app/core/utils/logger.py: every service is its own Docker build context, so
+there is no shared module to import. Change them together.
+
+Config: LOG_LEVEL (default INFO), LOG_FORMAT, LOG_SAMPLE_RATE.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+from logging.handlers import QueueHandler, QueueListener
+
+SAMPLED = {'sampled': True}
+
+REDACTED = '[REDACTED]'
+SENSITIVE_KEYS = re.compile(r'pass(word)?|pwd|secret|token|authorization|api[_-]?key|cookie', re.IGNORECASE)
+# key=value / key: value inside the message text
+_SENSITIVE_IN_TEXT = re.compile(
+    r'''((?:pass(?:word)?|pwd_hash|pwd|secret|token|authorization|api[_-]?key)\w*['"]?\s*[=:]\s*)('[^']*'|"[^"]*"|[^\s,;}]+)''',
+    re.IGNORECASE)
+
+# LogRecord's own attributes; anything else came from `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+def redact(value):
+    """Copy of value with credential fields hidden."""
+    if isinstance(value, dict):
+        return {k: REDACTED if isinstance(k, str) and SENSITIVE_KEYS.search(k) else redact(v)
+                for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(v) for v in value)
+    if isinstance(value, str):
+        return _SENSITIVE_IN_TEXT.sub(lambda m: m.group(1) + REDACTED, value)
+    return value
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or record.levelno >= logging.WARNING:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class RedactionFilter(logging.Filter):
+    def filter(self, record):
+        record.msg = redact(record.getMessage())
+        record.args = None
+        for key, value in list(vars(record).items()):
+            if key in _RECORD_ATTRS:
+                continue
+            setattr(record, key, REDACTED if SENSITIVE_KEYS.search(key) else redact(value))
+        return True
+
+
+class RedactingQueueHandler(QueueHandler):
+    """prepare() appends the traceback to the message after the filters have run,
+    so the final text is redacted once more."""
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.msg = record.message = redact(record.msg)
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != 'sampled':
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup(logger: logging.Logger, level: str = 'INFO', fmt: str = 'json', sample_rate: float = 1.0,
+          stream=None) -> logging.Logger:
+    """Route `logger` through a queue to a background writer; replaces an earlier setup."""
+    global _listener
+    flush()
+    for handler in list(logger.handlers):
+        if isinstance(handler, QueueHandler):
+            logger.removeHandler(handler)
+
+    output = logging.StreamHandler(stream)
+    if fmt == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = RedactingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    queue_handler.addFilter(RedactionFilter())
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+
+    logger.addHandler(queue_handler)
+    logger.setLevel(getattr(logging, level.upper()))
+    logger.propagate = False
+    return logger
+
+
+def flush():
+    """Stop the listener after draining the queue."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(flush)
+
+
+def from_env(name: str = 'auth') -> logging.Logger:
+    return setup(
+        logging.getLogger(name),
+        level=os.environ.get('LOG_LEVEL', 'INFO'),
+        fmt=os.environ.get('LOG_FORMAT', 'json'),
+        sample_rate=float(os.environ.get('LOG_SAMPLE_RATE', '0.1')),
+    )
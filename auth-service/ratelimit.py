@@ -0,0 +1,197 @@
+"""Login attempt rate limiting.
+
+Each key (an email or a remote address) may make `limit` attempts per sliding
+`window` seconds. The window is approximated with two fixed buckets: the count
+of the previous bucket is weighted by how much of it still overlaps the window,
+which needs two integers per key instead of a timestamp per attempt.
+
+Attempts are counted before any DB or hashing work, so a flood against one
+account or from one address is turned away for the cost of a dict lookup.
+Rejected attempts are not counted, so Retry-After holds however hard a client
+retries. A successful login clears the email key. With LOGIN_RATE_REDIS_URL
+the counters live in Redis and are shared by every replica; if Redis fails the
+in-process counters take over.
+
+Config: LOGIN_RATE_WINDOW (seconds, default 60), LOGIN_RATE_EMAIL (default 10),
+LOGIN_RATE_IP (default 50; 0 disables either limit), LOGIN_RATE_REDIS_URL.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCounters:
+    def __init__(self, max_keys: int = 100_000):
+        # counts live in one LRU-ordered dict per bucket; only the current and previous
+        # buckets matter, so older ones are dropped whole instead of scanned key by key
+        self.max_keys = max_keys
+        self._buckets = {}  # bucket index -> OrderedDict(key -> count)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def incr(self, key: str, bucket: int, amount: int = 1):
+        """Add to the key's current bucket. Returns (current, previous) counts."""
+        with self._lock:
+            for old in [b for b in self._buckets if b < bucket - 1]:
+                self._size -= len(self._buckets.pop(old))
+            counts = self._buckets.get(bucket)
+            if counts is None:
+                counts = self._buckets[bucket] = OrderedDict()
+            if key in counts:
+                counts.move_to_end(key)
+            else:
+                self._size += 1
+            counts[key] = counts.get(key, 0) + amount
+            current = counts[key]
+            previous = self._buckets.get(bucket - 1, {}).get(key, 0)
+            if self._size > self.max_keys:
+                self._evict(bucket)
+            return current, previous
+
+    def _evict(self, bucket):
+        # a flood of distinct keys keeps every key recent, so evict least recently used
+        # ones (previous bucket first) down to a low-water mark: O(1) per evicted key
+        low_water = int(self.max_keys * 0.9)
+        for b in (bucket - 1, bucket):
+            counts = self._buckets.get(b)
+            while counts and self._size > low_water:
+                counts.popitem(last=False)
+                self._size -= 1
+
+    def reset(self, key: str):
+        with self._lock:
+            for counts in self._buckets.values():
+                if counts.pop(key, None) is not None:
+                    self._size -= 1
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+
+class RedisCounters:
+    def __init__(self, client, prefix: str = 'auth:rl:'):
+        self.client = client
+        self.prefix = prefix
+
+    def incr(self, key: str, bucket: int, amount: int = 1, ttl: int = 120):
+        current = f'{self.prefix}{key}:{bucket}'
+        pipe = self.client.pipeline()
+        pipe.incrby(current, amount)
+        pipe.expire(current, ttl)
+        pipe.get(f'{self.prefix}{key}:{bucket - 1}')
+        count, _, previous = pipe.execute()
+        return int(count), int(previous or 0)
+
+    def reset(self, key: str, bucket: int):
+        # only the current and previous buckets count; older ones have expired
+        self.client.delete(f'{self.prefix}{key}:{bucket}', f'{self.prefix}{key}:{bucket - 1}')
+
+
+class SlidingWindowLimiter:
+    def __init__(self, limits: dict, window: float = 60.0, backend=None):
+        # limits: scope -> attempts per window; scopes with 0 are not limited
+        self.limits = {scope: n for scope, n in limits.items() if n > 0}
+        self.window = window
+        self.backend = backend
+        self.local = MemoryCounters()
+        self._stats_lock = threading.Lock()
+        self.stats = {'allowed': 0, 'rejected': 0, 'backend_errors': 0,
+                      'rejected_by_scope': {scope: 0 for scope in self.limits}}
+
+    def _incr(self, key, bucket, amount=1):
+        if self.backend is not None:
+            try:
+                return self.backend.incr(key, bucket, amount, ttl=int(self.window * 2) + 1)
+            except Exception:
+                with self._stats_lock:
+                    self.stats['backend_errors'] += 1
+        return self.local.incr(key, bucket, amount)
+
+    def hit(self, **keys):
+        """Count one attempt for each scope=key. Returns (allowed, retry_after_seconds, scope)."""
+        now = time.time()
+        bucket = int(now // self.window)
+        elapsed = (now % self.window) / self.window
+        counted = []
+        for scope, key in keys.items():
+            limit = self.limits.get(scope)
+            if not limit or not key:
+                continue
+            name = f'{scope}:{key}'
+            current, previous = self._incr(name, bucket)
+            counted.append(name)
+            if current + previous * (1 - elapsed) > limit:
+                for name in counted:
+                    self._incr(name, bucket, -1)
+                with self._stats_lock:
+                    self.stats['rejected'] += 1
+                    self.stats['rejected_by_scope'][scope] += 1
+                return False, self._retry_after(current, previous, limit, elapsed), scope
+        with self._stats_lock:
+            self.stats['allowed'] += 1
+        return True, 0, None
+
+    def _retry_after(self, current, previous, limit, elapsed):
+        # the previous bucket's weight decays linearly; when that alone cannot bring
+        # the estimate under the limit, wait for the current bucket to become the previous one
+        if previous and current <= limit:
+            needed = (current + previous - limit) / previous
+            if needed > elapsed:
+                return max(1, math.ceil((needed - elapsed) * self.window))
+        return max(1, math.ceil((1 - elapsed) * self.window))
+
+    def reset(self, scope: str, key: str):
+        name = f'{scope}:{key}'
+        self.local.reset(name)
+        if self.backend is not None:
+            try:
+                self.backend.reset(name, int(time.time() // self.window))
+            except Exception:
+                with self._stats_lock:
+                    self.stats['backend_errors'] += 1
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats, rejected_by_scope=dict(self.stats['rejected_by_scope']))
+        total = stats['allowed'] + stats['rejected']
+        stats.update(
+            window_seconds=self.window,
+            limits=dict(self.limits),
+            shed_ratio=round(stats['rejected'] / total, 4) if total else 0.0,
+            backend='redis' if self.backend is not None else 'memory',
+        )
+        return stats
+
+    def clear(self):
+        """Reset the in-process counters and stats (tests); shared Redis counters are left to expire."""
+        self.local.clear()
+        with self._stats_lock:
+            self.stats.update(allowed=0, rejected=0, backend_errors=0,
+                              rejected_by_scope={scope: 0 for scope in self.limits})
+
+
+def build_backend():
+    url = os.environ.get('LOGIN_RATE_REDIS_URL')
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logging.getLogger('auth').warning('LOGIN_RATE_REDIS_URL set but redis is not installed; using in-process counters')
+        return None
+    return RedisCounters(redis.Redis.from_url(url, socket_timeout=0.2))
+
+
+def from_env() -> SlidingWindowLimiter:
+    return SlidingWindowLimiter(
+        limits={'email': int(os.environ.get('LOGIN_RATE_EMAIL', '10')),
+                'ip': int(os.environ.get('LOGIN_RATE_IP', '50'))},
+        window=float(os.environ.get('LOGIN_RATE_WINDOW', '60')),
+        backend=build_backend(),
+    )
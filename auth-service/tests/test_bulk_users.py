@@ -0,0 +1,141 @@
+import os
+import json
+import importlib.util
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, text
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import hashing
+
+
+def load_auth_module_with_env(env: dict):
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location("auth_service_app_bulk", str(ROOT / "app.py"))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+BASE_ENV = {'AUTH_HASH_EXECUTOR': 'thread', 'AUTH_HASH_WORKERS': '4', 'AUTH_PBKDF2_ROUNDS': '1000',
+            'USERS_JSON': json.dumps([{"email": "old@example.com", "password": "Old#1", "role": "viewer"}])}
+BATCH = [
+    {'email': 'a@example.com', 'password': 'A#1', 'names': 'A', 'role': 'manager'},
+    {'email': 'b@example.com', 'password': 'B#1'},
+    {'email': 'a@example.com', 'password': 'again'},
+    {'email': 'c@example.com'},
+    {'email': 'old@example.com', 'password': 'x'},
+    'not-an-object',
+]
+EXPECTED = ['created', 'created', 'error', 'error', 'exists', 'error']
+
+
+def test_hash_many_keeps_order_across_workers():
+    h = hashing.Hasher(rounds=1000, mode='thread', workers=3)
+    try:
+        passwords = [f'pw{i}' for i in range(10)]
+        hashes = h.hash_many(passwords)
+        assert [h.verify(p, ph)[0] for p, ph in zip(passwords, hashes)] == [True] * 10
+    finally:
+        h.shutdown()
+
+
+def test_bulk_in_memory():
+    mod = load_auth_module_with_env({**BASE_ENV, 'DATABASE_URL': ''})
+    client = mod.app.test_client()
+    r = client.post('/auth/users/bulk', json={'users': BATCH})
+    assert r.status_code == 200
+    body = r.get_json()
+    assert [x['status'] for x in body['results']] == EXPECTED
+    assert (body['created'], body['exists'], body['error']) == (2, 1, 3)
+    assert client.post('/auth/login', json={'email': 'a@example.com', 'password': 'A#1'}).get_json()['role'] == 'manager'
+    assert client.post('/auth/login', json={'email': 'b@example.com', 'password': 'B#1'}).get_json()['role'] == 'viewer'
+
+    assert client.post('/auth/users/bulk', json={'users': 'nope'}).status_code == 400
+    mod.BULK_USERS_MAX = 1
+    assert client.post('/auth/users/bulk', json=BATCH[:2]).status_code == 413
+
+
+@pytest.mark.parametrize('database_url', ['', 'sqlite:///:memory:'])
+def test_bulk_rejects_non_string_fields_per_record(database_url):
+    mod = load_auth_module_with_env({**BASE_ENV, 'DATABASE_URL': database_url, 'INIT_DB': 'true'})
+    client = mod.app.test_client()
+    r = client.post('/auth/users/bulk', json={'users': [
+        {'email': ['x'], 'password': 'p'},
+        {'email': 'n@example.com', 'password': 123},
+        {'email': 'r@example.com', 'password': 'R#1', 'role': {'x': 1}},
+        {'email': 'ok@example.com', 'password': 'Ok#1'},
+    ]})
+    assert r.status_code == 200
+    results = r.get_json()['results']
+    assert [x['status'] for x in results] == ['error', 'error', 'error', 'created']
+    assert results[0]['error'] == results[1]['error'] == 'email and password must be strings'
+    assert results[2]['error'] == 'role must be a string'
+
+
+def test_bulk_db_uses_multi_row_inserts_in_one_transaction():
+    mod = load_auth_module_with_env({**BASE_ENV, 'DATABASE_URL': 'sqlite:///:memory:', 'INIT_DB': 'true'})
+    client = mod.app.test_client()
+    users = [{'email': f'u{i}@example.com', 'password': f'P#{i}', 'role': 'viewer'} for i in range(320)]
+    with mod.app.app_context():
+        engine = mod.db.engine
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        r = client.post('/auth/users/bulk', json={'users': users + BATCH})
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert r.status_code == 200
+    assert [x['status'] for x in r.get_json()['results'][320:]] == EXPECTED
+    inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT INTO USERS')]
+    # 322 new users in chunks of BULK_INSERT_CHUNK
+    assert len(inserts) == 3
+    assert client.post('/auth/login', json={'email': 'u7@example.com', 'password': 'P#7'}).status_code == 200
+    with mod.app.app_context():
+        assert mod.db.session.execute(text('SELECT count(*) FROM users')).scalar() == 1 + 322
+        assert mod.db.session.execute(text("SELECT role FROM users WHERE email='a@example.com'")).scalar() == 'manager'
+
+
+def test_bulk_db_failure_rolls_back_everything(monkeypatch):
+    mod = load_auth_module_with_env({**BASE_ENV, 'DATABASE_URL': 'sqlite:///:memory:', 'INIT_DB': 'true'})
+    real_insert = mod._insert_users
+
+    def failing(records, cols):
+        real_insert(records, cols)
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr(mod, '_insert_users', failing)
+    r = mod.app.test_client().post('/auth/users/bulk', json=BATCH[:2])
+    assert r.status_code == 500
+    with mod.app.app_context():
+        assert mod.db.session.execute(text('SELECT count(*) FROM users')).scalar() == 1
+
+
+def test_bulk_db_roles_api_schema_maps_roles(tmp_path):
+    path = tmp_path / 'roles.db'
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, names TEXT, email TEXT UNIQUE NOT NULL, password TEXT)')
+    conn.commit()
+    conn.close()
+    mod = load_auth_module_with_env({**BASE_ENV, 'DATABASE_URL': f'sqlite:///{path}', 'INIT_DB': 'true'})
+    r = mod.app.test_client().post('/auth/users/bulk', json={'users': BATCH[:2]})
+    assert [x['status'] for x in r.get_json()['results']] == ['created', 'created']
+    with mod.app.app_context():
+        rows = mod.db.session.execute(text(
+            'SELECT u.email, u.names, r.role FROM users u LEFT JOIN auth_user_roles r ON r.user_id = u.id '
+            "WHERE u.email IN ('a@example.com', 'b@example.com') ORDER BY u.email")).fetchall()
+    assert [tuple(r) for r in rows] == [('a@example.com', 'A', 'manager'), ('b@example.com', 'b@example.com', None)]
@@ -0,0 +1,136 @@
+import os
+import json
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import hashing
+
+
+def load_auth_module_with_env(env: dict):
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location("auth_service_app_hashing", str(ROOT / "app.py"))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+@pytest.mark.parametrize('mode', hashing.MODES)
+def test_hasher_modes_round_trip(mode):
+    h = hashing.Hasher(rounds=1000, mode=mode, workers=2)
+    try:
+        stored = h.hash('S3cret!')
+        assert '$1000$' in stored
+        assert h.verify('S3cret!', stored) == (True, None)
+        assert h.verify('wrong', stored) == (False, None)
+        assert h.verify('S3cret!', 'not-a-hash') == (False, None)
+    finally:
+        h.shutdown()
+
+
+def test_verify_returns_upgrade_when_cost_changes():
+    old = hashing.hash_password('pw', 1000)
+    valid, new_hash = hashing.Hasher(rounds=1500, mode='inline').verify('pw', old)
+    assert valid and '$1500$' in new_hash
+    with pytest.raises(ValueError):
+        hashing.Hasher(mode='gpu')
+
+
+def test_process_pool_is_small_and_not_forked(monkeypatch):
+    monkeypatch.delenv('AUTH_HASH_WORKERS', raising=False)
+    h = hashing.from_env()
+    assert h.workers == hashing.DEFAULT_WORKERS
+    try:
+        pool = h._pool()
+        assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+        assert h.hash_many(['a', 'b', 'c']) and h.verify('a', hashing.hash_password('a', 1000))[0]
+    finally:
+        h.shutdown()
+    monkeypatch.setenv('AUTH_HASH_WORKERS', '3')
+    assert hashing.from_env().workers == 3
+
+
+def test_concurrent_first_use_starts_one_pool(monkeypatch):
+    import threading
+    import time
+    created = []
+
+    class SlowPool(hashing.ThreadPoolExecutor):
+        def __init__(self, *a, **kw):
+            time.sleep(0.05)  # widen the window between the None check and the assignment
+            created.append(self)
+            super().__init__(*a, **kw)
+
+    monkeypatch.setattr(hashing, 'ThreadPoolExecutor', SlowPool)
+    h = hashing.Hasher(rounds=1000, mode='thread', workers=2)
+    start = threading.Barrier(8)
+
+    def first_use():
+        start.wait()
+        h._pool()
+
+    threads = [threading.Thread(target=first_use) for _ in range(8)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(created) == 1
+    finally:
+        h.shutdown()
+
+
+def test_memory_seed_users_are_hashed_lazily():
+    mod = load_auth_module_with_env({
+        'DATABASE_URL': '', 'AUTH_PBKDF2_ROUNDS': '1000', 'AUTH_HASH_EXECUTOR': 'inline',
+        'USERS_JSON': json.dumps([{"email": "lazy@example.com", "password": "Lazy#1", "role": "viewer"}]),
+    })
+    user = mod.USERS['lazy@example.com']
+    assert user['pwd_hash'] is None
+    client = mod.app.test_client()
+    assert client.post('/auth/login', json={'email': 'lazy@example.com', 'password': 'nope'}).status_code == 401
+    assert user['pwd_hash'] is None
+    assert client.post('/auth/login', json={'email': 'lazy@example.com', 'password': 'Lazy#1'}).status_code == 200
+    assert '$1000$' in user['pwd_hash'] and 'seed_password' not in user
+    assert client.post('/auth/login', json={'email': 'lazy@example.com', 'password': 'Lazy#1'}).status_code == 200
+
+
+def test_memory_login_rehashes_on_cost_change():
+    mod = load_auth_module_with_env({
+        'DATABASE_URL': '', 'AUTH_PBKDF2_ROUNDS': '1200', 'AUTH_HASH_EXECUTOR': 'thread', 'USERS_JSON': '[]',
+    })
+    mod.USERS['old@example.com'] = {'pwd_hash': hashing.hash_password('Old#1', 1000), 'role': 'viewer'}
+    r = mod.app.test_client().post('/auth/login', json={'email': 'old@example.com', 'password': 'Old#1'})
+    assert r.status_code == 200
+    assert '$1200$' in mod.USERS['old@example.com']['pwd_hash']
+
+
+def test_db_login_rehashes_stored_hash_in_process_pool():
+    mod = load_auth_module_with_env({
+        'DATABASE_URL': 'sqlite:///:memory:', 'INIT_DB': 'true', 'AUTH_PBKDF2_ROUNDS': '1300',
+        'AUTH_HASH_EXECUTOR': 'process', 'AUTH_HASH_WORKERS': '2', 'USERS_JSON': '[]',
+    })
+    try:
+        with mod.app.app_context():
+            mod.db.session.execute(mod.User.__table__.insert().values(email='db@example.com', pwd_hash=hashing.hash_password('Db#1', 1000), role='viewer'))
+            mod.db.session.commit()
+        r = mod.app.test_client().post('/auth/login', json={'email': 'db@example.com', 'password': 'Db#1'})
+        assert r.status_code == 200
+        with mod.app.app_context():
+            stored = mod.db.session.execute(mod.text("SELECT pwd_hash FROM users WHERE email='db@example.com'")).scalar()
+        assert '$1300$' in stored
+    finally:
+        mod.hasher.shutdown()
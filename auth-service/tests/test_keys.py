@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import importlib.util
+import sys
+from pathlib import Path
+
+import jwt
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import keys
+
+
+def load_auth_module_with_env(env: dict):
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location("auth_service_app_keys", str(ROOT / "app.py"))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+@pytest.mark.parametrize('algorithm', keys.ALGORITHMS)
+def test_rotation_keeps_old_tokens_verifiable(tmp_path, algorithm):
+    ring = keys.KeyRing(algorithm, str(tmp_path))
+    first = ring.active_kid
+    old_token = ring.sign({'sub': 'a'})
+    assert jwt.get_unverified_header(old_token)['kid'] == first
+
+    second = ring.rotate()
+    assert ring.active_kid == second
+    # several rotations in a row still sort in creation order
+    assert [ring.rotate() for _ in range(5)] == sorted(ring.jwks()['keys'][i]['kid'] for i in range(2, 7))
+    for kid in [k['kid'] for k in ring.jwks()['keys']][2:]:
+        os.remove(tmp_path / f'{kid}.pem')
+    new_token = ring.sign({'sub': 'b'})
+    assert jwt.get_unverified_header(new_token)['kid'] == second
+    assert ring.decode(old_token)['sub'] == 'a'
+    assert ring.decode(new_token)['sub'] == 'b'
+    assert [k['kid'] for k in ring.jwks()['keys']] == [first, second]
+    assert all(k['alg'] == algorithm and k['use'] == 'sig' and 'd' not in k for k in ring.jwks()['keys'])
+
+    # `first` was retired when `second` was created, moments ago: nothing to prune yet
+    assert ring.prune(older_than=900) == []
+    assert ring.decode(old_token)['sub'] == 'a'
+    with pytest.raises(ValueError):
+        ring.prune(older_than=60)
+    assert ring.prune(older_than=60, token_ttl=0) == []
+
+
+def test_prune_counts_age_from_retirement(tmp_path, capsys):
+    day = 86400
+    now = time.time()
+    kid = lambda age: time.strftime('%Y%m%d%H%M%S', time.gmtime(now - age)) + '000000-' + f'{age:08d}'[-8:]
+    ring = keys.KeyRing('EdDSA', str(tmp_path))
+    for name in (kid(60 * day), kid(30 * day), kid(3600)):
+        (tmp_path / f'{name}.pem').write_bytes((tmp_path / f'{ring.active_kid}.pem').read_bytes())
+    # every file is old on disk; only retirement (the next kid's creation) matters
+    for pem in tmp_path.iterdir():
+        os.utime(pem, (0, 0))
+    active = ring.active_kid
+    # 60d key retired 30d ago; 30d key retired an hour ago; the 1h key was retired by the
+    # initially generated (active) key just now
+    assert ring.prune(older_than=7 * day) == [kid(60 * day)]
+    assert sorted(p.stem for p in tmp_path.glob('*.pem')) == [kid(30 * day), kid(3600), active]
+    assert ring.prune(older_than=1800) == [kid(30 * day)]
+    assert ring.active_kid == active
+
+    with pytest.raises(SystemExit):
+        keys.main(['prune', '--dir', str(tmp_path), '--algorithm', 'EdDSA', '--older-than', '60'])
+    assert 'access-token lifetime' in capsys.readouterr().err
+
+
+def test_replicas_share_the_key_directory(tmp_path, capsys):
+    a = keys.KeyRing('RS256', str(tmp_path))
+    b = keys.KeyRing('RS256', str(tmp_path))
+    assert a.active_kid == b.active_kid
+    assert keys.main(['rotate', '--dir', str(tmp_path), '--algorithm', 'RS256']) == 0
+    kid = capsys.readouterr().out.strip()
+    # both replicas pick the new key up on their next use
+    assert a.active_kid == b.active_kid == kid
+    assert b.decode(a.sign({'sub': 'x'}))['sub'] == 'x'
+
+
+def test_in_memory_keyring_and_bad_algorithm():
+    ring = keys.KeyRing('EdDSA')
+    assert ring.decode(ring.sign({'sub': 'm'}))['sub'] == 'm'
+    assert ring.prune(3600) == []
+    with pytest.raises(ValueError):
+        keys.KeyRing('HS256')
+
+
+def test_app_signs_with_rs256_and_publishes_jwks(tmp_path):
+    mod = load_auth_module_with_env({
+        'DATABASE_URL': '', 'JWT_ALGORITHM': 'RS256', 'JWT_KEYS_DIR': str(tmp_path),
+        'AUTH_HASH_EXECUTOR': 'inline', 'AUTH_PBKDF2_ROUNDS': '1000',
+        'USERS_JSON': json.dumps([{"email": "rs@example.com", "password": "Rs#1", "role": "viewer"}]),
+    })
+    client = mod.app.test_client()
+    token = client.post('/auth/login', json={'email': 'rs@example.com', 'password': 'Rs#1'}).get_json()['access_token']
+    header = jwt.get_unverified_header(token)
+    assert header['alg'] == 'RS256'
+
+    r = client.get('/.well-known/jwks.json')
+    assert r.status_code == 200 and 'max-age' in r.headers['Cache-Control']
+    jwk = {k['kid']: k for k in r.get_json()['keys']}[header['kid']]
+    # anyone with the published key can verify; the shared secret is not involved
+    payload = jwt.decode(token, jwt.PyJWK(jwk).key, algorithms=['RS256'])
+    assert payload['sub'] == 'rs@example.com'
+    with pytest.raises(jwt.InvalidTokenError):
+        jwt.decode(token, mod.JWT_SECRET, algorithms=['HS256'])
+
+    assert client.get('/auth/verify', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+    assert client.post('/auth/revoke', json={'token': token}).status_code == 200
+    assert client.get('/auth/verify', headers={'Authorization': f'Bearer {token}'}).status_code == 401
+
+
+def test_hs256_publishes_no_keys():
+    mod = load_auth_module_with_env({'DATABASE_URL': '', 'JWT_ALGORITHM': 'HS256'})
+    assert mod.app.test_client().get('/.well-known/jwks.json').get_json() == {'keys': []}
+
+
+def test_hs256_tokens_from_before_the_switch_keep_verifying(tmp_path):
+    env = {'DATABASE_URL': '', 'JWT_ALGORITHM': 'RS256', 'JWT_KEYS_DIR': str(tmp_path), 'JWT_SECRET': 'migration-secret-0123456789abcdef'}
+    mod = load_auth_module_with_env(env)
+    now = int(time.time())
+    legacy = lambda **extra: jwt.encode({'sub': 'old@example.com', 'role': 'viewer', 'iat': now, 'exp': now + 600,
+                                        'jti': 'legacy', **extra}, 'migration-secret-0123456789abcdef', algorithm='HS256')
+    client = mod.app.test_client()
+    assert client.get('/auth/verify', headers={'Authorization': f'Bearer {legacy()}'}).status_code == 200
+    assert client.post('/auth/revoke', json={'token': legacy()}).status_code == 200
+    assert client.get('/auth/verify', headers={'Authorization': f'Bearer {legacy()}'}).status_code == 401
+    forged = jwt.encode({'sub': 'x', 'role': 'admin', 'exp': now + 600, 'jti': 'f'}, 'not-the-secret-0123456789abcdefgh', algorithm='HS256')
+    assert client.get('/auth/verify', headers={'Authorization': f'Bearer {forged}'}).status_code == 401
+
+    # once the window is over (or without an explicit JWT_SECRET) only the key ring verifies
+    mod = load_auth_module_with_env(dict(env, JWT_HS256_ACCEPT_UNTIL=str(now - 1)))
+    assert mod.app.test_client().get('/auth/verify', headers={'Authorization': f'Bearer {legacy(jti="l2")}'}).status_code == 401
+    old_secret = os.environ.pop('JWT_SECRET', None)
+    try:
+        mod = load_auth_module_with_env({k: v for k, v in env.items() if k != 'JWT_SECRET'})
+        assert mod.HS256_ACCEPT_UNTIL == 0.0
+    finally:
+        if old_secret is not None:
+            os.environ['JWT_SECRET'] = old_secret
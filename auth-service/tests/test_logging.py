@@ -0,0 +1,104 @@
+import io
+import os
+import json
+import logging
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import logconfig
+
+
+def load_auth_module_with_env(env: dict):
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location("auth_service_app_logging", str(ROOT / "app.py"))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def events(stream):
+    logconfig.flush()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.fixture
+def stream():
+    return io.StringIO()
+
+
+def test_redact_nested_fields_and_message_text():
+    data = {'email': 'a@x', 'password': 'p', 'nested': [{'refresh_token': 'r', 'ok': 1}]}
+    assert logconfig.redact(data) == {'email': 'a@x', 'password': '[REDACTED]',
+                                      'nested': [{'refresh_token': '[REDACTED]', 'ok': 1}]}
+    assert logconfig.redact("user=a password='s3cret' pwd_hash=abc") == \
+        "user=a password=[REDACTED] pwd_hash=[REDACTED]"
+
+
+def test_json_events_are_redacted_before_queueing(stream):
+    log = logconfig.setup(logging.getLogger('auth.test.json'), stream=stream)
+    log.info('login password=%s', 'hunter2', extra={'event': 'x', 'token': 'abc', 'email': 'a@x'})
+    [entry] = events(stream)
+    assert entry['message'] == 'login password=[REDACTED]'
+    assert entry['token'] == '[REDACTED]'
+    assert entry['event'] == 'x' and entry['email'] == 'a@x' and entry['level'] == 'INFO'
+    assert 'sampled' not in entry
+
+
+def test_traceback_text_is_redacted(stream):
+    log = logconfig.setup(logging.getLogger('auth.test.exc'), stream=stream)
+    try:
+        raise ValueError("bad login password='hunter2'")
+    except ValueError:
+        log.exception('login failed')
+    [entry] = events(stream)
+    assert 'Traceback' in entry['message'] and 'ValueError' in entry['message']
+    assert 'hunter2' not in json.dumps(entry)
+
+
+def test_sampling_drops_success_events_but_keeps_warnings(stream):
+    log = logconfig.setup(logging.getLogger('auth.test.sampling'), stream=stream, sample_rate=0.0)
+    for _ in range(50):
+        log.info('ok', extra=logconfig.SAMPLED)
+    log.info('failed')
+    log.warning('limited', extra=logconfig.SAMPLED)
+    assert [e['message'] for e in events(stream)] == ['failed', 'limited']
+
+
+def test_text_format(stream):
+    log = logconfig.setup(logging.getLogger('auth.test.text'), fmt='text', stream=stream)
+    log.info('hello secret=%s', 'x')
+    logconfig.flush()
+    assert 'INFO auth.test.text: hello secret=[REDACTED]' in stream.getvalue()
+
+
+def test_login_logs_structured_events_without_printing_passwords(stream, capsys):
+    os.environ['USERS_JSON'] = json.dumps([])
+    mod = load_auth_module_with_env({'DATABASE_URL': 'sqlite:///:memory:', 'INIT_DB': 'true',
+                                     'AUTH_HASH_EXECUTOR': 'inline'})
+    logconfig.setup(mod.log, stream=stream, sample_rate=1.0)
+    client = mod.app.test_client()
+    assert client.post('/auth/users', json={'email': 'log@example.com', 'password': 'Secret#1'}).status_code == 201
+
+    assert client.post('/auth/login', json={'email': 'nobody@example.com', 'password': 'x'}).status_code == 401
+    assert client.post('/auth/login', json={'email': 'log@example.com', 'password': 'wrong'}).status_code == 401
+    assert client.post('/auth/login', json={'email': 'log@example.com', 'password': 'Secret#1'}).status_code == 200
+
+    logged = [(e['event'], e.get('reason')) for e in events(stream) if e.get('event', '').startswith('login')]
+    assert logged == [('login_failed', 'user_not_found'), ('login_failed', 'bad_password'),
+                      ('login_succeeded', None)]
+    out = capsys.readouterr()
+    assert 'Secret#1' not in out.out + out.err and 'wrong' not in stream.getvalue()
@@ -0,0 +1,118 @@
+import os
+import json
+import importlib.util
+import sys
+from pathlib import Path
+from sqlalchemy import event, text
+from sqlalchemy.engine.interfaces import CacheStats
+
+
+def load_auth_module_with_env(env: dict):
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        root = Path(__file__).resolve().parents[1]
+        module_path = root / "app.py"
+        spec = importlib.util.spec_from_file_location("auth_service_app_login_query", str(module_path))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def _module_with_roles():
+    mod = load_auth_module_with_env({
+        'DATABASE_URL': 'sqlite:///:memory:',
+        'INIT_DB': 'true',
+        'USERS_JSON': json.dumps([{"email": "col@example.com", "password": "Col#1", "role": "viewer"}]),
+    })
+    with mod.app.app_context():
+        db = mod.db
+        db.session.execute(text('CREATE TABLE roles (id INTEGER PRIMARY KEY, name TEXT)'))
+        db.session.execute(text('CREATE TABLE user_roles (user_id INTEGER, role_id INTEGER)'))
+        db.session.execute(text("INSERT INTO roles (id, name) VALUES (1, 'manager')"))
+        for email in ('linked@example.com', 'fallback@example.com', 'norole@example.com'):
+            db.session.execute(mod.User.__table__.insert().values(email=email, password='Pw#1'))
+        uid = lambda e: db.session.execute(text('SELECT id FROM users WHERE email=:e'), {'e': e}).scalar()
+        db.session.execute(text('INSERT INTO user_roles (user_id, role_id) VALUES (:u, 1)'), {'u': uid('linked@example.com')})
+        db.session.execute(mod.AuthUserRole.__table__.insert().values(user_id=uid('fallback@example.com'), role='auditor'))
+        db.session.commit()
+    # roles/user_roles appeared after startup
+    mod.reset_login_query()
+    return mod
+
+
+def _reference_role(mod, email):
+    """Role resolved one source at a time, as the per-request lookup did before it was
+    compiled into one statement: users.role, then roles via user_roles, then auth_user_roles."""
+    with mod.app.app_context():
+        run = lambda sql: mod.db.session.execute(text(sql), {'e': email}).scalar()
+        return (run("SELECT NULLIF(role, '') FROM users WHERE email=:e")
+                or run("SELECT r.name FROM roles r JOIN user_roles ur ON ur.role_id=r.id "
+                       "JOIN users u ON u.id=ur.user_id WHERE u.email=:e LIMIT 1")
+                or run("SELECT aur.role FROM auth_user_roles aur JOIN users u ON u.id=aur.user_id "
+                       "WHERE u.email=:e LIMIT 1"))
+
+
+def _count_statements(mod, fn):
+    seen = []
+    with mod.app.app_context():
+        engine = mod.db.engine
+    listener = lambda conn, cursor, statement, params, context, executemany: seen.append((statement, context))
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    return result, seen
+
+
+def test_compiled_lookup_matches_per_source_resolution():
+    mod = _module_with_roles()
+    for email, role in (('col@example.com', 'viewer'), ('linked@example.com', 'manager'),
+                        ('fallback@example.com', 'auditor'), ('norole@example.com', None)):
+        user = mod.get_user_from_db(email)
+        assert user.role == role == _reference_role(mod, email)
+        assert user.email == email and set(vars(user)) == set(mod.LOGIN_COLUMNS)
+    assert mod.get_user_from_db('missing@example.com') is None
+
+
+def test_login_is_one_statement():
+    mod = _module_with_roles()
+    mod.get_user_from_db('linked@example.com')  # compile once
+    user, statements = _count_statements(mod, lambda: mod.get_user_from_db('linked@example.com'))
+    assert user.role == 'manager'
+    assert len(statements) == 1 and 'COALESCE' in statements[0][0]
+
+
+def test_compiled_statement_is_reused_across_logins():
+    mod = _module_with_roles()
+    mod.get_user_from_db('col@example.com')
+    compiled = mod._login_query
+    assert compiled is not None
+
+    def logins():
+        return [mod.get_user_from_db(e).role for e in ('linked@example.com', 'fallback@example.com', 'col@example.com')]
+
+    roles, statements = _count_statements(mod, logins)
+    assert roles == ['manager', 'auditor', 'viewer']
+    # same statement object, no schema inspection, and SQLAlchemy's compiled cache is hit every time
+    assert mod._login_query is compiled
+    assert len(statements) == 3 and len({sql for sql, _ in statements}) == 1
+    assert all(ctx.cache_hit is CacheStats.CACHE_HIT for _, ctx in statements)
+
+
+def test_query_rebuilt_after_schema_change():
+    mod = _module_with_roles()
+    assert mod.get_user_from_db('col@example.com').role == 'viewer'
+    with mod.app.app_context():
+        mod.db.session.execute(text('DROP TABLE user_roles'))
+        mod.db.session.commit()
+    # the compiled query references user_roles; it fails once and is recompiled
+    assert mod.get_user_from_db('col@example.com').role == 'viewer'
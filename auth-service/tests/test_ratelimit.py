@@ -0,0 +1,194 @@
+import os
+import json
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import ratelimit
+
+
+def load_auth_module_with_env(env: dict):
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location("auth_service_app_ratelimit", str(ROOT / "app.py"))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock(1_000_040.0)  # 20s into a 60s bucket
+    monkeypatch.setattr(ratelimit.time, 'time', c)
+    return c
+
+
+def test_sliding_window_weights_previous_bucket(clock):
+    limiter = ratelimit.SlidingWindowLimiter({'email': 3}, window=60)
+    assert [limiter.hit(email='a')[0] for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit(email='b')[0]
+
+    # next bucket, 30s in: the 3 counted attempts (the rejected one is not) weigh 3 * 0.5
+    clock.now += 70
+    assert limiter.hit(email='a')[0]
+    allowed, retry_after, scope = limiter.hit(email='a')
+    assert not allowed and scope == 'email'
+    # 2 + 3 * (1 - t) <= 3 once t = 2/3 of the bucket has passed: 10s from now
+    assert retry_after == 10
+    # retrying early does not push that time back
+    clock.now += 9
+    assert limiter.hit(email='a')[1] == 1
+    clock.now += 1
+    assert limiter.hit(email='a')[0]
+
+    limiter.reset('email', 'a')
+    assert limiter.hit(email='a')[0]
+
+
+def test_scopes_checked_in_order_and_zero_disables(clock):
+    limiter = ratelimit.SlidingWindowLimiter({'ip': 2, 'email': 0}, window=60)
+    assert limiter.hit(ip='1.2.3.4', email='x')[0]
+    assert limiter.hit(ip='1.2.3.4', email='y')[0]
+    assert limiter.hit(ip='1.2.3.4', email='z')[2] == 'ip'
+    assert limiter.hit(ip='5.6.7.8', email='z')[0]
+    stats = limiter.snapshot()
+    assert stats['allowed'] == 3 and stats['rejected'] == 1
+    assert stats['rejected_by_scope'] == {'ip': 1} and stats['shed_ratio'] == 0.25
+
+
+def test_idle_buckets_are_dropped(clock):
+    counters = ratelimit.MemoryCounters()
+    counters.incr('a', 10)
+    counters.incr('b', 11)
+    counters.incr('c', 12)
+    assert set(counters._buckets) == {11, 12}
+    assert counters.incr('b', 12) == (1, 1)
+    assert counters._size == 3
+
+
+def test_flood_of_distinct_keys_evicts_lru_to_low_water(clock):
+    counters = ratelimit.MemoryCounters(max_keys=100)
+    for i in range(50):
+        counters.incr(f'old{i}', 9)
+    counters.incr('hot', 10)
+    for i in range(200):
+        counters.incr(f'new{i}', 10)
+        counters.incr('hot', 10)
+    assert counters._size <= 100
+    # previous-bucket keys went first, the recently used key survives
+    assert not counters._buckets.get(9)
+    assert counters._buckets[10]['hot'] == 201
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ops = []
+
+    def pipeline(self):
+        return self
+
+    def incrby(self, name, amount):
+        self.ops.append(('incrby', name, amount))
+
+    def expire(self, name, ttl):
+        self.ops.append(('expire', name, ttl))
+
+    def get(self, name):
+        self.ops.append(('get', name))
+
+    def execute(self):
+        out = []
+        for op in self.ops:
+            if op[0] == 'incrby':
+                self.data[op[1]] = self.data.get(op[1], 0) + op[2]
+                out.append(self.data[op[1]])
+            elif op[0] == 'expire':
+                out.append(True)
+            else:
+                out.append(self.data.get(op[1]))
+        self.ops = []
+        return out
+
+    def delete(self, *names):
+        self.ops.append(('delete',) + names)
+        for name in names:
+            self.data.pop(name, None)
+
+
+def test_shared_backend_is_used_by_every_replica(clock):
+    redis = FakeRedis()
+    a = ratelimit.SlidingWindowLimiter({'email': 2}, backend=ratelimit.RedisCounters(redis))
+    b = ratelimit.SlidingWindowLimiter({'email': 2}, backend=ratelimit.RedisCounters(redis))
+    assert a.hit(email='s')[0] and b.hit(email='s')[0]
+    assert not a.hit(email='s')[0]
+    b.reset('email', 's')
+    # one DEL of the current and previous bucket keys, no keyspace scan
+    bucket = int(clock.now // 60)
+    assert redis.ops == [('delete', f'auth:rl:email:s:{bucket}', f'auth:rl:email:s:{bucket - 1}')]
+    redis.ops = []
+    assert a.hit(email='s')[0]
+    assert a.snapshot()['backend'] == 'redis'
+
+
+def test_backend_failure_falls_back_to_local_counters(clock):
+    class Down:
+        def incr(self, *args, **kwargs):
+            raise ConnectionError('redis down')
+
+    limiter = ratelimit.SlidingWindowLimiter({'email': 1}, backend=Down())
+    assert limiter.hit(email='f')[0]
+    assert not limiter.hit(email='f')[0]
+    # two attempts plus the rollback of the rejected one
+    assert limiter.snapshot()['backend_errors'] == 3
+
+
+def test_login_flood_rejected_before_hashing():
+    mod = load_auth_module_with_env({
+        'DATABASE_URL': '', 'AUTH_HASH_EXECUTOR': 'inline', 'AUTH_PBKDF2_ROUNDS': '1000',
+        'LOGIN_RATE_EMAIL': '3', 'LOGIN_RATE_IP': '100',
+        'USERS_JSON': json.dumps([{"email": "rl@example.com", "password": "Rl#1", "role": "viewer"}]),
+    })
+    client = mod.app.test_client()
+    assert client.post('/auth/login', json={'email': 'rl@example.com', 'password': 'Rl#1'}).status_code == 200
+
+    calls = []
+    real_verify = mod.hasher.verify
+    mod.hasher.verify = lambda *a: calls.append(1) or real_verify(*a)
+    codes = [client.post('/auth/login', json={'email': 'RL@example.com', 'password': 'bad'}).status_code
+             for _ in range(6)]
+    assert codes == [401, 401, 401, 429, 429, 429]
+    assert len(calls) == 0  # unknown-case email: no user, and rejected ones never reach the lookup
+    r = client.post('/auth/login', json={'email': 'rl@example.com', 'password': 'Rl#1'})
+    assert r.status_code == 429 and int(r.headers['Retry-After']) >= 1
+
+    stats = client.get('/auth/metrics').get_json()['login_rate_limit']
+    assert stats['rejected_by_scope']['email'] == 4 and stats['backend'] == 'memory'
+    assert stats['limits'] == {'email': 3, 'ip': 100}
+
+
+def test_login_rejects_non_string_credentials():
+    mod = load_auth_module_with_env({'DATABASE_URL': '', 'AUTH_HASH_EXECUTOR': 'inline'})
+    client = mod.app.test_client()
+    for body in ({'email': ['a@x'], 'password': 'p'}, {'email': 'a@x', 'password': 123}, ['a@x']):
+        assert client.post('/auth/login', json=body).status_code == 400
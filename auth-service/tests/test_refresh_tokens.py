@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, text
+
+
+def load_auth_module_with_env(env: dict):
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        root = Path(__file__).resolve().parents[1]
+        spec = importlib.util.spec_from_file_location("auth_service_app_refresh", str(root / "app.py"))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+USERS = json.dumps([{"email": "ref@example.com", "password": "Ref#1", "role": "viewer"}])
+
+
+@pytest.fixture(params=['memory', 'db'])
+def mod(request):
+    env = {'AUTH_HASH_EXECUTOR': 'inline', 'AUTH_PBKDF2_ROUNDS': '1000', 'USERS_JSON': USERS}
+    if request.param == 'db':
+        env.update({'DATABASE_URL': 'sqlite:///:memory:', 'INIT_DB': 'true'})
+    else:
+        env['DATABASE_URL'] = ''
+    return load_auth_module_with_env(env)
+
+
+def _login(client):
+    r = client.post('/auth/login', json={'email': 'ref@example.com', 'password': 'Ref#1'})
+    assert r.status_code == 200
+    return r.get_json()
+
+
+def test_login_returns_refresh_token_and_short_access_token(mod):
+    body = _login(mod.app.test_client())
+    assert body['refresh_token'] and body['refresh_expires_in'] == 14 * 86400
+    assert body['expires_in'] == 15 * 60
+
+
+def test_refresh_rotates_without_password_hashing(mod, monkeypatch):
+    client = mod.app.test_client()
+    first = _login(client)
+
+    def no_hashing(*args, **kwargs):
+        raise AssertionError('refresh must not hash passwords')
+
+    monkeypatch.setattr(mod.hasher, 'verify', no_hashing)
+    monkeypatch.setattr(mod.hasher, 'hash', no_hashing)
+    r = client.post('/auth/refresh', json={'refresh_token': first['refresh_token']})
+    assert r.status_code == 200
+    second = r.get_json()
+    assert second['refresh_token'] != first['refresh_token'] and second['role'] == 'viewer'
+    assert client.get('/auth/verify', headers={'Authorization': f"Bearer {second['access_token']}"}).status_code == 200
+    # the rotated token keeps working for exactly one more refresh
+    assert client.post('/auth/refresh', json={'refresh_token': second['refresh_token']}).status_code == 200
+
+
+def test_reuse_revokes_the_whole_family(mod):
+    client = mod.app.test_client()
+    first = _login(client)
+    other_session = _login(client)
+    second = client.post('/auth/refresh', json={'refresh_token': first['refresh_token']}).get_json()
+
+    # replaying the rotated token: someone else holds a copy
+    r = client.post('/auth/refresh', json={'refresh_token': first['refresh_token']})
+    assert r.status_code == 401 and r.get_json()['error'] == 'refresh token reuse detected'
+    assert client.post('/auth/refresh', json={'refresh_token': second['refresh_token']}).status_code == 401
+    for body in (first, second):
+        assert client.get('/auth/verify', headers={'Authorization': f"Bearer {body['access_token']}"}).status_code == 401
+    # other logins of the same user are untouched
+    assert client.post('/auth/refresh', json={'refresh_token': other_session['refresh_token']}).status_code == 200
+
+
+def test_invalid_expired_and_logout(mod, monkeypatch):
+    client = mod.app.test_client()
+    assert client.post('/auth/refresh', json={}).status_code == 400
+    assert client.post('/auth/refresh', json={'refresh_token': 'nope'}).get_json()['error'] == 'invalid refresh token'
+
+    body = _login(client)
+    later = time.time() + 15 * 86400
+    monkeypatch.setattr(mod.time, 'time', lambda: later)
+    r = client.post('/auth/refresh', json={'refresh_token': body['refresh_token']})
+    assert r.status_code == 401 and r.get_json()['error'] == 'refresh token expired'
+    monkeypatch.undo()
+
+    body = _login(client)
+    r = client.post('/auth/revoke', json={'refresh_token': body['refresh_token'], 'token': body['access_token']})
+    assert r.status_code == 200
+    assert client.post('/auth/refresh', json={'refresh_token': body['refresh_token']}).status_code == 401
+
+
+def test_db_stores_only_hashes_and_refresh_skips_the_lookup():
+    mod = load_auth_module_with_env({
+        'DATABASE_URL': 'sqlite:///:memory:', 'INIT_DB': 'true', 'AUTH_HASH_EXECUTOR': 'inline',
+        'AUTH_PBKDF2_ROUNDS': '1000', 'USERS_JSON': USERS,
+    })
+    client = mod.app.test_client()
+    body = _login(client)
+    token = body['refresh_token']
+    with mod.app.app_context():
+        stored = [r[0] for r in mod.db.session.execute(text('SELECT token_hash FROM refresh_tokens'))]
+        indexes = {i['name'] for i in mod.inspect(mod.db.engine).get_indexes('refresh_tokens')}
+    assert stored == [hashlib.sha256(token.encode()).hexdigest()]
+    assert 'ix_refresh_tokens_family' in indexes
+
+    statements = []
+    with mod.app.app_context():
+        engine = mod.db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        assert client.post('/auth/refresh', json={'refresh_token': token}).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    # issued by this process: the single-use UPDATE replaces the SELECT by token
+    refresh_selects = [s for s in statements if s.lstrip().upper().startswith('SELECT') and 'refresh_tokens' in s]
+    assert refresh_selects == []
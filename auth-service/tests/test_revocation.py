@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import importlib.util
+import sys
+from pathlib import Path
+
+import jwt
+import pytest
+
+
+def load_auth_module_with_env(env: dict):
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        root = Path(__file__).resolve().parents[1]
+        spec = importlib.util.spec_from_file_location("auth_service_app_revocation", str(root / "app.py"))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+USERS = json.dumps([{"email": "rev@example.com", "password": "Rev#1", "role": "viewer"}])
+
+
+@pytest.fixture(params=['memory', 'db'])
+def mod(request):
+    env = {'AUTH_HASH_EXECUTOR': 'inline', 'AUTH_PBKDF2_ROUNDS': '1000', 'USERS_JSON': USERS}
+    if request.param == 'db':
+        env.update({'DATABASE_URL': 'sqlite:///:memory:', 'INIT_DB': 'true'})
+    else:
+        env['DATABASE_URL'] = ''
+    return load_auth_module_with_env(env)
+
+
+def _login(client):
+    r = client.post('/auth/login', json={'email': 'rev@example.com', 'password': 'Rev#1'})
+    assert r.status_code == 200
+    return r.get_json()['access_token']
+
+
+def test_tokens_carry_unique_jti(mod):
+    client = mod.app.test_client()
+    a, b = _login(client), _login(client)
+    ja = jwt.decode(a, mod.JWT_SECRET, algorithms=['HS256'])['jti']
+    jb = jwt.decode(b, mod.JWT_SECRET, algorithms=['HS256'])['jti']
+    assert ja and jb and ja != jb
+
+
+def test_revoke_then_verify_and_list(mod):
+    client = mod.app.test_client()
+    token = _login(client)
+    other = _login(client)
+    jti = jwt.decode(token, mod.JWT_SECRET, algorithms=['HS256'])['jti']
+
+    assert client.get('/auth/verify', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+    first = client.get('/auth/revocations').get_json()
+    assert first['revoked'] == []
+
+    r = client.post('/auth/revoke', headers={'Authorization': f'Bearer {token}'})
+    assert r.status_code == 200 and r.get_json() == {'revoked': True, 'jti': jti}
+    # revoking twice is harmless
+    assert client.post('/auth/revoke', json={'token': token}).status_code == 200
+
+    r = client.get('/auth/verify', headers={'Authorization': f'Bearer {token}'})
+    assert r.status_code == 401 and r.get_json()['error'] == 'token revoked'
+    assert client.get('/auth/verify', headers={'Authorization': f'Bearer {other}'}).status_code == 200
+
+    listed = client.get('/auth/revocations').get_json()['revoked']
+    assert [e['jti'] for e in listed] == [jti]
+    # incremental sync: the cursor trails the clock by the margin, so a fresh cursor still
+    # covers the revocation; once the margin has passed nothing new is returned
+    later = client.get('/auth/revocations').get_json()['generated_at']
+    assert later <= time.time() - mod.REVOCATION_SYNC_MARGIN
+    assert [e['jti'] for e in client.get(f'/auth/revocations?since={later}').get_json()['revoked']] == [jti]
+    assert client.get(f'/auth/revocations?since={time.time()}').get_json()['revoked'] == []
+    assert [e['jti'] for e in client.get(f"/auth/revocations?since={first['generated_at']}").get_json()['revoked']] == [jti]
+
+
+def test_revoke_rejects_bad_input(mod):
+    client = mod.app.test_client()
+    assert client.post('/auth/revoke', json={}).status_code == 400
+    assert client.post('/auth/revoke', json={'token': 'garbage'}).status_code == 401
+    no_jti = jwt.encode({'sub': 'x', 'exp': int(time.time()) + 60}, mod.JWT_SECRET, algorithm='HS256')
+    assert client.post('/auth/revoke', json={'token': no_jti}).status_code == 400
+    assert client.get('/auth/revocations?since=soon').status_code == 400
+
+
+def test_expired_revocations_are_pruned(mod):
+    mod.revoke_token('gone', int(time.time()) - 1)
+    mod.revoke_token('live', int(time.time()) + 60)
+    assert [e['jti'] for e in mod.list_revocations()] == ['live']
+
+
+def test_revocation_committed_after_a_sync_is_not_missed(mod):
+    """revoked_at is stamped before the commit: a row stamped just before a sync but
+    committed after it must still reach the client on the following sync."""
+    client = mod.app.test_client()
+    stamped = time.time()
+    cursor = client.get('/auth/revocations').get_json()['generated_at']
+    real_time = mod.time.time
+    mod.time.time = lambda: stamped
+    try:
+        mod.revoke_token('slow-commit', int(stamped) + 60)
+    finally:
+        mod.time.time = real_time
+    listed = client.get(f'/auth/revocations?since={cursor}').get_json()['revoked']
+    assert [e['jti'] for e in listed] == ['slow-commit']
+
+
+def test_polling_does_not_delete(mod):
+    mod.revoke_token('gone', int(time.time()) - 1)
+    mod._revocations_purged_at = time.time()
+    mod.revoke_token('later', int(time.time()) - 1)
+    client = mod.app.test_client()
+    assert client.get('/auth/revocations').get_json()['revoked'] == []
+    # the expired row is still stored until the periodic purge runs
+    assert mod.is_token_revoked('later')
+    mod.purge_revocations(interval=0)
+    assert not mod.is_token_revoked('later')
@@ -3,7 +3,7 @@ Logging de requests HTTP
 """
 import time
 from flask import request, g
-from app.core.utils.logger import get_logger
+from app.core.utils.logger import SAMPLED, get_logger
 
 logger = get_logger(__name__)
 
@@ -25,10 +25,11 @@ class RequestLogger:
         """Se ejecuta antes de cada request"""
         g.start_time = time.time()
         
-        # Log de request entrante
+        # Log de request entrante (muestreado: la respuesta se registra igualmente)
         logger.info(
-            f'Request: {request.method} {request.path}',
+            'Request: %s %s', request.method, request.path,
             extra={
+                **SAMPLED,
                 'method': request.method,
                 'path': request.path,
                 'remote_addr': request.remote_addr,
@@ -42,11 +43,11 @@ class RequestLogger:
         if hasattr(g, 'start_time'):
             elapsed = time.time() - g.start_time
             
-            # Log de response
+            # Log de response; las respuestas correctas se muestrean (LOG_SAMPLE_RATE)
             logger.info(
-                f'Response: {request.method} {request.path} - '
-                f'{response.status_code} ({elapsed:.3f}s)',
+                'Response: %s %s - %s (%.3fs)', request.method, request.path, response.status_code, elapsed,
                 extra={
+                    'sampled': response.status_code < 400,
                     'method': request.method,
                     'path': request.path,
                     'status_code': response.status_code,
@@ -21,11 +21,20 @@ class Config:
     
     # JWT
     JWT_SECRET = os.environ.get('JWT_SECRET', 'your-super-secret-jwt-key')
-    JWT_ALGORITHM = 'HS256'
+    # HS256 usa JWT_SECRET; RS256/EdDSA usan las claves públicas del JWKS de auth-service
+    # (se admiten varios separados por coma, p. ej. "HS256,RS256", durante la migración)
+    JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+    JWT_JWKS_URL = os.environ.get('JWT_JWKS_URL')
+    JWKS_REFRESH_SECONDS = float(os.environ.get('JWKS_REFRESH_SECONDS', '300'))
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     
     # Auth Service
     AUTH_SERVICE_URL = os.environ.get('AUTH_SERVICE_URL', 'http://localhost:9001')
+    # Verificación local de tokens: caché LRU y sincronización de la lista de revocados
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+    REVOCATION_SYNC_SECONDS = float(os.environ.get('REVOCATION_SYNC_SECONDS', '30'))
+    # Llamar a /auth/verify cuando la verificación local falla (desactivado por defecto)
+    AUTH_REMOTE_FALLBACK = os.environ.get('AUTH_REMOTE_FALLBACK', 'False').lower() == 'true'
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
@@ -33,6 +42,9 @@ class Config:
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'logs/inventory-service.log')
+    # json | text; fracción de eventos de éxito muestreables que se conservan
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.1'))
     
     # Search Performance
     SEARCH_TIMEOUT = float(os.environ.get('SEARCH_TIMEOUT', '1.0'))
@@ -67,7 +79,8 @@ class ProductionConfig(Config):
         
         # Validar que existan variables críticas
         assert os.environ.get('DATABASE_URL'), 'DATABASE_URL must be set'
-        assert os.environ.get('JWT_SECRET'), 'JWT_SECRET must be set'
+        if 'HS' in os.environ.get('JWT_ALGORITHM', 'HS256'):
+            assert os.environ.get('JWT_SECRET'), 'JWT_SECRET must be set'
 
 
 class TestingConfig(Config):
@@ -85,6 +98,9 @@ class TestingConfig(Config):
     # Timeout más alto para tests
     SEARCH_TIMEOUT = 5.0
 
+    # Sin sincronización de revocados contra un auth-service real
+    REVOCATION_SYNC_SECONDS = 0
+
 
 config_by_name = {
     'development': DevelopmentConfig,
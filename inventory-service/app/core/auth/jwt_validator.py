@@ -7,6 +7,8 @@ from functools import wraps
 from flask import current_app, request
 from typing import Dict, Optional
 
+from app.core.auth.token_verifier import TokenRevokedError, get_verifier
+
 
 class JWTValidator:
     """Validador de tokens JWT"""
@@ -14,7 +16,7 @@ class JWTValidator:
     @staticmethod
     def decode_token(token: str) -> Dict:
         """
-        Decodifica un token JWT
+        Decodifica un token JWT localmente (con caché hasta su expiración)
         
         Args:
             token: Token JWT a decodificar
@@ -25,14 +27,12 @@ class JWTValidator:
         Raises:
             jwt.ExpiredSignatureError: Token expirado
             jwt.InvalidTokenError: Token inválido
+            TokenRevokedError: Token revocado en auth-service
         """
         try:
-            payload = jwt.decode(
-                token,
-                current_app.config['JWT_SECRET'],
-                algorithms=[current_app.config['JWT_ALGORITHM']]
-            )
-            return payload
+            return get_verifier().verify(token)
+        except TokenRevokedError:
+            raise
         except jwt.ExpiredSignatureError:
             raise jwt.ExpiredSignatureError('Token expirado')
         except jwt.InvalidTokenError:
@@ -103,14 +103,17 @@ class JWTValidator:
             return None, 'Token no proporcionado'
         
         try:
-            # Primero intentar decodificar localmente
+            # Verificación local; auth-service no participa en cada petición
             payload = JWTValidator.decode_token(token)
             return payload, None
         except jwt.ExpiredSignatureError:
             return None, 'Token expirado'
+        except TokenRevokedError:
+            return None, 'Token revocado'
         except jwt.InvalidTokenError:
-            # Si falla, intentar con el servicio de auth
-            payload = JWTValidator.verify_with_auth_service(token)
-            if payload:
-                return payload, None
+            # Consulta remota solo si se habilita explícitamente (AUTH_REMOTE_FALLBACK)
+            if current_app.config.get('AUTH_REMOTE_FALLBACK'):
+                payload = JWTValidator.verify_with_auth_service(token)
+                if payload:
+                    return payload, None
             return None, 'Token inválido'
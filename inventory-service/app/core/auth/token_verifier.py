@@ -0,0 +1,250 @@
+"""
+Local JWT verification shared by the services that accept auth-service tokens.
+
+Signatures are checked in-process; verified payloads are kept in a bounded LRU
+until the token's `exp`, so repeated requests with the same token skip the
+decode. Revoked tokens are rejected through a revocation list that auth-service
+publishes at GET /auth/revocations and that is synced in the background every
+REVOCATION_SYNC_SECONDS, so auth-service is not on the per-request path.
+
+HS256 tokens are checked with the shared secret. RS256/EdDSA tokens are checked
+with the public key named by their `kid`, taken from auth-service's JWKS
+(GET /.well-known/jwks.json). The keyset is cached, refreshed in the background
+every JWKS_REFRESH_SECONDS, and refetched at once (rate limited) when a token
+names a kid it does not know yet, i.e. right after a key rotation. JWT_ALGORITHM
+may list several algorithms ("HS256,RS256") while services migrate.
+
+Config keys: JWT_SECRET (or JWT_SECRET_KEY), JWT_ALGORITHM, AUTH_SERVICE_URL,
+JWT_JWKS_URL (default AUTH_SERVICE_URL + /.well-known/jwks.json),
+JWKS_REFRESH_SECONDS (default 300), TOKEN_CACHE_SIZE (default 10000),
+REVOCATION_SYNC_SECONDS (default 30, 0 disables).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+import requests
+from flask import current_app
+
+
+class TokenRevokedError(jwt.InvalidTokenError):
+    """The token was valid but has been revoked in auth-service."""
+
+
+class RevocationList:
+    """Revoked token ids (jti -> exp) mirrored from auth-service."""
+
+    def __init__(self, url, interval=30.0, timeout=2.0):
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self._revoked = {}
+        self._since = None
+        self._next_sync = 0.0
+        self._syncing = False
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti):
+        return jti in self._revoked
+
+    def maybe_sync(self):
+        """Start a background sync when one is due; never blocks the caller."""
+        now = time.monotonic()
+        with self._lock:
+            if self._syncing or now < self._next_sync:
+                return
+            self._syncing = True
+            self._next_sync = now + self.interval
+        threading.Thread(target=self._sync_quietly, daemon=True).start()
+
+    def _sync_quietly(self):
+        try:
+            self.sync()
+        except Exception:
+            # keep serving the last known list; the next interval retries
+            pass
+        finally:
+            with self._lock:
+                self._syncing = False
+
+    def sync(self):
+        """Fetch revocations (only new ones after the first sync) and drop expired entries."""
+        params = {'since': self._since} if self._since is not None else None
+        resp = requests.get(self.url, params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        now = time.time()
+        with self._lock:
+            for item in data.get('revoked', []):
+                self._revoked[item['jti']] = item.get('exp')
+            self._revoked = {j: exp for j, exp in self._revoked.items() if exp is None or exp > now}
+            self._since = data.get('generated_at', self._since)
+
+    def add(self, jti, exp=None):
+        with self._lock:
+            self._revoked[jti] = exp
+
+
+class JWKSKeySet:
+    """Public keys by kid, mirrored from an auth-service JWKS endpoint."""
+
+    def __init__(self, url, interval=300.0, min_interval=10.0, timeout=2.0):
+        self.url = url
+        self.interval = interval
+        # an unknown kid triggers at most one fetch per min_interval
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self._keys = {}
+        self._fetched_at = None
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def refresh(self):
+        resp = requests.get(self.url, timeout=self.timeout)
+        resp.raise_for_status()
+        keys = {}
+        for data in resp.json().get('keys', []):
+            try:
+                jwk = jwt.PyJWK(data)
+            except jwt.PyJWKError:
+                continue  # key type this verifier cannot use
+            if jwk.key_id:
+                keys[jwk.key_id] = jwk.key
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        self._next_refresh = self._fetched_at + self.interval
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception:
+            # keep the cached keys; the next interval retries
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def maybe_refresh(self):
+        """Start a background refresh when one is due; never blocks the caller."""
+        now = time.monotonic()
+        with self._lock:
+            if self._refreshing or now < self._next_refresh:
+                return
+            self._refreshing = True
+            self._next_refresh = now + self.interval
+        threading.Thread(target=self._refresh_quietly, daemon=True).start()
+
+    def get(self, kid):
+        """Key for kid, fetching the keyset when the kid is unknown; raises jwt.InvalidTokenError."""
+        key = self._keys.get(kid)
+        if key is not None:
+            self.maybe_refresh()
+            return key
+        with self._fetch_lock:
+            key = self._keys.get(kid)
+            recent = self._fetched_at is not None and time.monotonic() - self._fetched_at < self.min_interval
+            if key is None and not recent:
+                try:
+                    self.refresh()
+                except (requests.RequestException, ValueError) as e:
+                    raise jwt.InvalidTokenError(f'JWKS unavailable: {e}') from e
+                key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError('Unknown signing key')
+        return key
+
+
+class TokenVerifier:
+    def __init__(self, secret, algorithms=('HS256',), cache_size=10000, revocations=None, keys=None):
+        self.secret = secret
+        self.algorithms = list(algorithms)
+        self.cache_size = cache_size
+        self.revocations = revocations
+        self.keys = keys
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, token):
+        with self._lock:
+            payload = self._cache.get(token)
+            if payload is None:
+                return None
+            exp = payload.get('exp')
+            if exp is not None and exp <= time.time():
+                del self._cache[token]
+                raise jwt.ExpiredSignatureError('Signature has expired')
+            self._cache.move_to_end(token)
+            return payload
+
+    def _store(self, token, payload):
+        with self._lock:
+            self._cache[token] = payload
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _decode(self, token):
+        header = jwt.get_unverified_header(token)
+        alg = header.get('alg')
+        if alg not in self.algorithms:
+            raise jwt.InvalidAlgorithmError('The specified alg value is not allowed')
+        if alg.startswith('HS'):
+            if not self.secret:
+                raise jwt.InvalidTokenError('No secret configured for ' + alg)
+            key = self.secret
+        elif self.keys is not None:
+            key = self.keys.get(header.get('kid'))
+        else:
+            raise jwt.InvalidTokenError('No JWKS configured for ' + alg)
+        # a single algorithm per key: an RSA public key can never be used as an HMAC secret
+        return jwt.decode(token, key, algorithms=[alg])
+
+    def verify(self, token):
+        """Return the token payload; raises jwt.ExpiredSignatureError, TokenRevokedError
+        or jwt.InvalidTokenError."""
+        if self.revocations is not None:
+            self.revocations.maybe_sync()
+        payload = self._cached(token)
+        if payload is None:
+            payload = self._decode(token)
+            self._store(token, payload)
+        jti = payload.get('jti')
+        if jti and self.revocations is not None and self.revocations.is_revoked(jti):
+            raise TokenRevokedError('Token has been revoked')
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def get_verifier(app=None):
+    """Verifier for the app, rebuilt when the signing configuration changes."""
+    app = app or current_app._get_current_object()
+    secret = app.config.get('JWT_SECRET') or app.config.get('JWT_SECRET_KEY')
+    algorithms = [a.strip() for a in (app.config.get('JWT_ALGORITHM') or 'HS256').split(',') if a.strip()]
+    auth_url = app.config.get('AUTH_SERVICE_URL')
+    jwks_url = app.config.get('JWT_JWKS_URL')
+    if not jwks_url and auth_url:
+        jwks_url = auth_url.rstrip('/') + '/.well-known/jwks.json'
+    verifier = app.extensions.get('token_verifier')
+    if (verifier is not None and verifier.secret == secret and verifier.algorithms == algorithms
+            and getattr(verifier.keys, 'url', None) == (jwks_url if _asymmetric(algorithms) else None)):
+        return verifier
+    revocations = None
+    interval = float(app.config.get('REVOCATION_SYNC_SECONDS', 30))
+    if auth_url and interval > 0:
+        revocations = RevocationList(auth_url.rstrip('/') + '/auth/revocations', interval)
+    keys = None
+    if jwks_url and _asymmetric(algorithms):
+        keys = JWKSKeySet(jwks_url, float(app.config.get('JWKS_REFRESH_SECONDS', 300)))
+    verifier = TokenVerifier(secret, algorithms, int(app.config.get('TOKEN_CACHE_SIZE', 10000)), revocations, keys)
+    app.extensions['token_verifier'] = verifier
+    return verifier
+
+
+def _asymmetric(algorithms):
+    return any(not a.startswith('HS') for a in algorithms)
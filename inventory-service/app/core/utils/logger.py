@@ -1,29 +1,141 @@
 """
 Sistema de logging centralizado
+
+Los registros se emiten a través de un QueueHandler: el hilo del request solo
+encola el registro y un QueueListener en segundo plano escribe en consola y
+archivo, de modo que la E/S no se suma a la latencia.
+
+- Formato: LOG_FORMAT=json (una línea JSON por evento, con los campos de
+  `extra`) o text (formato clásico).
+- Muestreo: los eventos de éxito marcados con `extra=SAMPLED` (p. ej. una
+  línea por fila en la carga masiva) se conservan con probabilidad
+  LOG_SAMPLE_RATE; advertencias y errores nunca se descartan.
+- Redacción: los campos de credenciales (password, token, secret, ...) se
+  reemplazan por '[REDACTED]' tanto en `extra` como en el mensaje, incluida
+  la traza de la excepción.
+
+Este módulo es idéntico en crm-service y la redacción coincide con
+auth-service/logconfig.py: cada servicio se construye con su propio contexto
+Docker, así que no hay un paquete común que importar. Cambiarlos juntos.
 """
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import re
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask.logging import default_handler
+
+# extra para eventos de éxito repetitivos que pueden muestrearse
+SAMPLED = {'sampled': True}
+
+REDACTED = '[REDACTED]'
+SENSITIVE_KEYS = re.compile(r'pass(word)?|pwd|secret|token|authorization|api[_-]?key|cookie', re.IGNORECASE)
+# clave=valor / clave: valor dentro del texto del mensaje
+_SENSITIVE_IN_TEXT = re.compile(
+    r'''((?:pass(?:word)?|pwd_hash|pwd|secret|token|authorization|api[_-]?key)\w*['"]?\s*[=:]\s*)('[^']*'|"[^"]*"|[^\s,;}]+)''',
+    re.IGNORECASE)
+
+# atributos propios de LogRecord; el resto proviene de `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+def redact(value):
+    """Copia de value con los campos de credenciales ocultos."""
+    if isinstance(value, dict):
+        return {k: REDACTED if isinstance(k, str) and SENSITIVE_KEYS.search(k) else redact(v)
+                for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(v) for v in value)
+    if isinstance(value, str):
+        return _SENSITIVE_IN_TEXT.sub(lambda m: m.group(1) + REDACTED, value)
+    return value
+
+
+class SamplingFilter(logging.Filter):
+    """Descarta una fracción de los eventos marcados como muestreables."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or record.levelno >= logging.WARNING:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class RedactionFilter(logging.Filter):
+    """Oculta credenciales antes de que el registro salga del hilo del request."""
+
+    def filter(self, record):
+        record.msg = redact(record.getMessage())
+        record.args = None
+        for key, value in list(vars(record).items()):
+            if key in _RECORD_ATTRS:
+                continue
+            setattr(record, key, REDACTED if SENSITIVE_KEYS.search(key) else redact(value))
+        return True
+
+
+class RedactingQueueHandler(QueueHandler):
+    """QueueHandler.prepare añade la traza al mensaje después de los filtros;
+    el texto final se vuelve a redactar."""
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.msg = record.message = redact(record.msg)
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de `extra`."""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != 'sampled':
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
 
 
 def setup_logger(app):
     """
     Configura el sistema de logging para la aplicación
-    
+
     Args:
         app: Instancia de Flask
     """
+    global _listener
+
     log_level = getattr(logging, app.config['LOG_LEVEL'].upper())
     log_file = app.config['LOG_FILE']
-    
+
     # Crear directorio de logs si no existe
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
+
     # Formato de logs
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
-    )
-    
+    if app.config.get('LOG_FORMAT', 'json') == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+        )
+
     # Handler para archivo
     file_handler = RotatingFileHandler(
         log_file,
@@ -32,29 +144,57 @@ def setup_logger(app):
     )
     file_handler.setFormatter(formatter)
     file_handler.setLevel(log_level)
-    
+
     # Handler para consola
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.setLevel(log_level)
-    
-    # Configurar logger de la app
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(console_handler)
+
+    # Reemplazar la configuración de una llamada anterior (una app por test)
+    flush_logs()
+    for handler in list(app.logger.handlers):
+        if isinstance(handler, QueueHandler):
+            app.logger.removeHandler(handler)
+
+    # Los requests solo encolan; el listener escribe en segundo plano
+    log_queue = queue.SimpleQueue()
+    queue_handler = RedactingQueueHandler(log_queue)
+    queue_handler.setLevel(log_level)
+    queue_handler.addFilter(SamplingFilter(float(app.config.get('LOG_SAMPLE_RATE', 1.0))))
+    queue_handler.addFilter(RedactionFilter())
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+    # Configurar logger de la app (sin el handler síncrono de Flask)
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(queue_handler)
     app.logger.setLevel(log_level)
-    
+
     # Desactivar logs de werkzeug en desarrollo
     if app.config['DEBUG']:
         logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
 
+def flush_logs():
+    """Detiene el listener vaciando la cola (al salir del proceso)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(flush_logs)
+
+
 def get_logger(name):
     """
     Obtiene un logger por nombre
-    
+
     Args:
         name: Nombre del módulo
-        
+
     Returns:
         Logger configurado
     """
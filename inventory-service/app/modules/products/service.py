@@ -20,7 +20,7 @@ from app.modules.products.repository import (
 )
 from app.modules.products.models import Product, ProductFile, Categoria, UnidadMedida, Proveedor
 from app.core.exceptions import ValidationError, ConflictError, BusinessError, ResourceNotFoundError
-from app.core.utils.logger import get_logger
+from app.core.utils.logger import SAMPLED, get_logger
 
 logger = get_logger(__name__)
 
@@ -532,13 +532,14 @@ class ProductService:
                 })
                 results['success_count'] += 1
                 
-                logger.info(f"Producto creado desde CSV: {product.codigo} - {product.nombre}")
+                # una línea por fila: se muestrea (LOG_SAMPLE_RATE) y se formatea solo si se emite
+                logger.info("Producto creado desde CSV: %s - %s", product.codigo, product.nombre, extra=SAMPLED)
                 
             except Exception as e:
                 error_msg = f"Fila {row_number}: {str(e)}"
                 results['errors'].append(error_msg)
                 results['error_count'] += 1
-                logger.warning(f"Error procesando fila {row_number}: {str(e)}")
+                logger.warning("Error procesando fila %s: %s", row_number, e)
         
         # Log final
         logger.info(f"Carga masiva completada - Exitosos: {results['success_count']}, Errores: {results['error_count']}")
@@ -671,13 +672,14 @@ class ProductService:
                 })
                 results['success_count'] += 1
                 
-                logger.info(f"Producto creado desde CSV: {product.codigo} - {product.nombre}")
+                # una línea por fila: se muestrea (LOG_SAMPLE_RATE) y se formatea solo si se emite
+                logger.info("Producto creado desde CSV: %s - %s", product.codigo, product.nombre, extra=SAMPLED)
                 
             except Exception as e:
                 error_msg = f"Fila {row_number}: {str(e)}"
                 results['errors'].append(error_msg)
                 results['error_count'] += 1
-                logger.warning(f"Error procesando fila {row_number}: {str(e)}")
+                logger.warning("Error procesando fila %s: %s", row_number, e)
         
         # Log final
         logger.info(f"Carga masiva completada - Exitosos: {results['success_count']}, Errores: {results['error_count']}")
@@ -61,6 +61,7 @@ def test_validate_token_branches(monkeypatch, app):
         assert payload is None and err is not None
 
     # decode raises InvalidTokenError -> verify_with_auth_service returns payload
+    app.config['AUTH_REMOTE_FALLBACK'] = True
     with app.test_request_context():
         monkeypatch.setattr('app.core.auth.jwt_validator.JWTValidator.extract_token_from_request', lambda: 't')
         class _E(Exception):
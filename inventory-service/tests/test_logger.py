@@ -0,0 +1,82 @@
+"""
+Tests for the queued logging setup: redaction, sampling and JSON output.
+"""
+import json
+import logging
+import logging.handlers
+
+from flask import Flask
+
+from app.core.utils import logger as logger_module
+from app.core.utils.logger import SAMPLED, JsonFormatter, RedactionFilter, SamplingFilter, redact, setup_logger
+
+
+def make_record(msg, *args, level=logging.INFO, **extra):
+    record = logging.LogRecord('test', level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_redact_dicts_and_message_text():
+    assert redact({'user': {'sub': 'a', 'token': 't'}, 'Password': 'x'}) == \
+        {'user': {'sub': 'a', 'token': '[REDACTED]'}, 'Password': '[REDACTED]'}
+    assert redact('login api_key=abc secret: "x y"') == 'login api_key=[REDACTED] secret: [REDACTED]'
+
+
+def test_redaction_filter_formats_message_and_hides_extras():
+    record = make_record('pwd=%s', 'hunter2', authorization='Bearer x', codigo='P1')
+    assert RedactionFilter().filter(record)
+    assert record.getMessage() == 'pwd=[REDACTED]'
+    assert record.authorization == '[REDACTED]'
+    assert record.codigo == 'P1'
+
+
+def test_sampling_filter_keeps_unsampled_and_warnings():
+    sampling = SamplingFilter(0.0)
+    assert not sampling.filter(make_record('row', **SAMPLED))
+    assert sampling.filter(make_record('row'))
+    assert sampling.filter(make_record('row', level=logging.WARNING, **SAMPLED))
+    assert SamplingFilter(1.0).filter(make_record('row', **SAMPLED))
+
+
+def test_json_formatter_includes_extras():
+    entry = json.loads(JsonFormatter().format(make_record('Response: %s', 200, status_code=200, **SAMPLED)))
+    assert entry['message'] == 'Response: 200'
+    assert entry['status_code'] == 200
+    assert entry['level'] == 'INFO'
+    assert 'sampled' not in entry
+
+
+def test_setup_logger_writes_through_queue(tmp_path):
+    app = Flask('logtest')
+    log_file = tmp_path / 'logs' / 'app.log'
+    app.config.update(LOG_LEVEL='INFO', LOG_FILE=str(log_file), LOG_FORMAT='json',
+                      LOG_SAMPLE_RATE=0.0, DEBUG=False)
+    setup_logger(app)
+    setup_logger(app)  # reconfiguring replaces the previous queue handler
+    assert sum(isinstance(h, logging.handlers.QueueHandler) for h in app.logger.handlers) == 1
+
+    app.logger.info('fila', extra=SAMPLED)
+    app.logger.info('token=%s', 'abc', extra={'codigo': 'P1'})
+    logger_module.flush_logs()
+
+    lines = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [line['message'] for line in lines] == ['token=[REDACTED]']
+    assert lines[0]['codigo'] == 'P1'
+
+
+def test_setup_logger_redacts_traceback_text(tmp_path):
+    app = Flask('logtest_exc')
+    log_file = tmp_path / 'logs' / 'app.log'
+    app.config.update(LOG_LEVEL='INFO', LOG_FILE=str(log_file), LOG_FORMAT='json', DEBUG=False)
+    setup_logger(app)
+    try:
+        raise RuntimeError('db auth failed token=abc123')
+    except RuntimeError:
+        app.logger.exception('carga fallida')
+    logger_module.flush_logs()
+
+    [line] = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert 'RuntimeError' in line['message']
+    assert 'abc123' not in log_file.read_text()
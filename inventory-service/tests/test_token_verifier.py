@@ -0,0 +1,231 @@
+"""
+Tests for local JWT verification, the verified-token cache and revocations.
+"""
+import time
+from unittest.mock import MagicMock
+
+import jwt
+import pytest
+
+from app.core.auth.jwt_validator import JWTValidator
+from app.core.auth.token_verifier import JWKSKeySet, RevocationList, TokenRevokedError, TokenVerifier, get_verifier
+
+
+def _token(secret='s', **claims):
+    claims.setdefault('sub', '1')
+    claims.setdefault('exp', int(time.time()) + 60)
+    return jwt.encode(claims, secret, algorithm='HS256')
+
+
+def test_verify_caches_payload_until_exp(monkeypatch):
+    verifier = TokenVerifier('s')
+    token = _token(role='admin')
+    calls = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(jwt, 'decode', lambda *a, **k: calls.append(1) or real_decode(*a, **k))
+
+    assert verifier.verify(token)['role'] == 'admin'
+    assert verifier.verify(token)['role'] == 'admin'
+    assert len(calls) == 1
+
+    # once past exp the cached entry is rejected without decoding again
+    monkeypatch.setattr(time, 'time', lambda: 2 ** 40)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(token)
+    assert len(calls) == 1
+
+
+def test_cache_is_bounded():
+    verifier = TokenVerifier('s', cache_size=2)
+    tokens = [_token(sub=str(i)) for i in range(3)]
+    for t in tokens:
+        verifier.verify(t)
+    assert list(verifier._cache) == tokens[1:]
+
+
+def test_invalid_signature_is_not_cached():
+    verifier = TokenVerifier('s')
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(_token(secret='other'))
+    assert not verifier._cache
+
+
+def test_revoked_jti_rejected_even_when_cached():
+    revocations = RevocationList('http://auth/auth/revocations', interval=3600)
+    revocations._next_sync = float('inf')
+    verifier = TokenVerifier('s', revocations=revocations)
+    token = _token(jti='abc')
+    assert verifier.verify(token)['jti'] == 'abc'
+
+    revocations.add('abc', int(time.time()) + 60)
+    with pytest.raises(TokenRevokedError):
+        verifier.verify(token)
+
+
+def test_revocation_sync_is_incremental_and_prunes(monkeypatch):
+    now = int(time.time())
+    responses = [
+        {'revoked': [{'jti': 'a', 'exp': now + 60}, {'jti': 'old', 'exp': now - 1}], 'generated_at': 100.0},
+        {'revoked': [{'jti': 'b', 'exp': now + 60}], 'generated_at': 200.0},
+    ]
+    seen = []
+
+    def fake_get(url, params=None, timeout=None):
+        seen.append(params)
+        resp = MagicMock()
+        resp.json.return_value = responses.pop(0)
+        return resp
+
+    monkeypatch.setattr('app.core.auth.token_verifier.requests.get', fake_get)
+    revocations = RevocationList('http://auth/auth/revocations')
+    revocations.sync()
+    revocations.sync()
+
+    assert seen == [None, {'since': 100.0}]
+    assert revocations.is_revoked('a') and revocations.is_revoked('b')
+    assert not revocations.is_revoked('old')
+
+
+def test_failed_background_sync_keeps_serving(monkeypatch):
+    def boom(*a, **k):
+        raise ConnectionError('auth-service down')
+
+    monkeypatch.setattr('app.core.auth.token_verifier.requests.get', boom)
+    revocations = RevocationList('http://auth/auth/revocations')
+    revocations.add('a')
+    revocations._sync_quietly()
+    assert revocations.is_revoked('a') and not revocations._syncing
+
+
+def test_get_verifier_rebuilds_on_secret_change(app):
+    with app.app_context():
+        app.config['JWT_SECRET'] = 's1'
+        first = get_verifier()
+        assert get_verifier() is first
+        app.config['JWT_SECRET'] = 's2'
+        assert get_verifier() is not first
+        # TestingConfig disables the revocation sync
+        assert get_verifier().revocations is None
+
+
+def test_validate_token_local_only(app, monkeypatch):
+    app.config['JWT_SECRET'] = 's'
+    remote = MagicMock(return_value={'sub': 'x'})
+    monkeypatch.setattr('app.core.auth.jwt_validator.JWTValidator.verify_with_auth_service', staticmethod(remote))
+
+    with app.test_request_context(headers={'Authorization': 'Bearer ' + _token(role='admin')}):
+        payload, err = JWTValidator.validate_token()
+        assert err is None and payload['role'] == 'admin'
+
+    with app.test_request_context(headers={'Authorization': 'Bearer ' + _token(secret='other')}):
+        payload, err = JWTValidator.validate_token()
+        assert payload is None and err == 'Token inválido'
+    remote.assert_not_called()
+
+
+def test_validate_token_reports_revoked(app):
+    app.config['JWT_SECRET'] = 's'
+    with app.app_context():
+        verifier = get_verifier()
+        verifier.revocations = RevocationList('http://auth/auth/revocations')
+        verifier.revocations._next_sync = float('inf')
+        verifier.revocations.add('j1')
+
+    with app.test_request_context(headers={'Authorization': 'Bearer ' + _token(jti='j1')}):
+        payload, err = JWTValidator.validate_token()
+        assert payload is None and err == 'Token revocado'
+
+
+def _rsa_key():
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _jwks(*pairs):
+    keys = []
+    for kid, key in pairs:
+        jwk = jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key(), as_dict=True)
+        jwk.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+        keys.append(jwk)
+    return {'keys': keys}
+
+
+def _rs256(key, kid, **claims):
+    claims.setdefault('sub', '1')
+    claims.setdefault('exp', int(time.time()) + 60)
+    return jwt.encode(claims, key, algorithm='RS256', headers={'kid': kid})
+
+
+def test_jwks_fetched_once_and_refetched_on_rotation(monkeypatch):
+    k1, k2 = _rsa_key(), _rsa_key()
+    published = {'keys': _jwks(('k1', k1))}
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        resp = MagicMock()
+        resp.json.return_value = published['keys']
+        return resp
+
+    monkeypatch.setattr('app.core.auth.token_verifier.requests.get', fake_get)
+    keys = JWKSKeySet('http://auth/.well-known/jwks.json', min_interval=0)
+    verifier = TokenVerifier(None, ['RS256'], keys=keys)
+
+    assert verifier.verify(_rs256(k1, 'k1'))['sub'] == '1'
+    assert verifier.verify(_rs256(k1, 'k1', sub='2'))['sub'] == '2'
+    assert calls == ['http://auth/.well-known/jwks.json']
+
+    # auth-service rotated: the unknown kid triggers one refetch, old tokens still verify
+    published['keys'] = _jwks(('k1', k1), ('k2', k2))
+    assert verifier.verify(_rs256(k2, 'k2'))['sub'] == '1'
+    assert verifier.verify(_rs256(k1, 'k1', sub='3'))['sub'] == '3'
+    assert len(calls) == 2
+
+
+def test_unknown_kid_refetch_is_rate_limited(monkeypatch):
+    k1 = _rsa_key()
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        resp = MagicMock()
+        resp.json.return_value = _jwks(('k1', k1))
+        return resp
+
+    monkeypatch.setattr('app.core.auth.token_verifier.requests.get', fake_get)
+    verifier = TokenVerifier(None, ['RS256'], keys=JWKSKeySet('http://auth/jwks', min_interval=60))
+    for i in range(5):
+        with pytest.raises(jwt.InvalidTokenError):
+            verifier.verify(_rs256(_rsa_key(), 'forged', sub=str(i)))
+    assert len(calls) == 1
+
+
+def test_algorithm_confusion_rejected(monkeypatch):
+    k1 = _rsa_key()
+    verifier = TokenVerifier('s', ['RS256'], keys=JWKSKeySet('http://auth/jwks'))
+    # an HS256 token is not accepted when only RS256 is configured
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(_token())
+
+    def fake_get(url, params=None, timeout=None):
+        resp = MagicMock()
+        resp.json.return_value = _jwks(('k1', k1))
+        return resp
+
+    monkeypatch.setattr('app.core.auth.token_verifier.requests.get', fake_get)
+    mixed = TokenVerifier('s', ['HS256', 'RS256'], keys=JWKSKeySet('http://auth/jwks'))
+    assert mixed.verify(_token(sub='hs'))['sub'] == 'hs'
+    assert mixed.verify(_rs256(k1, 'k1', sub='rs'))['sub'] == 'rs'
+
+
+def test_get_verifier_builds_jwks_from_auth_url(app):
+    with app.app_context():
+        app.config['JWT_ALGORITHM'] = 'HS256,RS256'
+        app.config['AUTH_SERVICE_URL'] = 'http://auth:9001/'
+        verifier = get_verifier()
+        assert verifier.algorithms == ['HS256', 'RS256']
+        assert verifier.keys.url == 'http://auth:9001/.well-known/jwks.json'
+        app.config['JWT_JWKS_URL'] = 'http://keys/jwks.json'
+        assert get_verifier().keys.url == 'http://keys/jwks.json'
+        app.config['JWT_ALGORITHM'] = 'HS256'
+        assert get_verifier().keys is None
@@ -24,6 +24,13 @@ def create_app(config_name=None):
     app.config['AUTH_SERVICE_URL'] = os.getenv('AUTH_SERVICE_URL')
     app.config['JWT_SECRET'] = os.getenv('JWT_SECRET')
     app.config['JWT_ALGORITHM'] = os.getenv('JWT_ALGORITHM', 'HS256')
+    # RS256/EdDSA tokens are checked against auth-service's JWKS (defaults to AUTH_SERVICE_URL)
+    app.config['JWT_JWKS_URL'] = os.getenv('JWT_JWKS_URL')
+    app.config['JWKS_REFRESH_SECONDS'] = float(os.getenv('JWKS_REFRESH_SECONDS', '300'))
+    # tokens are verified locally; /auth/verify is only consulted when this is enabled
+    app.config['AUTH_REMOTE_FALLBACK'] = os.getenv('AUTH_REMOTE_FALLBACK', 'false').lower() == 'true'
+    app.config['TOKEN_CACHE_SIZE'] = int(os.getenv('TOKEN_CACHE_SIZE', '10000'))
+    app.config['REVOCATION_SYNC_SECONDS'] = float(os.getenv('REVOCATION_SYNC_SECONDS', '0' if config_name == 'testing' else '30'))
 
     db.init_app(app)
     
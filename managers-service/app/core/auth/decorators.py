@@ -1,9 +1,21 @@
 from functools import wraps
 from flask import g, current_app
-from app.core.auth.jwt_validator import get_token_from_request, verify_token_with_auth_service
+from app.core.auth.jwt_validator import get_token_from_request, verify_token
 from app.core.exceptions import UnauthorizedError, ForbiddenError
 
 
+def _set_user(user_data):
+    # local JWT payloads carry sub/role; /auth/verify responses may nest a 'user'
+    user = user_data.get('user')
+    if user is None:
+        sub = user_data.get('sub')
+        user = {'id': sub, 'username': sub, 'role': user_data.get('role')}
+    g.current_user = user
+    g.user_id = user.get('id')
+    g.username = user.get('username')
+    g.user_role = user.get('role')
+
+
 def require_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -16,11 +28,7 @@ def require_auth(f):
             return f(*args, **kwargs)
 
         token = get_token_from_request()
-        user_data = verify_token_with_auth_service(token)
-        g.current_user = user_data.get('user', {})
-        g.user_id = user_data.get('user', {}).get('id')
-        g.username = user_data.get('user', {}).get('username')
-        g.user_role = user_data.get('user', {}).get('role')
+        _set_user(verify_token(token))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -43,11 +51,7 @@ def optional_auth(f):
     def decorated_function(*args, **kwargs):
         try:
             token = get_token_from_request()
-            user_data = verify_token_with_auth_service(token)
-            g.current_user = user_data.get('user', {})
-            g.user_id = user_data.get('user', {}).get('id')
-            g.username = user_data.get('user', {}).get('username')
-            g.user_role = user_data.get('user', {}).get('role')
+            _set_user(verify_token(token))
         except Exception:
             g.current_user = None
             g.user_id = None
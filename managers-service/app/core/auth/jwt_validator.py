@@ -1,6 +1,7 @@
 import jwt
 import requests
 from flask import request, current_app
+from app.core.auth.token_verifier import TokenRevokedError, get_verifier
 from app.core.exceptions import UnauthorizedError
 
 
@@ -18,6 +19,23 @@ def validate_jwt_token(token):
         raise UnauthorizedError('Invalid token')
 
 
+def verify_token(token):
+    """Verify a token locally (cached until exp, checked against revocations).
+
+    auth-service is only called when AUTH_REMOTE_FALLBACK is enabled and the
+    local check fails for a reason other than expiry or revocation."""
+    try:
+        return get_verifier().verify(token)
+    except jwt.ExpiredSignatureError:
+        raise UnauthorizedError('Token expired')
+    except TokenRevokedError:
+        raise UnauthorizedError('Token revoked')
+    except jwt.InvalidTokenError:
+        if current_app.config.get('AUTH_REMOTE_FALLBACK'):
+            return verify_token_with_auth_service(token)
+        raise UnauthorizedError('Invalid token')
+
+
 def verify_token_with_auth_service(token):
     try:
         auth_url = current_app.config.get('AUTH_SERVICE_URL')
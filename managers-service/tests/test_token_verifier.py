@@ -0,0 +1,101 @@
+import time
+
+import jwt
+import pytest
+from flask import g
+
+from app.core.auth.decorators import require_auth
+from app.core.auth.jwt_validator import verify_token
+from app.core.auth.token_verifier import RevocationList, get_verifier
+from app.core.exceptions import UnauthorizedError
+
+
+def make_token(secret='shh', **claims):
+    claims.setdefault('sub', 'u1')
+    claims.setdefault('exp', int(time.time()) + 60)
+    return jwt.encode(claims, secret, algorithm='HS256')
+
+
+def test_verify_token_is_local_and_cached(monkeypatch, app):
+    app.config['JWT_SECRET'] = 'shh'
+    app.config['AUTH_SERVICE_URL'] = 'http://auth'
+
+    def no_network(*args, **kwargs):
+        raise AssertionError('auth-service must not be called')
+
+    monkeypatch.setattr('requests.get', no_network)
+    token = make_token(role='admin')
+    with app.app_context():
+        assert verify_token(token)['role'] == 'admin'
+        assert token in get_verifier()._cache
+        assert verify_token(token)['sub'] == 'u1'
+
+        with pytest.raises(UnauthorizedError):
+            verify_token(make_token('other'))
+        with pytest.raises(UnauthorizedError):
+            verify_token(make_token(exp=int(time.time()) - 10))
+
+
+def test_verify_token_rejects_revoked(app):
+    app.config['JWT_SECRET'] = 'shh'
+    with app.app_context():
+        verifier = get_verifier()
+        verifier.revocations = RevocationList('http://auth/auth/revocations')
+        verifier.revocations._next_sync = float('inf')
+        token = make_token(jti='j1')
+        assert verify_token(token)['jti'] == 'j1'
+        verifier.revocations.add('j1')
+        with pytest.raises(UnauthorizedError):
+            verify_token(token)
+
+
+def test_remote_fallback_only_when_enabled(monkeypatch, app):
+    app.config['JWT_SECRET'] = 'shh'
+    monkeypatch.setattr('app.core.auth.jwt_validator.verify_token_with_auth_service',
+                        lambda token: {'user': {'id': 7, 'username': 'remote', 'role': 'admin'}})
+    token = make_token('other')
+    with app.app_context():
+        with pytest.raises(UnauthorizedError):
+            verify_token(token)
+        app.config['AUTH_REMOTE_FALLBACK'] = True
+        assert verify_token(token)['user']['id'] == 7
+
+
+def test_require_auth_sets_user_from_local_payload(app):
+    app.config['TESTING'] = False
+    app.config['JWT_SECRET'] = 'shh'
+
+    @app.route('/_me')
+    @require_auth
+    def me():
+        return {'user_id': g.user_id, 'role': g.user_role}
+
+    r = app.test_client().get('/_me', headers={'Authorization': 'Bearer ' + make_token(role='admin')})
+    assert r.status_code == 200
+    assert r.get_json() == {'user_id': 'u1', 'role': 'admin'}
+
+
+def test_rs256_tokens_verified_with_jwks(monkeypatch, app):
+    from unittest.mock import MagicMock
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+
+    key = ed25519.Ed25519PrivateKey.generate()
+    jwk = jwt.algorithms.OKPAlgorithm.to_jwk(key.public_key(), as_dict=True)
+    jwk.update({'kid': 'k1', 'alg': 'EdDSA', 'use': 'sig'})
+    calls = []
+
+    def fake_get(url, *args, **kwargs):
+        calls.append(url)
+        resp = MagicMock()
+        resp.json.return_value = {'keys': [jwk]}
+        return resp
+
+    monkeypatch.setattr('requests.get', fake_get)
+    app.config.update(JWT_SECRET=None, JWT_ALGORITHM='EdDSA', AUTH_SERVICE_URL='http://auth')
+    token = jwt.encode({'sub': 'ed', 'role': 'admin', 'exp': int(time.time()) + 60}, key,
+                       algorithm='EdDSA', headers={'kid': 'k1'})
+    with app.app_context():
+        assert verify_token(token)['sub'] == 'ed'
+        with pytest.raises(UnauthorizedError):
+            verify_token(make_token())
+    assert calls == ['http://auth/.well-known/jwks.json']
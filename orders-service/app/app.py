@@ -1,5 +1,6 @@
 from flask import Flask
-from app.db import Base, engine
+from app.db import Base, engine, Session
+from app.schema import init_schema
 from app.controllers.api import bp, svc
 from sqlalchemy import inspect, text
 import os
@@ -24,12 +25,23 @@ def create_app(config=None):
         print(f'[init] warning inspecting orders table: {e}')
 
     Base.metadata.create_all(bind=engine)
+    # detect missing columns once (adding them when allowed) and pick the write path
+    try:
+        init_schema(engine, app.config.get('AUTO_MIGRATE'))
+    except Exception as e:
+        print(f'[init] warning detecting orders schema: {e}')
     # Seed only when explicitly enabled (tests expect an empty DB)
     seed_flag = app.config.get('SEED', False) or os.getenv('SEED_ORDERS') == '1'
     if seed_flag:
         svc.seed()
+        Session.remove()
     app.register_blueprint(bp)
 
+    @app.teardown_appcontext
+    def remove_session(exc=None):
+        # release the request's session back to the pool and drop its identity map
+        Session.remove()
+
     @app.get('/health')
     def health():
         return {'status': 'alive'}
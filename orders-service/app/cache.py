@@ -0,0 +1,193 @@
+"""Read-through cache for serialised order detail.
+
+An in-process LRU (bounded, TTL'd) sits in front of an optional shared backend
+(Redis, when ORDERS_CACHE_REDIS_URL is set and the client is installed). Entries
+are plain dicts: {'customer_id', 'etag', 'body'}; the etag lets the API answer
+conditional polls with 304 without touching the database.
+
+A reader takes `version(order_number)` before querying and passes it to `set`;
+if the order was invalidated in between, the entry is not stored, so a detail
+read just before a status change cannot overwrite the invalidation.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def compute_etag(body) -> str:
+    """Stable content hash for a JSON-serialisable body."""
+    raw = json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe size-bounded LRU with per-entry TTL (ttl <= 0 disables expiry)."""
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    """Shared backend; keys are `prefix + generation + '|' + order_number` holding JSON.
+
+    Every order invalidated so far has a counter at `prefix + 'v:' + order_number`.
+    Invalidating is one INCR: entries written under an older generation are no
+    longer addressed and expire by TTL. Counters expire after ten entry TTLs,
+    long after the last entry they could address.
+    """
+    def __init__(self, client, prefix: str = 'orders:detail:', ttl: int = 60):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _version_key(self, key):
+        return f'{self.prefix}v:{key}'
+
+    def generation(self, key) -> int:
+        return int(self.client.get(self._version_key(key)) or 0)
+
+    def _name(self, key, generation):
+        return f'{self.prefix}{generation}|{key}'
+
+    def get(self, key):
+        raw = self.client.get(self._name(key, self.generation(key)))
+        return json.loads(raw) if raw else None
+
+    def set(self, key, value, generation=None):
+        if generation is None:
+            generation = self.generation(key)
+        self.client.set(self._name(key, generation), json.dumps(value, default=str), ex=self.ttl or None)
+
+    def delete(self, key):
+        self.client.incr(self._version_key(key))
+        if self.ttl:
+            self.client.expire(self._version_key(key), self.ttl * 10)
+
+
+class OrderDetailCache:
+    """Two-level cache keyed by order_number. Backend failures degrade to local-only."""
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, backend=None):
+        self.local = LRUCache(maxsize, ttl)
+        self.backend = backend
+        self._lock = threading.Lock()
+        # bumped on every invalidation so a read that raced with a write is not stored
+        self._version = 0
+
+    def get(self, order_number: str):
+        entry = self.local.get(order_number)
+        if entry is not None or self.backend is None:
+            return entry
+        try:
+            entry = self.backend.get(order_number)
+        except Exception:
+            return None
+        if entry is not None:
+            self.local.set(order_number, entry)
+        return entry
+
+    def version(self, order_number: str):
+        """Token to pass to set(); take it before reading the order from the database."""
+        with self._lock:
+            local = self._version
+        if self.backend is None:
+            return local, None
+        try:
+            return local, self.backend.generation(order_number)
+        except Exception:
+            return local, None
+
+    def set(self, order_number: str, entry: dict, version=None):
+        """Store entry; with a version from version(), only if nothing invalidated it since."""
+        generation = None
+        if version is not None:
+            local, generation = version
+            with self._lock:
+                if local != self._version:
+                    return
+            if self.backend is not None and generation is not None:
+                try:
+                    # another pod may have invalidated it; its INCR is visible here
+                    if self.backend.generation(order_number) != generation:
+                        return
+                except Exception:
+                    generation = None
+        self.local.set(order_number, entry)
+        # without a known generation (backend down) keep the entry local only
+        if self.backend is not None and (version is None or generation is not None):
+            try:
+                self.backend.set(order_number, entry, generation)
+            except Exception:
+                pass
+
+    def invalidate(self, order_number: str):
+        with self._lock:
+            self._version += 1
+        self.local.delete(order_number)
+        if self.backend is not None:
+            try:
+                self.backend.delete(order_number)
+            except Exception:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+        self.local.clear()
+
+
+def build_backend():
+    url = os.getenv('ORDERS_CACHE_REDIS_URL')
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        print('[cache] ORDERS_CACHE_REDIS_URL set but redis is not installed; using local cache only')
+        return None
+    return RedisBackend(redis.Redis.from_url(url), ttl=int(os.getenv('ORDERS_CACHE_TTL', '60')))
+
+
+_backend = build_backend()
+# with a shared backend other pods can invalidate an order, so keep local copies short-lived
+order_cache = OrderDetailCache(
+    maxsize=int(os.getenv('ORDERS_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('ORDERS_CACHE_LOCAL_TTL', '5' if _backend else os.getenv('ORDERS_CACHE_TTL', '60'))),
+    backend=_backend,
+)
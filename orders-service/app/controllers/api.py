@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify, Response
-from app.services.orders_service import svc
+from app.services.orders_service import svc, order_to_dict
 from app.util.auth_mw import require_auth, get_token_sub
 from sqlalchemy.exc import IntegrityError
 from app.domain.models import Order
+from app.repositories.repo import InvalidTransition
 import json
 import time
 
@@ -28,9 +29,7 @@ def list_orders():
     start = request.args.get('start')
     end = request.args.get('end')
     orders = svc.list_orders(sub, state, start, end)
-    out = []
-    for o in orders:
-        out.append({'order_number': o.order_number, 'status': o.status, 'created_at': o.created_at.isoformat() if o.created_at else None, 'monto': float(o.monto) if getattr(o, 'monto', None) is not None else 0.0, 'items': [{'product_name': it.product_name, 'quantity': it.quantity, 'unit_price': float(it.unit_price)} for it in getattr(o, 'items', [])]})
+    out = [order_to_dict(o) for o in orders]
     if not out:
         # tests expect either a message (when auth via token) or an empty list (when header-based auth)
         auth_header = request.headers.get('Authorization')
@@ -44,10 +43,17 @@ def list_orders():
 @require_auth
 def get_order(order_number: str):
     sub = get_token_sub(request)
-    o = svc.get_order(order_number)
-    if not o or o.customer_id != sub:
+    entry = svc.get_order_detail(order_number)
+    if not entry or entry['customer_id'] != sub:
         return {'error': 'not_found'}, 404
-    return jsonify({'order_number': o.order_number, 'status': o.status, 'created_at': o.created_at.isoformat() if o.created_at else None, 'monto': float(o.monto) if getattr(o, 'monto', None) is not None else 0.0, 'items': [{'product_name': it.product_name, 'quantity': it.quantity, 'unit_price': float(it.unit_price)} for it in getattr(o, 'items', [])]})
+    # unchanged polls are answered from the cache with 304 and no body
+    if request.if_none_match.contains(entry['etag']):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(entry['body'])
+    resp.set_etag(entry['etag'])
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
 
 
 @bp.post('/orders')
@@ -83,13 +89,37 @@ def update_status(order_number: str):
     if data['status'] not in Order.ALLOWED_STATUSES:
         return {'error': 'invalid_status', 'allowed': list(Order.ALLOWED_STATUSES)}, 400
     note = data.get('note')
-    o = svc.update_status(order_number, data['status'], note)
+    try:
+        o = svc.update_status(order_number, data['status'], note)
+    except InvalidTransition as e:
+        return {'error': 'invalid_transition', 'from': e.previous, 'to': e.new, 'allowed': list(Order.TRANSITIONS.get(e.previous, ()))}, 409
     if not o:
         return {'error': 'not_found'}, 404
     # In a full impl we'd notify via websocket/SSE; here we just return the updated order
     return jsonify({'order_number': o.order_number, 'status': o.status}), 200
 
 
+MAX_BULK_STATUS = 1000
+
+
+@bp.put('/orders/status')
+@require_auth
+def bulk_update_status():
+    data = get_json()
+    numbers = data.get('order_numbers')
+    if not isinstance(numbers, list) or not numbers or not all(isinstance(n, str) for n in numbers):
+        return {'error': 'order_numbers required'}, 400
+    if len(numbers) > MAX_BULK_STATUS:
+        return {'error': 'too_many_orders', 'max': MAX_BULK_STATUS}, 400
+    if 'status' not in data:
+        return {'error': 'status required'}, 400
+    if data['status'] not in Order.ALLOWED_STATUSES:
+        return {'error': 'invalid_status', 'allowed': list(Order.ALLOWED_STATUSES)}, 400
+    results = svc.bulk_update_status(numbers, data['status'], data.get('note'))
+    updated = sum(1 for r in results if r['result'] == 'updated')
+    return jsonify({'status': data['status'], 'updated': updated, 'results': results}), 200
+
+
 @bp.get('/orders/stream')
 @require_auth
 def orders_stream():
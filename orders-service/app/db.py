@@ -1,5 +1,5 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 import os
 
 DB_URL = os.getenv('DATABASE_URL')
@@ -18,6 +18,30 @@ if not DB_URL:
     # relying on a writable file in the repo (CI runners can have readonly checkouts).
     DB_URL = 'sqlite:///:memory:'
 
-engine = create_engine(DB_URL, echo=False, future=True)
+
+def pool_options(url: str) -> dict:
+    """Return connection pool kwargs for create_engine, read from env vars.
+
+    - DB_POOL_SIZE (default 5)
+    - DB_MAX_OVERFLOW (default 10)
+    - DB_POOL_PRE_PING (default '1')
+    - DB_POOL_RECYCLE seconds (default 1800, -1 disables)
+
+    SQLite uses its own single-connection pools so sizing is skipped there.
+    """
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes'),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    }
+
+
+engine = create_engine(DB_URL, echo=False, future=True, **pool_options(DB_URL))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# Thread-local session registry; the app removes the current session on
+# appcontext teardown so each request starts with an empty identity map.
+Session = scoped_session(SessionLocal)
 Base = declarative_base()
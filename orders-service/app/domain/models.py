@@ -15,6 +15,18 @@ class Order(Base):
     # case entregado = "entregado"
     # case pendiente = "pendiente"
     ALLOWED_STATUSES = ("En preparacion", "transito", "entregado", "pendiente")
+    # Declared state machine: status -> statuses it may move to. 'entregado' is terminal.
+    TRANSITIONS = {
+        "pendiente": ("En preparacion", "transito"),
+        "En preparacion": ("transito",),
+        "transito": ("entregado",),
+        "entregado": (),
+    }
+
+    @classmethod
+    def can_transition(cls, previous: str, new: str) -> bool:
+        """Re-applying the current status is accepted as a no-op."""
+        return previous == new or new in cls.TRANSITIONS.get(previous, ())
     status: Mapped[str] = mapped_column(String, nullable=False, default='pendiente')
     # Provide Python-side defaults to avoid RETURNING/server-default race on SQLite
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
@@ -1,10 +1,13 @@
 """Orders repository - single clean implementation."""
 
-from sqlalchemy import select, text
+from sqlalchemy import select, text, update, insert
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError, ProgrammingError, DBAPIError
-from app.db import SessionLocal
+from app.db import SessionLocal, Session
 from app.domain.models import Order, OrderStatusHistory, Product, OrderItem
 from app.db import engine
+from app.schema import CAPABILITIES
+from app.cache import order_cache
 from datetime import datetime
 
 
@@ -19,10 +22,27 @@ class SimpleOrder:
         self.monto = monto
 
 
+class InvalidTransition(ValueError):
+    """Raised when a status change is not allowed by Order.TRANSITIONS."""
+    def __init__(self, previous: str, new: str):
+        super().__init__(f'cannot move from {previous!r} to {new!r}')
+        self.previous = previous
+        self.new = new
+
+
 class Repo:
-    """Repository for orders-service using SQLAlchemy sessions."""
+    """Repository for orders-service using SQLAlchemy sessions.
+
+    When no session is injected the repo resolves the thread-local scoped
+    session on every access, so a process-wide Repo never pins one session
+    (and its identity map) for the life of the process.
+    """
     def __init__(self, session=None):
-        self.session = session or SessionLocal()
+        self._session = session
+
+    @property
+    def session(self):
+        return self._session if self._session is not None else Session()
 
     def list_orders_for_customer(self, customer_id: str, state: str | None = None, start_date=None, end_date=None):
         """Return list of Order objects for a given customer, optionally filtered by state."""
@@ -36,13 +56,22 @@ class Repo:
         q = select(Order).filter_by(order_number=order_number)
         return self.session.execute(q).scalars().first()
 
+    def get_order_detail(self, order_number: str):
+        """Return Order by order_number with its items loaded in the same round trip.
+        The lookup uses the unique index on orders.order_number."""
+        q = select(Order).filter_by(order_number=order_number).options(selectinload(Order.items))
+        return self.session.execute(q).scalars().first()
+
     def create_order(self, customer_id: str, order_number: str, status: str = 'pendiente', items: list | None = None):
         """Create and return a new Order. Items is a list of dicts with keys:
         - product_id (optional) OR name + unit_price
         - quantity (optional, defaults to 1)
         - unit_price (optional if product_id provided)
         The function will create Product entries if name/unit_price provided and compute monto.
+        The write strategy follows the schema capabilities detected at startup.
         """
+        if not CAPABILITIES['orders_monto']:
+            return self._create_order_legacy(customer_id, order_number, status, items)
         o = Order(customer_id=customer_id, order_number=order_number, status=status)
         self.session.add(o)
 
@@ -107,61 +136,50 @@ class Repo:
                 except Exception:
                     pass
                 raise
+            order_cache.invalidate(order_number)
             self.session.refresh(o)
             return o
 
-        except ProgrammingError as pe:
-            # likely missing 'monto' column in DB schema; fallback to raw INSERT without monto and persist items separately
+        except ProgrammingError:
+            # schema drifted after startup detection (e.g. column dropped); serve this
+            # order through the legacy write path instead of failing the request
             try:
                 self.session.rollback()
             except Exception:
                 pass
+            return self._create_order_legacy(customer_id, order_number, status, items)
 
-            # compute total using a fresh session to resolve any product prices referenced by id
-            total = 0.0
-            if items:
-                s2 = SessionLocal()
-                try:
-                    for it in items:
-                        qty = int(it.get('quantity', 1))
-                        unit_price = None
-                        if 'product_id' in it and it.get('product_id') is not None:
-                            p = s2.get(Product, int(it['product_id']))
-                            if p:
-                                unit_price = float(p.unit_price)
-                        if unit_price is None and 'unit_price' in it:
-                            unit_price = float(it['unit_price'])
-                        if unit_price is None:
-                            unit_price = 0.0
-                        total += qty * unit_price
-                finally:
-                    s2.close()
-
-            # ensure timestamps are not null (DB has NOT NULL constraint)
-            created_at_val = o.created_at or datetime.utcnow()
-            updated_at_val = o.updated_at or created_at_val
-            params = {
-                'customer_id': customer_id,
-                'order_number': order_number,
-                'status': status,
-                'created_at': created_at_val,
-                'updated_at': updated_at_val,
-            }
-            # Use a transaction on a fresh connection to avoid mixing with session state
-            with engine.begin() as conn:
-                try:
-                    res = conn.execute(text("INSERT INTO orders (customer_id, order_number, status, created_at, updated_at) VALUES (:customer_id, :order_number, :status, :created_at, :updated_at) RETURNING id"), params)
-                    inserted_id = int(res.scalar_one())
-                except DBAPIError:
-                    conn.execute(text("INSERT INTO orders (customer_id, order_number, status, created_at, updated_at) VALUES (:customer_id, :order_number, :status, :created_at, :updated_at)"), params)
-                    r = conn.execute(text("SELECT id FROM orders WHERE order_number = :order_number LIMIT 1"), {'order_number': order_number})
-                    row = r.first()
-                    inserted_id = int(row[0]) if row is not None else None
-
-            # persist items using fresh session
+    def _create_order_legacy(self, customer_id: str, order_number: str, status: str, items: list | None):
+        """Write path for databases whose `orders` table lacks `monto`.
+
+        Selected up front when app.schema detected the missing column (and could not
+        add it). Inserts the order row with raw SQL, then resolves prices and persists
+        items in a single session pass.
+        """
+        now = datetime.utcnow()
+        params = {
+            'customer_id': customer_id,
+            'order_number': order_number,
+            'status': status,
+            'created_at': now,
+            'updated_at': now,
+        }
+        # Use a transaction on a fresh connection to avoid mixing with session state
+        with engine.begin() as conn:
+            try:
+                res = conn.execute(text("INSERT INTO orders (customer_id, order_number, status, created_at, updated_at) VALUES (:customer_id, :order_number, :status, :created_at, :updated_at) RETURNING id"), params)
+                inserted_id = int(res.scalar_one())
+            except DBAPIError:
+                conn.execute(text("INSERT INTO orders (customer_id, order_number, status, created_at, updated_at) VALUES (:customer_id, :order_number, :status, :created_at, :updated_at)"), params)
+                r = conn.execute(text("SELECT id FROM orders WHERE order_number = :order_number LIMIT 1"), {'order_number': order_number})
+                row = r.first()
+                inserted_id = int(row[0]) if row is not None else None
+
+        total = 0.0
+        if items:
             s = SessionLocal()
             try:
-                for it in items or []:
+                for it in items:
                     qty = int(it.get('quantity', 1))
                     product = None
                     unit_price = None
@@ -178,6 +196,7 @@ class Repo:
                         unit_price = float(it['unit_price'])
                     if unit_price is None:
                         unit_price = 0.0
+                    total += qty * unit_price
                     oi = OrderItem(order_id=inserted_id, product_id=product.id if product else None, product_name=product.name if product else it.get('name', ''), quantity=qty, unit_price=str(unit_price))
                     s.add(oi)
                 s.commit()
@@ -189,21 +208,65 @@ class Repo:
             finally:
                 s.close()
 
-            return SimpleOrder(id=inserted_id, order_number=order_number, status=status, monto=str(float(total)))
+        order_cache.invalidate(order_number)
+        return SimpleOrder(id=inserted_id, order_number=order_number, status=status, monto=str(float(total)))
 
     def update_order_status(self, order_number: str, new_status: str, note: str | None = None):
-        """Update status for an order and append a history row."""
+        """Update status for an order and append a history row in one transaction.
+        Raises InvalidTransition when the state machine forbids the change."""
         o = self.get_order_by_number(order_number)
         if not o:
             return None
         prev = o.status
+        if not Order.can_transition(prev, new_status):
+            raise InvalidTransition(prev, new_status)
         o.status = new_status
         self.session.add(o)
-        self.session.commit()
-        # persist history
         h = OrderStatusHistory(order_id=o.id, previous_status=prev, new_status=new_status, note=note)
         self.session.add(h)
         self.session.commit()
+        order_cache.invalidate(order_number)
         self.session.refresh(o)
         return o
 
+    def bulk_update_status(self, order_numbers: list, new_status: str, note: str | None = None):
+        """Move many orders to new_status in one transaction.
+
+        Reads current statuses with one SELECT, applies the allowed changes with a single
+        UPDATE ... WHERE id IN (...) and writes one multi-row history INSERT.
+        Returns a list of {'order_number', 'result', 'previous_status'} in request order,
+        where result is one of updated / unchanged / not_found / invalid_transition.
+        """
+        q = select(Order.id, Order.order_number, Order.status).where(Order.order_number.in_(order_numbers)).with_for_update()
+        current = {row.order_number: row for row in self.session.execute(q)}
+        results = []
+        to_update = {}
+        for number in order_numbers:
+            row = current.get(number)
+            if row is None:
+                results.append({'order_number': number, 'result': 'not_found', 'previous_status': None})
+            elif row.status == new_status:
+                results.append({'order_number': number, 'result': 'unchanged', 'previous_status': row.status})
+            elif not Order.can_transition(row.status, new_status):
+                results.append({'order_number': number, 'result': 'invalid_transition', 'previous_status': row.status})
+            else:
+                to_update[number] = row
+                results.append({'order_number': number, 'result': 'updated', 'previous_status': row.status})
+        if to_update:
+            try:
+                ids = [row.id for row in to_update.values()]
+                self.session.execute(update(Order).where(Order.id.in_(ids)).values(status=new_status), execution_options={'synchronize_session': False})
+                history = [{'order_id': row.id, 'previous_status': row.status, 'new_status': new_status, 'note': note} for row in to_update.values()]
+                self.session.execute(insert(OrderStatusHistory).values(history))
+                self.session.commit()
+            except Exception:
+                try:
+                    self.session.rollback()
+                except Exception:
+                    pass
+                raise
+            for number in to_update:
+                order_cache.invalidate(number)
+        else:
+            self.session.rollback()
+        return results
@@ -0,0 +1,75 @@
+"""Startup schema detection and online column migrations for orders-service.
+
+Older deployments created the `orders` table before `monto` existed. Instead of
+discovering that on every insert (flush -> ProgrammingError -> fallback), the
+app inspects the schema once at startup, adds any missing columns and records
+which write strategy the repository should use.
+"""
+
+from sqlalchemy import inspect, text
+import os
+
+# table -> column -> DDL fragment used by ALTER TABLE ... ADD COLUMN
+EXPECTED_COLUMNS = {
+    'orders': {
+        'monto': "VARCHAR NOT NULL DEFAULT '0.0'",
+    },
+}
+
+# Write-strategy flags consulted by Repo. Defaults assume a schema created from
+# the current models (e.g. via Base.metadata.create_all).
+CAPABILITIES = {
+    'orders_monto': True,
+}
+
+
+def missing_columns(engine):
+    """Return {table: [column, ...]} for expected columns absent in the DB."""
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    missing = {}
+    for table, cols in EXPECTED_COLUMNS.items():
+        if table not in tables:
+            continue
+        present = {c['name'] for c in insp.get_columns(table)}
+        absent = [c for c in cols if c not in present]
+        if absent:
+            missing[table] = absent
+    return missing
+
+
+def migrate(engine, missing=None):
+    """Add missing columns with ALTER TABLE. Returns the columns that were added.
+
+    ADD COLUMN with a constant default is a metadata-only change on PostgreSQL 11+
+    and SQLite, so it is safe to run online against a live table.
+    """
+    if missing is None:
+        missing = missing_columns(engine)
+    added = []
+    for table, cols in missing.items():
+        for col in cols:
+            ddl = EXPECTED_COLUMNS[table][col]
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {col} {ddl}'))
+            added.append(f'{table}.{col}')
+    return added
+
+
+def init_schema(engine, auto_migrate=None):
+    """Detect schema capabilities once and optionally migrate. Returns CAPABILITIES.
+
+    auto_migrate defaults to the ORDERS_AUTO_MIGRATE env var ('1' unless set).
+    """
+    if auto_migrate is None:
+        auto_migrate = os.getenv('ORDERS_AUTO_MIGRATE', '1') == '1'
+    missing = missing_columns(engine)
+    if missing and auto_migrate:
+        try:
+            added = migrate(engine, missing)
+            print(f'[init] added missing columns: {", ".join(added)}')
+        except Exception as e:
+            print(f'[init] warning migrating orders schema: {e}')
+        missing = missing_columns(engine)
+    CAPABILITIES['orders_monto'] = 'monto' not in missing.get('orders', [])
+    return CAPABILITIES
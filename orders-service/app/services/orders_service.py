@@ -1,7 +1,13 @@
 from app.repositories.repo import Repo
+from app.cache import order_cache, compute_etag
 from typing import List
 
 
+def order_to_dict(o) -> dict:
+    """Public JSON shape of an order (shared by list and detail endpoints)."""
+    return {'order_number': o.order_number, 'status': o.status, 'created_at': o.created_at.isoformat() if o.created_at else None, 'monto': float(o.monto) if getattr(o, 'monto', None) is not None else 0.0, 'items': [{'product_name': it.product_name, 'quantity': it.quantity, 'unit_price': float(it.unit_price)} for it in getattr(o, 'items', [])]}
+
+
 class OrdersService:
     def __init__(self, repo: Repo | None = None):
         self.repo = repo or Repo()
@@ -31,8 +37,28 @@ class OrdersService:
     def get_order(self, order_number: str):
         return self.repo.get_order_by_number(order_number)
 
+    def get_order_detail(self, order_number: str):
+        """Read-through cached detail: {'customer_id', 'etag', 'body'} or None."""
+        entry = order_cache.get(order_number)
+        if entry is not None:
+            return entry
+        # taken before the query: an invalidation during the read keeps the result out of the cache
+        version = order_cache.version(order_number)
+        o = self.repo.get_order_detail(order_number)
+        if not o:
+            return None
+        body = order_to_dict(o)
+        entry = {'customer_id': o.customer_id, 'etag': compute_etag(body), 'body': body}
+        order_cache.set(order_number, entry, version)
+        return entry
+
     def update_status(self, order_number: str, new_status: str, note: str | None = None):
         return self.repo.update_order_status(order_number, new_status, note)
 
+    def bulk_update_status(self, order_numbers: list, new_status: str, note: str | None = None):
+        # de-duplicate while keeping request order so each order reports once
+        unique = list(dict.fromkeys(order_numbers))
+        return self.repo.bulk_update_status(unique, new_status, note)
+
 
 svc = OrdersService()
@@ -6,11 +6,14 @@ import argparse
 import os
 from app.db import engine, Base, SessionLocal
 from app.services.orders_service import OrdersService
+from app.schema import init_schema
 
 
 def init_db(seed=False):
     print('Creating tables...')
     Base.metadata.create_all(bind=engine)
+    print('Checking columns...')
+    init_schema(engine, auto_migrate=True)
     if seed:
         print('Seeding sample orders...')
         svc = OrdersService()
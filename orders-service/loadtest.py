@@ -0,0 +1,241 @@
+"""Load-test harness for orders-service.
+
+Seeds customers, orders and items, then drives a concurrent mix of list, detail,
+create and status-update requests through the Flask app and reports p50/p95/p99
+latency per operation plus overall throughput. With --baseline the run fails
+(exit code 1) when p95 latency or throughput regress beyond --tolerance. The
+baseline stores the options it was recorded with; a run with different
+options is refused rather than compared, since the numbers do not line up.
+
+Set DATABASE_URL to a file-based SQLite DB or a local PostgreSQL before running
+(an in-memory SQLite DB is per-thread and cannot be shared by workers).
+
+Usage:
+    DATABASE_URL=sqlite:///loadtest.db python loadtest.py --reset \\
+        --baseline tests/perf_baseline.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+OPERATIONS = ('list', 'detail', 'create', 'status')
+STATUS_TARGETS = ('En preparacion', 'transito', 'entregado')
+# options that shape the workload; a baseline only applies to runs with the same values
+CONFIG_KEYS = ('customers', 'orders', 'items', 'requests', 'concurrency', 'mix', 'seed')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list (pct in 0..100)."""
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def summarize(latencies, errors, elapsed):
+    """Build the report dict from {op: [seconds, ...]} and {op: error_count}."""
+    report = {'operations': {}, 'elapsed_s': round(elapsed, 3)}
+    total = 0
+    for op in OPERATIONS:
+        samples = latencies.get(op) or []
+        total += len(samples)
+        if not samples:
+            continue
+        report['operations'][op] = {
+            'count': len(samples),
+            'errors': errors.get(op, 0),
+            'p50_ms': round(percentile(samples, 50) * 1000, 3),
+            'p95_ms': round(percentile(samples, 95) * 1000, 3),
+            'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        }
+    report['requests'] = total
+    report['throughput_rps'] = round(total / elapsed, 1) if elapsed > 0 else 0.0
+    return report
+
+
+def config_mismatches(report, baseline):
+    """Workload options (and database backend) that differ between run and baseline."""
+    problems = []
+    expected = dict(baseline.get('config') or {}, database=baseline.get('database'))
+    actual = dict(report.get('config') or {}, database=report.get('database'))
+    for key in CONFIG_KEYS + ('database',):
+        if expected.get(key) is None:
+            problems.append(f'baseline has no {key}; re-record it with --update-baseline')
+        elif actual.get(key) != expected[key]:
+            problems.append(f'{key}: run used {actual.get(key)!r}, baseline was recorded with {expected[key]!r}')
+    return problems
+
+
+def compare(report, baseline, tolerance=0.25):
+    """Return a list of regression messages (empty when within tolerance)."""
+    problems = []
+    for op, base in baseline.get('operations', {}).items():
+        cur = report['operations'].get(op)
+        if not cur:
+            continue
+        limit = base['p95_ms'] * (1 + tolerance)
+        if cur['p95_ms'] > limit:
+            problems.append(f'{op}: p95 {cur["p95_ms"]}ms > {limit:.3f}ms (baseline {base["p95_ms"]}ms)')
+        if cur.get('errors'):
+            problems.append(f'{op}: {cur["errors"]} errors')
+    base_rps = baseline.get('throughput_rps')
+    if base_rps:
+        # the inverse of the latency limit, so any tolerance still leaves a positive floor
+        floor = base_rps / (1 + tolerance)
+        if report['throughput_rps'] < floor:
+            problems.append(f'throughput {report["throughput_rps"]} rps < {floor:.1f} rps (baseline {base_rps} rps)')
+    return problems
+
+
+def seed(customers, orders_per_customer, items_per_order, prefix):
+    """Bulk insert fixture data with Core statements. Returns [(order_number, customer_id)]."""
+    from sqlalchemy import insert, select
+    from app.db import engine
+    from app.domain.models import Order, OrderItem
+
+    now = datetime.utcnow()
+    rows = []
+    for c in range(customers):
+        for i in range(orders_per_customer):
+            rows.append({'customer_id': f'{prefix}-cust-{c}', 'order_number': f'{prefix}-{c}-{i}',
+                         'status': 'pendiente', 'created_at': now, 'updated_at': now, 'monto': '0.0'})
+    if not rows:
+        return []
+    with engine.begin() as conn:
+        conn.execute(insert(Order), rows)
+        ids = conn.execute(select(Order.id, Order.order_number, Order.customer_id).where(Order.order_number.like(f'{prefix}-%'))).all()
+        items = [{'order_id': oid, 'product_id': None, 'product_name': f'item-{k}', 'quantity': 1 + k, 'unit_price': '2.5'}
+                 for oid, _, _ in ids for k in range(items_per_order)]
+        if items:
+            conn.execute(insert(OrderItem), items)
+    return [(number, cust) for _, number, cust in ids]
+
+
+def run(app, orders, requests, concurrency, mix, rng_seed, prefix):
+    """Drive `requests` calls split across `concurrency` workers; returns the report."""
+    weights = [mix.get(op, 0) for op in OPERATIONS]
+    latencies = {op: [] for op in OPERATIONS}
+    errors = {op: 0 for op in OPERATIONS}
+    lock = threading.Lock()
+    per_worker = [requests // concurrency + (1 if w < requests % concurrency else 0) for w in range(concurrency)]
+
+    def worker(w):
+        rng = random.Random(rng_seed * 1000 + w)
+        client = app.test_client()
+        local = {op: [] for op in OPERATIONS}
+        local_err = {op: 0 for op in OPERATIONS}
+        for n in range(per_worker[w]):
+            op = rng.choices(OPERATIONS, weights)[0]
+            number, cust = orders[rng.randrange(len(orders))]
+            h = {'X-Customer-Id': cust}
+            t0 = time.perf_counter()
+            if op == 'list':
+                r = client.get('/api/orders', headers=h)
+                ok = r.status_code == 200
+            elif op == 'detail':
+                r = client.get(f'/api/orders/{number}', headers=h)
+                ok = r.status_code == 200
+            elif op == 'create':
+                r = client.post('/api/orders', json={'order_number': f'{prefix}-new-{w}-{n}', 'items': [{'name': 'lt', 'unit_price': 1.0, 'quantity': 2}]}, headers=h)
+                ok = r.status_code == 201
+            else:
+                r = client.put(f'/api/orders/{number}/status', json={'status': rng.choice(STATUS_TARGETS)}, headers=h)
+                # 409 is an expected outcome for transitions the state machine rejects
+                ok = r.status_code in (200, 409)
+            local[op].append(time.perf_counter() - t0)
+            if not ok:
+                local_err[op] += 1
+        with lock:
+            for op in OPERATIONS:
+                latencies[op].extend(local[op])
+                errors[op] += local_err[op]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def parse_mix(raw):
+    parts = [float(p) for p in raw.split(',')]
+    if len(parts) != len(OPERATIONS):
+        raise argparse.ArgumentTypeError(f'mix needs {len(OPERATIONS)} weights: {",".join(OPERATIONS)}')
+    return dict(zip(OPERATIONS, parts))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='orders-service load test')
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=10, help='orders per customer')
+    parser.add_argument('--items', type=int, default=2, help='items per order')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('50,35,10,5'), help='weights for list,detail,create,status')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for reproducible runs')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate tables first')
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed regression fraction')
+    parser.add_argument('--update-baseline', action='store_true', help='write this run to --baseline')
+    parser.add_argument('--output', help='write the report JSON here')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from app.app import create_app
+    from app.db import Base, engine
+
+    if str(engine.url) == 'sqlite:///:memory:' and args.concurrency > 1:
+        print('in-memory SQLite is per-thread; set DATABASE_URL to a file or PostgreSQL for concurrent runs')
+        return 2
+    workload = {'config': {k: getattr(args, k) for k in CONFIG_KEYS}, 'database': engine.url.get_backend_name()}
+    baseline = None
+    if args.baseline and not args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # checked before the run: comparing against a different workload proves nothing
+        mismatches = config_mismatches(workload, baseline)
+        if mismatches:
+            print('BASELINE NOT COMPARABLE (rerun with the baseline options or --update-baseline):')
+            for p in mismatches:
+                print(' -', p)
+            return 2
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+    app = create_app({'SEED': False})
+    prefix = f'LT{args.seed}-{int(time.time())}'
+    orders = seed(args.customers, args.orders, args.items, prefix)
+    if not orders:
+        print('nothing seeded; need --customers and --orders > 0')
+        return 2
+    report = run(app, orders, args.requests, args.concurrency, args.mix, args.seed, prefix)
+    report.update(workload)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'baseline written to {args.baseline}')
+    elif baseline is not None:
+        problems = compare(report, baseline, args.tolerance)
+        if problems:
+            print('PERFORMANCE REGRESSION:')
+            for p in problems:
+                print(' -', p)
+            return 1
+        print('within baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,7 @@ if ROOT not in sys.path:
 
 from app.app import create_app
 from app.db import Base, engine
+from app.cache import order_cache
 import werkzeug
 
 # Compatibility shim: newer Werkzeug versions may not expose __version__ which
@@ -40,6 +41,8 @@ def app():
         pass
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # cached order detail must not outlive the tables it was read from
+    order_cache.clear()
     a = create_app(cfg)
     yield a
 
@@ -5,6 +5,16 @@ from types import SimpleNamespace
 from app import db as db_mod
 from app.app import create_app
 from sqlalchemy.exc import IntegrityError
+import app.app as app_mod
+
+# these tests reload app.db/app.app in place; snapshot their globals so the
+# rest of the suite keeps sharing one engine and one scoped session registry
+_saved = {m: dict(m.__dict__) for m in (db_mod, app_mod)}
+
+
+def teardown_module(module):
+    for m, d in _saved.items():
+        m.__dict__.update(d)
 
 
 def test_db_url_selects_postgres_when_env_set(monkeypatch):
@@ -0,0 +1,60 @@
+from sqlalchemy import event
+from app.db import engine, SessionLocal
+from app.domain.models import Order, OrderStatusHistory
+
+
+H = {'X-Customer-Id': 'logistics'}
+
+
+def test_can_transition_table():
+    assert Order.can_transition('pendiente', 'transito')
+    assert Order.can_transition('transito', 'transito')
+    assert not Order.can_transition('entregado', 'pendiente')
+    assert not Order.can_transition('transito', 'En preparacion')
+
+
+def test_single_put_rejects_invalid_transition(client):
+    client.post('/api/orders', json={'order_number': 'T-1', 'status': 'entregado'}, headers=H)
+    r = client.put('/api/orders/T-1/status', json={'status': 'pendiente'}, headers=H)
+    assert r.status_code == 409
+    assert r.get_json()['error'] == 'invalid_transition'
+
+
+def test_bulk_status_reports_per_order_results(client):
+    for n, st in (('B-1', 'pendiente'), ('B-2', 'En preparacion'), ('B-3', 'entregado'), ('B-4', 'transito')):
+        client.post('/api/orders', json={'order_number': n, 'status': st}, headers=H)
+
+    statements = []
+
+    def count(conn, cursor, statement, params, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        r = client.put('/api/orders/status', json={'order_numbers': ['B-1', 'B-2', 'B-3', 'B-4', 'NOPE', 'B-1'], 'status': 'transito', 'note': 'truck 7'}, headers=H)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body['updated'] == 2
+    assert [(x['order_number'], x['result']) for x in body['results']] == [
+        ('B-1', 'updated'), ('B-2', 'updated'), ('B-3', 'invalid_transition'), ('B-4', 'unchanged'), ('NOPE', 'not_found'),
+    ]
+    # one SELECT, one UPDATE, one multi-row INSERT for the history
+    assert statements.count('UPDATE') == 1
+    assert statements.count('INSERT') == 1
+
+    s = SessionLocal()
+    try:
+        got = {o.order_number: o.status for o in s.query(Order).filter(Order.order_number.in_(['B-1', 'B-2', 'B-3']))}
+        assert got == {'B-1': 'transito', 'B-2': 'transito', 'B-3': 'entregado'}
+        notes = [h.note for h in s.query(OrderStatusHistory).filter_by(new_status='transito')]
+        assert notes.count('truck 7') == 2
+    finally:
+        s.close()
+
+
+def test_bulk_status_validates_payload(client):
+    assert client.put('/api/orders/status', json={'status': 'transito'}, headers=H).status_code == 400
+    assert client.put('/api/orders/status', json={'order_numbers': ['X'], 'status': 'lost'}, headers=H).status_code == 400
+    assert client.put('/api/orders/status', json={'order_numbers': ['X']}, headers=H).status_code == 400
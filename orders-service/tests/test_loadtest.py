@@ -0,0 +1,68 @@
+import json
+import os
+import loadtest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BASELINE = os.path.join(ROOT, 'tests', 'perf_baseline.json')
+
+
+def default_workload(**overrides):
+    args = loadtest.build_parser().parse_args([])
+    config = {k: getattr(args, k) for k in loadtest.CONFIG_KEYS}
+    config.update(overrides)
+    return {'config': config, 'database': 'sqlite'}
+
+
+def test_percentile_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert loadtest.percentile(values, 50) == 0.05
+    assert loadtest.percentile(values, 95) == 0.095
+    assert loadtest.percentile(values, 99) == 0.099
+    assert loadtest.percentile([0.2], 99) == 0.2
+
+
+def test_summarize_report_structure():
+    latencies = {'list': [0.001 * i for i in range(1, 101)], 'detail': [0.004, 0.002], 'create': []}
+    report = loadtest.summarize(latencies, {'detail': 1}, elapsed=2.0)
+    assert report['requests'] == 102
+    assert report['throughput_rps'] == 51.0
+    assert report['elapsed_s'] == 2.0
+    assert set(report['operations']) == {'list', 'detail'}
+    assert report['operations']['list'] == {'count': 100, 'errors': 0, 'p50_ms': 50.0, 'p95_ms': 95.0, 'p99_ms': 99.0}
+    assert report['operations']['detail']['errors'] == 1
+    assert loadtest.summarize({}, {}, elapsed=0)['throughput_rps'] == 0.0
+
+
+def test_compare_flags_regressions():
+    baseline = {'operations': {'detail': {'p95_ms': 10.0}}, 'throughput_rps': 100.0}
+    ok = {'operations': {'detail': {'p95_ms': 12.0, 'errors': 0}}, 'throughput_rps': 90.0}
+    assert loadtest.compare(ok, baseline, 0.25) == []
+    slow = {'operations': {'detail': {'p95_ms': 13.0, 'errors': 1}}, 'throughput_rps': 70.0}
+    problems = loadtest.compare(slow, baseline, 0.25)
+    assert len(problems) == 3
+
+
+def test_wide_tolerance_keeps_a_throughput_floor():
+    baseline = {'operations': {}, 'throughput_rps': 100.0}
+    assert loadtest.compare({'operations': {}, 'throughput_rps': 30.0}, baseline, 3.0) == []
+    [problem] = loadtest.compare({'operations': {}, 'throughput_rps': 20.0}, baseline, 3.0)
+    assert problem.startswith('throughput 20.0 rps < 25.0 rps')
+
+
+def test_config_mismatch_is_reported():
+    baseline = default_workload()
+    assert loadtest.config_mismatches(default_workload(), baseline) == []
+    problems = loadtest.config_mismatches(default_workload(requests=300, concurrency=3), baseline)
+    assert [p.split(':')[0] for p in problems] == ['requests', 'concurrency']
+    other_db = dict(default_workload(), database='postgresql')
+    assert loadtest.config_mismatches(other_db, baseline)[0].startswith('database:')
+    assert loadtest.config_mismatches(default_workload(), {'operations': {}})[0] == \
+        'baseline has no customers; re-record it with --update-baseline'
+
+
+def test_committed_baseline_matches_default_options():
+    # the README command (defaults) must be comparable with the committed baseline
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    assert loadtest.config_mismatches(default_workload(), baseline) == []
+    assert set(baseline['operations']) <= set(loadtest.OPERATIONS)
@@ -0,0 +1,109 @@
+from app.cache import LRUCache, OrderDetailCache, RedisBackend, order_cache
+from app.services.orders_service import svc
+
+
+H = {'X-Customer-Id': 'cust-c'}
+
+
+def test_lru_evicts_least_recently_used():
+    c = LRUCache(maxsize=2, ttl=0)
+    c.set('a', 1)
+    c.set('b', 2)
+    assert c.get('a') == 1
+    c.set('c', 3)
+    assert c.get('b') is None
+    assert c.get('a') == 1 and c.get('c') == 3
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, k):
+        return self.data.get(k)
+
+    def set(self, k, v, ex=None):
+        self.data[k] = v
+
+    def delete(self, k):
+        self.data.pop(k, None)
+
+    def incr(self, k):
+        self.data[k] = int(self.data.get(k) or 0) + 1
+        return self.data[k]
+
+    def expire(self, k, seconds):
+        pass
+
+
+def test_shared_backend_fills_local_and_is_invalidated():
+    redis = FakeRedis()
+    pod_a = OrderDetailCache(backend=RedisBackend(redis))
+    pod_b = OrderDetailCache(backend=RedisBackend(redis))
+    pod_a.set('O-1', {'customer_id': 'c', 'etag': 'x', 'body': {}})
+    assert pod_b.get('O-1')['etag'] == 'x'
+    pod_a.invalidate('O-1')
+    pod_b.local.clear()
+    assert pod_b.get('O-1') is None
+
+
+def test_read_racing_an_invalidation_is_not_stored(client, monkeypatch):
+    client.post('/api/orders', json={'order_number': 'C-3'}, headers=H)
+    read = svc.repo.get_order_detail
+
+    def read_then_update(number):
+        o = read(number)
+        # the status change commits and invalidates after the read, before the cache fill
+        svc.update_status(number, 'transito')
+        return o
+
+    monkeypatch.setattr(svc.repo, 'get_order_detail', read_then_update)
+    assert svc.get_order_detail('C-3') is not None
+    assert order_cache.get('C-3') is None
+    monkeypatch.setattr(svc.repo, 'get_order_detail', read)
+    assert svc.get_order_detail('C-3')['body']['status'] == 'transito'
+
+
+def test_other_pods_invalidation_during_read_is_honoured():
+    redis = FakeRedis()
+    pod_a = OrderDetailCache(backend=RedisBackend(redis))
+    pod_b = OrderDetailCache(backend=RedisBackend(redis))
+    version = pod_a.version('O-2')
+    pod_b.invalidate('O-2')
+    pod_a.set('O-2', {'customer_id': 'c', 'etag': 'old', 'body': {}}, version)
+    assert pod_a.get('O-2') is None and pod_b.get('O-2') is None
+    pod_a.set('O-2', {'customer_id': 'c', 'etag': 'new', 'body': {}}, pod_a.version('O-2'))
+    assert pod_b.get('O-2')['etag'] == 'new'
+
+
+def test_etag_and_304_without_db(client, monkeypatch):
+    r = client.post('/api/orders', json={'order_number': 'C-1', 'items': [{'name': 'p', 'unit_price': 2, 'quantity': 1}]}, headers=H)
+    assert r.status_code == 201
+    r = client.get('/api/orders/C-1', headers=H)
+    assert r.status_code == 200
+    etag = r.headers['ETag']
+    assert r.get_json()['items'][0]['product_name'] == 'p'
+
+    def boom(*a, **kw):
+        raise AssertionError('db touched')
+
+    monkeypatch.setattr(svc.repo, 'get_order_detail', boom)
+    r = client.get('/api/orders/C-1', headers={**H, 'If-None-Match': etag})
+    assert r.status_code == 304
+    assert r.headers['ETag'] == etag
+    # other customers still get 404 from the cached entry
+    r = client.get('/api/orders/C-1', headers={'X-Customer-Id': 'someone-else'})
+    assert r.status_code == 404
+
+
+def test_status_update_invalidates_detail(client):
+    client.post('/api/orders', json={'order_number': 'C-2'}, headers=H)
+    r = client.get('/api/orders/C-2', headers=H)
+    etag = r.headers['ETag']
+    assert order_cache.get('C-2') is not None
+    client.put('/api/orders/C-2/status', json={'status': 'transito'}, headers=H)
+    assert order_cache.get('C-2') is None
+    r = client.get('/api/orders/C-2', headers={**H, 'If-None-Match': etag})
+    assert r.status_code == 200
+    assert r.get_json()['status'] == 'transito'
+    assert r.headers['ETag'] != etag
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db import Base
+from app import schema
+from app.repositories import repo as repo_mod
+from app.repositories.repo import Repo, SimpleOrder
+from app.domain.models import OrderItem
+
+
+@pytest.fixture
+def legacy_engine():
+    # current schema for every table except orders, which predates `monto`
+    eng = create_engine('sqlite://', future=True, poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(bind=eng)
+    with eng.begin() as conn:
+        conn.execute(text('DROP TABLE orders'))
+        conn.execute(text('CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id VARCHAR NOT NULL, order_number VARCHAR NOT NULL UNIQUE, status VARCHAR NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME)'))
+    yield eng
+    eng.dispose()
+
+
+def test_missing_columns_and_migrate(legacy_engine):
+    assert schema.missing_columns(legacy_engine) == {'orders': ['monto']}
+    added = schema.migrate(legacy_engine)
+    assert added == ['orders.monto']
+    assert 'monto' in {c['name'] for c in inspect(legacy_engine).get_columns('orders')}
+    assert schema.missing_columns(legacy_engine) == {}
+
+
+def test_init_schema_sets_capabilities(legacy_engine, monkeypatch):
+    monkeypatch.setitem(schema.CAPABILITIES, 'orders_monto', True)
+    caps = schema.init_schema(legacy_engine, auto_migrate=False)
+    assert caps['orders_monto'] is False
+    caps = schema.init_schema(legacy_engine, auto_migrate=True)
+    assert caps['orders_monto'] is True
+
+
+class NoFlushSession:
+    """Session stub proving the ORM write path is never attempted."""
+    def add(self, obj):
+        raise AssertionError('ORM path used on legacy schema')
+
+    def flush(self):
+        raise AssertionError('ORM path used on legacy schema')
+
+
+def test_legacy_strategy_selected_up_front(legacy_engine, monkeypatch):
+    monkeypatch.setitem(schema.CAPABILITIES, 'orders_monto', False)
+    monkeypatch.setattr(repo_mod, 'engine', legacy_engine)
+    Legacy = sessionmaker(bind=legacy_engine, future=True)
+    monkeypatch.setattr(repo_mod, 'SessionLocal', Legacy)
+    r = Repo(session=NoFlushSession())
+    so = r.create_order('cust-legacy', 'LEG-1', items=[{'name': 'A', 'unit_price': 2.5, 'quantity': 2}])
+    assert isinstance(so, SimpleOrder)
+    assert so.id is not None
+    assert float(so.monto) == 5.0
+    s = Legacy()
+    try:
+        items = s.query(OrderItem).filter_by(order_id=so.id).all()
+        assert [(i.product_name, i.quantity) for i in items] == [('A', 2)]
+    finally:
+        s.close()
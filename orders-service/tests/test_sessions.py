@@ -0,0 +1,59 @@
+import os
+import resource
+import threading
+from app.db import Session, pool_options
+from app.repositories.repo import Repo
+
+
+def test_pool_options_from_env(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '12')
+    monkeypatch.setenv('DB_MAX_OVERFLOW', '3')
+    monkeypatch.setenv('DB_POOL_PRE_PING', '0')
+    monkeypatch.setenv('DB_POOL_RECYCLE', '60')
+    opts = pool_options('postgresql+psycopg2://u:p@h:5432/db')
+    assert opts == {'pool_size': 12, 'max_overflow': 3, 'pool_pre_ping': False, 'pool_recycle': 60}
+    # sqlite engines keep their default single-connection pools
+    assert pool_options('sqlite:///:memory:') == {}
+
+
+def test_repo_uses_thread_local_session():
+    r = Repo()
+    assert r.session is Session()
+    seen = {}
+
+    def worker():
+        seen['other'] = r.session
+        Session.remove()
+
+    t = threading.Thread(target=worker)
+    t.start()
+    t.join()
+    assert seen['other'] is not r.session
+
+
+def test_session_removed_after_each_request(client):
+    h = {'X-Customer-Id': 'cust-s'}
+    r = client.post('/api/orders', json={'order_number': 'SESS-1'}, headers=h)
+    assert r.status_code == 201
+    before = Session()
+    r = client.get('/api/orders/SESS-1', headers=h)
+    assert r.status_code == 200
+    # teardown discarded the request's session, so nothing accumulates across requests
+    after = Session()
+    assert after is not before
+    assert len(after.identity_map) == 0
+
+
+def test_rss_stable_across_requests(client):
+    # ORDERS_RSS_REQUESTS=100000 reproduces the long soak; the default keeps CI fast
+    n = int(os.getenv('ORDERS_RSS_REQUESTS', '2000'))
+    h = {'X-Customer-Id': 'cust-rss'}
+    client.post('/api/orders', json={'order_number': 'RSS-1', 'items': [{'name': 'p', 'unit_price': 1.5}]}, headers=h)
+    for _ in range(200):
+        client.get('/api/orders/RSS-1', headers=h)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for _ in range(n):
+        client.get('/api/orders/RSS-1', headers=h)
+    grown_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    assert grown_kb < 20 * 1024
+    assert len(Session().identity_map) == 0
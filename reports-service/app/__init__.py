@@ -10,6 +10,8 @@ def create_app():
     # register namespaces
     from app.controllers.api import ns as reports_ns
     api.add_namespace(reports_ns, path='/api/v1')
+    from app.controllers.sales import ns as sales_ns
+    api.add_namespace(sales_ns, path='/api/v1')
 
     # health
     @app.route('/health')
@@ -25,4 +27,28 @@ def create_app():
         except Exception as e:
             print('DB init error:', e)
 
+    # keep upcoming monthly sales partitions ready (PostgreSQL only)
+    from app.db import engine
+    from app import partitioning
+    if partitioning.supported(engine):
+        try:
+            partitioning.maintain(engine)
+        except Exception as e:
+            print('Partition maintenance error:', e)
+
+    # fold sales written by other writers (scripts, seeders, late commits) in the background:
+    # the first pass backfills any backlog without delaying startup, then every
+    # REPORTS_ROLLUP_CATCHUP_SECONDS so closed days don't miss them
+    from app.repositories.repo import start_rollup_catchup
+    if os.getenv('REPORTS_USE_ROLLUP', '1') == '1':
+        start_rollup_catchup(float(os.getenv('REPORTS_ROLLUP_CATCHUP_SECONDS', '60')))
+
+    # warm the optional analytics cube so the first dashboard request doesn't pay the load
+    from app.cube import sales_cube
+    if sales_cube.enabled:
+        try:
+            sales_cube.load()
+        except Exception as e:
+            print('Cube load error:', e)
+
     return app
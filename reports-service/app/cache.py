@@ -0,0 +1,191 @@
+"""Process-wide report cache.
+
+Size-bounded LRU with TTL, keyed on (criterion, start, end, ...), shared by every
+ReportsService instance in the process. Concurrent misses for the same key are
+collapsed into one computation (single-flight). An optional Redis backend
+(REPORTS_CACHE_REDIS_URL) shares results across pods. Ingestion invalidates
+every entry whose date window (including the previous comparison period)
+overlaps the dates it wrote; in Redis this is done per month, by version
+counter, without scanning the keyspace.
+"""
+
+from collections import OrderedDict
+import datetime
+import json
+import os
+import threading
+import time
+
+
+def _span(key):
+    """Dates a cached report depends on: previous window start .. end."""
+    start = datetime.date.fromisoformat(key[1])
+    end = datetime.date.fromisoformat(key[2])
+    return start - (end - start) - datetime.timedelta(days=1), end
+
+
+def _months(first, last):
+    """'YYYY-MM' for every month touched by first..last."""
+    months = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        months.append(f'{year:04d}-{month:02d}')
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class RedisBackend:
+    """Shared backend; keys are `prefix + generation + '|' + '|'.join(key)` holding JSON.
+
+    Every month has a counter at `prefix + 'v:YYYY-MM'`. An entry's generation is
+    the sum of the counters of the months its window spans; counters only grow,
+    so invalidating a range is one INCR per month and entries written before it
+    are no longer addressed (they expire by TTL). Invalidation is month-grained.
+    """
+    def __init__(self, client, prefix: str = 'reports:', ttl: int = 90):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _version_key(self, month):
+        return f'{self.prefix}v:{month}'
+
+    def _name(self, key):
+        versions = self.client.mget([self._version_key(m) for m in _months(*_span(key))])
+        generation = sum(int(v) for v in versions if v)
+        return f'{self.prefix}{generation}|' + '|'.join(key)
+
+    def get(self, key):
+        raw = self.client.get(self._name(key))
+        return json.loads(raw) if raw else None
+
+    def set(self, key, value):
+        self.client.set(self._name(key), json.dumps(value), ex=self.ttl or None)
+
+    def invalidate_range(self, first, last):
+        for month in _months(first, last):
+            self.client.incr(self._version_key(month))
+
+
+class ReportCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 90.0, backend=None, wait_timeout: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.wait_timeout = wait_timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        # bumped on every invalidation so a computation that raced with ingestion is not stored
+        self._version = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires >= time.monotonic():
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            return None
+        if value is not None:
+            self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set(self, key, value):
+        self._store(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value)
+            except Exception:
+                pass
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value or compute it once, even under concurrent callers."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = threading.Event()
+                self._inflight[key] = event
+            version = self._version
+        if not leader:
+            event.wait(self.wait_timeout)
+            value = self.get(key)
+            if value is not None:
+                return value
+            return compute()
+        try:
+            value = compute()
+            with self._lock:
+                fresh = version == self._version
+            if fresh:
+                self.set(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def invalidate_range(self, first: datetime.date, last: datetime.date):
+        """Drop entries whose report window or comparison window touches first..last."""
+        with self._lock:
+            self._version += 1
+            stale = [k for k in self._data if _overlaps(k, first, last)]
+            for k in stale:
+                del self._data[k]
+        if self.backend is not None:
+            try:
+                self.backend.invalidate_range(first, last)
+            except Exception:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _overlaps(key, first, last):
+    lo, hi = _span(key)
+    return lo <= last and hi >= first
+
+
+def build_backend():
+    url = os.getenv('REPORTS_CACHE_REDIS_URL')
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        print('[cache] REPORTS_CACHE_REDIS_URL set but redis is not installed; using local cache only')
+        return None
+    return RedisBackend(redis.Redis.from_url(url), ttl=int(os.getenv('REPORTS_CACHE_TTL', '90')))
+
+
+_backend = build_backend()
+# with a shared backend other pods may ingest data, so keep local copies short-lived
+report_cache = ReportCache(
+    maxsize=int(os.getenv('REPORTS_CACHE_SIZE', '256')),
+    ttl=float(os.getenv('REPORTS_CACHE_LOCAL_TTL', '10' if _backend else os.getenv('REPORTS_CACHE_TTL', '90'))),
+    backend=_backend,
+)
@@ -1,6 +1,8 @@
 from flask_restx import Namespace, Resource, fields
-from flask import request
-from app.services.reports_service import ReportsService
+from flask import request, Response
+from app.services.reports_service import ReportsService, CRITERIA, normalize_filters
+from app.jobs import report_jobs, iter_file, iter_decompressed
+from app.serialization import SHAPES, dumps, report_payload
 from datetime import datetime, date
 
 ns = Namespace('reports', description='Reports operations')
@@ -9,6 +11,12 @@ report_model = ns.model('ReportRequest', {
     'criterion': fields.String(required=True, description='salesperson|product|zone'),
     'start': fields.String(required=True, description='YYYY-MM-DD'),
     'end': fields.String(required=True, description='YYYY-MM-DD'),
+    'filters': fields.Raw(required=False, description='optional {"zone": "North", "product": ["A", "B"]}'),
+    'shape': fields.String(required=False, description='rows (default) | columnar: daily/series as {dates, totals} arrays'),
+})
+
+job_model = ns.inherit('ReportJobRequest', report_model, {
+    'layout': fields.String(required=False, description='rows (default) | columnar'),
 })
 
 report_resp = ns.model('ReportResponse', {
@@ -38,10 +46,13 @@ def role_required(role):
 @ns.route('/reports')
 class ReportsResource(Resource):
     @ns.expect(report_model)
-    @ns.marshal_with(report_resp)
+    @ns.response(200, 'Report', report_resp)
     def post(self):
         body = request.get_json() or {}
         criterion = body.get('criterion')
+        shape = body.get('shape') or 'rows'
+        if shape not in SHAPES:
+            ns.abort(400, 'shape must be rows or columnar')
         start_s = body.get('start')
         end_s = body.get('end')
         try:
@@ -51,8 +62,95 @@ class ReportsResource(Resource):
             ns.abort(400, 'invalid dates')
 
         svc = ReportsService()
+        filters = body.get('filters')
+        kwargs = {'filters': filters} if filters else {}
+        try:
+            r = svc.generate_report(criterion, start, end, **kwargs)
+        except ValueError as e:
+            ns.abort(400, str(e))
+        # encode the cached dict in one call rather than marshalling it row by row
+        return Response(dumps(report_payload(r, shape)), mimetype='application/json')
+
+
+def _job_links(job):
+    base = f"/api/v1/reports/jobs/{job['job_id']}"
+    return {**job, 'links': {'status': base, 'result': base + '/result'}}
+
+
+@ns.route('/reports/jobs')
+class ReportJobsResource(Resource):
+    @ns.expect(job_model)
+    def post(self):
+        """Queue a report job; identical requests return the existing job."""
+        body = request.get_json() or {}
+        criterion = body.get('criterion')
+        try:
+            start = datetime.fromisoformat(body.get('start')).date()
+            end = datetime.fromisoformat(body.get('end')).date()
+        except Exception:
+            ns.abort(400, 'invalid dates')
+        if criterion not in CRITERIA:
+            ns.abort(400, 'invalid criterion')
+        try:
+            filters = normalize_filters(body.get('filters'))
+            job = report_jobs.submit(criterion, start, end, filters, body.get('layout') or 'rows')
+        except ValueError as e:
+            ns.abort(400, str(e))
+        return _job_links(job), 200 if job['status'] == 'done' else 202
+
+
+@ns.route('/reports/jobs/<string:job_id>')
+class ReportJobResource(Resource):
+    def get(self, job_id):
+        job = report_jobs.status(job_id)
+        if job is None:
+            ns.abort(404, 'job not found')
+        return _job_links(job), 200
+
+
+@ns.route('/reports/jobs/<string:job_id>/result')
+class ReportJobResultResource(Resource):
+    def get(self, job_id):
+        job = report_jobs.status(job_id)
+        if job is None:
+            ns.abort(404, 'job not found')
+        path = report_jobs.result_path(job_id)
+        if path is None:
+            ns.abort(409, f"job is {job['status']}")
+        # hand the stored gzip straight to clients that accept it, inflate on the fly otherwise
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            resp = Response(iter_file(path), mimetype='application/json')
+            resp.headers['Content-Encoding'] = 'gzip'
+            resp.headers['Content-Length'] = str(job['size'])
+        else:
+            resp = Response(iter_decompressed(path), mimetype='application/json')
+        resp.headers['Vary'] = 'Accept-Encoding'
+        return resp
+
+
+top_model = ns.model('GroupedTopRequest', {
+    'dimensions': fields.List(fields.String, required=True, description='ordered, e.g. ["zone", "product"] = top products per zone'),
+    'start': fields.String(required=True, description='YYYY-MM-DD'),
+    'end': fields.String(required=True, description='YYYY-MM-DD'),
+    'n': fields.Integer(required=False, description='rows per group (default 5, max 100)'),
+    'filters': fields.Raw(required=False),
+    'series': fields.Boolean(required=False, description='also return daily totals per group combination'),
+})
+
+
+@ns.route('/reports/top')
+class GroupedTopResource(Resource):
+    @ns.expect(top_model)
+    def post(self):
+        body = request.get_json() or {}
+        try:
+            start = datetime.fromisoformat(body.get('start')).date()
+            end = datetime.fromisoformat(body.get('end')).date()
+        except Exception:
+            ns.abort(400, 'invalid dates')
         try:
-            r = svc.generate_report(criterion, start, end)
-            return r
+            r = ReportsService().top_by_group(body.get('dimensions'), start, end, body.get('n', 5),
+                                              body.get('filters'), bool(body.get('series')))
         except ValueError as e:
             ns.abort(400, str(e))
+        return r, 200
@@ -0,0 +1,34 @@
+from flask_restx import Namespace, Resource
+from flask import request
+from app.services.ingest_service import IngestAborted, IngestService
+
+ns = Namespace('sales', description='Sales ingestion')
+
+CONTENT_TYPES = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/ndjson': 'ndjson'}
+
+
+def _lines(stream):
+    # decode the request body lazily, one line at a time
+    for raw in stream:
+        yield raw.decode('utf-8')
+
+
+@ns.route('/sales/bulk')
+class SalesBulkResource(Resource):
+    def post(self):
+        fmt = request.args.get('format') or CONTENT_TYPES.get(request.mimetype)
+        if fmt not in ('csv', 'ndjson'):
+            ns.abort(415, 'send text/csv or application/x-ndjson (or ?format=csv|ndjson)')
+        try:
+            batch_size = int(request.args.get('batch_size', 5000))
+        except ValueError:
+            ns.abort(400, 'invalid batch_size')
+        if not 1 <= batch_size <= 50000:
+            ns.abort(400, 'batch_size must be between 1 and 50000')
+        svc = IngestService(batch_size=batch_size)
+        try:
+            summary = svc.ingest(_lines(request.stream), fmt)
+        except IngestAborted as e:
+            # earlier batches are committed; the summary says where to resume
+            return e.summary, 400 if e.reason == 'decode' else 500
+        return summary, 200
@@ -0,0 +1,215 @@
+"""Optional in-process analytics cube over sales_daily_rollup.
+
+The rollup is held as parallel NumPy columns (day ordinal, salesperson, product
+and zone codes, total); one entry per rollup row, so memory follows the number
+of non-empty (day, salesperson, product, zone) cells rather than the full dense
+product of the dimensions. Reports, including any combination of dimension
+filters, are answered by boolean masking and bincount over those columns.
+
+Enabled with REPORTS_CUBE=1 when numpy is installed. The cube refreshes
+incrementally: sales folded into the rollup after the last load are aggregated
+by id range and appended as extra entries (sums are additive), and ingestion
+through Repo marks it stale so the next report picks them up.
+"""
+
+import datetime
+import os
+import threading
+import time
+
+from sqlalchemy import select, func
+
+from app.db import SessionLocal
+from app.domain.models import Sale, SalesDailyRollup, RollupWatermark
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+DIMENSIONS = ('salesperson', 'product', 'zone')
+ROLLUP = 'sales_daily_rollup'
+
+
+class SalesCube:
+    def __init__(self, session_factory=SessionLocal, refresh_interval: float = 30.0, enabled: bool = True):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.enabled = enabled and np is not None
+        self._lock = threading.Lock()
+        # serialises load/refresh: the watermark read, delta query and append must not
+        # interleave, or two threads would append the same delta
+        self._refresh_lock = threading.RLock()
+        self.loaded = False
+        self.stale = True
+        self.needs_reload = False
+        self.last_sale_id = 0
+        self._checked_at = 0.0
+        self._base_rows = 0
+        self._reset()
+
+    def _reset(self):
+        self.labels = {d: [] for d in DIMENSIONS}
+        self.codes = {d: {} for d in DIMENSIONS}
+        self.cols = None
+
+    def _encode(self, dim, values):
+        codes = self.codes[dim]
+        labels = self.labels[dim]
+        out = np.empty(len(values), dtype=np.int32)
+        for i, v in enumerate(values):
+            c = codes.get(v)
+            if c is None:
+                c = codes[v] = len(labels)
+                labels.append(v)
+            out[i] = c
+        return out
+
+    def _columns(self, rows):
+        # rows: (date, salesperson, product, zone, total)
+        cols = {'day': np.fromiter((r[0].toordinal() for r in rows), dtype=np.int32, count=len(rows))}
+        for i, dim in enumerate(DIMENSIONS, start=1):
+            cols[dim] = self._encode(dim, [r[i] for r in rows])
+        cols['total'] = np.fromiter((float(r[4]) for r in rows), dtype=np.float64, count=len(rows))
+        return cols
+
+    def _watermark(self, s):
+        wm = s.execute(select(RollupWatermark.last_sale_id).where(RollupWatermark.name == ROLLUP)).scalar()
+        return wm or 0
+
+    def load(self):
+        """Full load of the rollup together with its watermark, from one snapshot."""
+        with self._refresh_lock:
+            self._load()
+
+    def _load(self):
+        # cleared before reading, so a mark_stale() that races with the read is kept
+        self.stale = False
+        self.needs_reload = False
+        s = self.session_factory()
+        try:
+            # the watermark rides along as a scalar subquery: one statement sees one snapshot,
+            # whereas two reads could straddle a fold and have refresh() append it again
+            r = SalesDailyRollup
+            wm_col = (select(RollupWatermark.last_sale_id).where(RollupWatermark.name == ROLLUP)
+                      .scalar_subquery().label('wm'))
+            rows = s.execute(select(r.date, r.salesperson, r.product, r.zone, r.total, wm_col)).all()
+            # an empty rollup has folded nothing yet; refresh() picks everything up from id 0
+            wm = (rows[0].wm or 0) if rows else 0
+        finally:
+            s.close()
+        with self._lock:
+            self._reset()
+            self.cols = self._columns(rows)
+            self._base_rows = len(rows)
+            self.last_sale_id = wm
+            self.loaded = True
+            self._checked_at = time.monotonic()
+
+    def refresh(self):
+        """Append aggregates of sales folded into the rollup since the last load/refresh."""
+        with self._refresh_lock:
+            self._refresh()
+
+    def _refresh(self):
+        self.stale = False
+        s = self.session_factory()
+        try:
+            wm = self._watermark(s)
+            if wm <= self.last_sale_id:
+                rows = []
+            else:
+                stmt = select(Sale.date, Sale.salesperson, Sale.product, Sale.zone, func.sum(Sale.amount)).where(Sale.id > self.last_sale_id).where(Sale.id <= wm).group_by(Sale.date, Sale.salesperson, Sale.product, Sale.zone)
+                rows = s.execute(stmt).all()
+        finally:
+            s.close()
+        with self._lock:
+            if rows:
+                delta = self._columns(rows)
+                self.cols = {k: np.concatenate([self.cols[k], delta[k]]) for k in self.cols}
+            self.last_sale_id = max(self.last_sale_id, wm)
+            self._checked_at = time.monotonic()
+        # appended deltas duplicate cells; rebuild once they outgrow the base load
+        if len(self.cols['day']) > 2 * max(self._base_rows, 1000):
+            self._load()
+
+    def mark_stale(self):
+        self.stale = True
+
+    def invalidate(self):
+        """Force a full reload on the next report (rows were folded below the watermark)."""
+        self.needs_reload = True
+
+    def _due(self):
+        return not self.loaded or self.needs_reload or self.stale or time.monotonic() - self._checked_at > self.refresh_interval
+
+    def ensure_fresh(self):
+        if not self._due():
+            return
+        with self._refresh_lock:
+            # another thread may have refreshed while this one waited
+            if not self.loaded or self.needs_reload:
+                self._load()
+            elif self._due():
+                self._refresh()
+
+    def report(self, criterion: str, start: datetime.date, end: datetime.date, filters=None):
+        """Same shape as reports_service.build_report, computed with vectorised slices."""
+        self.ensure_fresh()
+        with self._lock:
+            cols = self.cols
+            labels = list(self.labels[criterion])
+            codes = {d: dict(self.codes[d]) for d in DIMENSIONS}
+        lo = (start - (end - start) - datetime.timedelta(days=1)).toordinal()
+        s, hi = start.toordinal(), end.toordinal()
+        day = cols['day']
+        mask = (day >= lo) & (day <= hi)
+        for dim, values in (filters or {}).items():
+            wanted = [codes[dim][v] for v in values if v in codes[dim]]
+            mask &= np.isin(cols[dim], np.array(wanted, dtype=np.int32))
+        d = day[mask]
+        g = cols[criterion][mask]
+        t = cols['total'][mask]
+        cur = d >= s
+        prev_total = float(t[~cur].sum())
+        d, g, t = d[cur], g[cur], t[cur]
+        total = float(t.sum())
+        pct_change = None
+        if prev_total:
+            pct_change = (total - prev_total) / prev_total * 100.0
+
+        n_groups = len(labels)
+        group_tot = np.bincount(g, weights=t, minlength=n_groups)
+        present = np.flatnonzero(np.bincount(g, minlength=n_groups))
+        ranked = sorted(present.tolist(), key=lambda i: (-group_tot[i], str(labels[i])))[:5]
+
+        ndays = hi - s + 1
+        day_idx = d - s
+        daily_tot = np.bincount(day_idx, weights=t, minlength=ndays)
+        days_present = np.flatnonzero(np.bincount(day_idx, minlength=ndays))
+
+        cell = day_idx.astype(np.int64) * max(n_groups, 1) + g
+        cells, inverse = np.unique(cell, return_inverse=True)
+        cell_tot = np.bincount(inverse, weights=t, minlength=len(cells))
+        iso = lambda i: datetime.date.fromordinal(s + int(i)).isoformat()
+        # cells are sorted by (day, group code); order groups by label within a day like build_report
+        series = sorted(
+            ((int(c // max(n_groups, 1)), labels[int(c % max(n_groups, 1))], round(float(v), 2)) for c, v in zip(cells, cell_tot)),
+            key=lambda r: (r[0], str(r[1])),
+        )
+        return {
+            'criterion': criterion,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'total': round(total, 2),
+            'pct_change': pct_change,
+            'top5': [{criterion: labels[i], 'total': round(float(group_tot[i]), 2)} for i in ranked],
+            'series': [{'date': iso(di), criterion: lab, 'total': v} for di, lab, v in series],
+            'daily': [{'date': iso(i), 'total': round(float(daily_tot[i]), 2)} for i in days_present],
+        }
+
+
+sales_cube = SalesCube(
+    refresh_interval=float(os.getenv('REPORTS_CUBE_REFRESH', '30')),
+    enabled=os.getenv('REPORTS_CUBE', '0') == '1',
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, Index
+from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, Index
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -17,3 +17,37 @@ class Sale(Base):
         Index('ix_sales_date_product', 'date', 'product'),
         Index('ix_sales_date_zone', 'date', 'zone'),
     )
+
+
+class SalesDailyRollup(Base):
+    """Per-day totals for every (salesperson, product, zone) combination.
+
+    Maintained incrementally from `sales` (see Repo.catch_up_rollup) so report
+    queries scale with days x groups rather than with the number of sales."""
+    __tablename__ = 'sales_daily_rollup'
+    date = Column(Date, primary_key=True)
+    salesperson = Column(String(100), primary_key=True)
+    product = Column(String(100), primary_key=True)
+    zone = Column(String(100), primary_key=True)
+    total = Column(Numeric(14,2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """Highest sales.id already folded into a rollup table."""
+    __tablename__ = 'rollup_watermark'
+    name = Column(String(50), primary_key=True)
+    last_sale_id = Column(Integer, nullable=False, default=0)
+
+
+class RollupGap(Base):
+    """sales.id range [first_id, last_id] the watermark passed while the ids were absent.
+
+    Sequence values commit out of order, so a concurrent writer's row can appear
+    below the watermark after a fold; pending gaps are re-checked on every fold
+    until they fill or are older than REPORTS_ROLLUP_GAP_SECONDS (rolled back)."""
+    __tablename__ = 'rollup_gaps'
+    name = Column(String(50), primary_key=True)
+    first_id = Column(Integer, primary_key=True)
+    last_id = Column(Integer, nullable=False)
+    recorded_at = Column(DateTime, nullable=False)
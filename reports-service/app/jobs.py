@@ -0,0 +1,246 @@
+"""Asynchronous report jobs for large date ranges.
+
+POST /reports/jobs queues a report on a small worker pool instead of building it
+inside the API request. The finished report is written to REPORTS_JOB_DIR as
+gzip-compressed JSON (`<job_id>.json.gz`, plus a `<job_id>.meta.json` sidecar),
+and GET streams that file back, so multi-year series never pass through
+flask_restx marshalling.
+
+With layout='columnar' the `series` and `daily` lists are stored as parallel
+arrays (see app.serialization.columnar), which repeat no keys and compress
+several times smaller than the row layout.
+
+Identical requests (same criterion, window, filters and layout) reuse the queued,
+running or finished job. Ingestion invalidates finished jobs whose window
+overlaps the written dates, the same way as the report cache; a job that was
+running during such an ingestion is kept for its caller but not reused.
+
+The sidecar is rewritten on every state change (queued, running, done, failed),
+so with several server workers sharing REPORTS_JOB_DIR any of them can answer a
+status poll or serve the result. Reuse of identical requests and invalidation
+stay per process: two workers may each run the same request once.
+"""
+
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.serialization import columnar, dumps
+
+LAYOUTS = ('rows', 'columnar')
+CHUNK_SIZE = 64 * 1024
+
+
+def _span(params):
+    start = datetime.date.fromisoformat(params['start'])
+    end = datetime.date.fromisoformat(params['end'])
+    return start - (end - start) - datetime.timedelta(days=1), end
+
+
+class ReportJobs:
+    def __init__(self, directory: str, workers: int = 2, ttl: float = 86400.0, compute=None):
+        self.directory = directory
+        self.workers = workers
+        self.ttl = ttl
+        # compute(criterion, start, end, filters) -> report dict; defaults to ReportsService
+        self.compute = compute or _compute_report
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._by_key = {}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report-job')
+            return self._executor
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.directory, job_id + suffix)
+
+    def submit(self, criterion: str, start: datetime.date, end: datetime.date, filters=None, layout: str = 'rows'):
+        """Queue a report job, or return the matching existing one. Returns the job's status dict."""
+        if layout not in LAYOUTS:
+            raise ValueError('layout must be rows or columnar')
+        params = {'criterion': criterion, 'start': start.isoformat(), 'end': end.isoformat(),
+                  'filters': filters or None, 'layout': layout}
+        key = json.dumps(params, sort_keys=True)
+        self.purge_expired()
+        with self._lock:
+            job_id = self._by_key.get(key)
+            if job_id is not None and self._jobs[job_id]['status'] != 'failed':
+                return dict(self._jobs[job_id])
+            job_id = uuid.uuid4().hex
+            job = {'job_id': job_id, 'status': 'queued', 'created_at': time.time(), 'finished_at': None,
+                   'error': None, 'size': None, **params}
+            self._jobs[job_id] = job
+            self._by_key[key] = job_id
+        # before the worker can write 'running', so the sidecar never goes backwards
+        self._save(dict(job))
+        self._pool().submit(self._run, job_id, key, params)
+        return dict(job)
+
+    def _run(self, job_id, key, params):
+        try:
+            self._save(self._update(job_id, status='running'))
+            report = self.compute(params['criterion'], datetime.date.fromisoformat(params['start']),
+                                  datetime.date.fromisoformat(params['end']), params['filters'])
+            if params['layout'] == 'columnar':
+                report = columnar(report)
+            size = self._write(job_id, report)
+        except Exception as e:
+            job = self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+            with self._lock:
+                if self._by_key.get(key) == job_id:
+                    del self._by_key[key]
+            try:
+                self._save(job)
+            except OSError:
+                pass
+            return
+        self._save(self._update(job_id, status='done', size=size, finished_at=time.time()))
+
+    def _save(self, job):
+        # replaced atomically: a poll from another worker never reads a half-written sidecar
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(job, f)
+            os.replace(tmp, self._path(job['job_id'], '.meta.json'))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _write(self, job_id, report):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as gz:
+                gz.write(dumps(report))
+            os.replace(tmp, self._path(job_id, '.json.gz'))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return os.path.getsize(self._path(job_id, '.json.gz'))
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(changes)
+            return dict(job)
+
+    def status(self, job_id: str):
+        """Status dict for a job, or None. Jobs of other workers and finished jobs from
+        before a restart are read from their sidecar."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        if not _valid_id(job_id):
+            return None
+        try:
+            with open(self._path(job_id, '.meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def result_path(self, job_id: str):
+        """Path of the gzip result for a finished job, or None."""
+        job = self.status(job_id)
+        if not job or job['status'] != 'done':
+            return None
+        path = self._path(job_id, '.json.gz')
+        return path if os.path.exists(path) else None
+
+    def invalidate_range(self, first: datetime.date, last: datetime.date):
+        """Stop reusing jobs whose report or comparison window touches first..last."""
+        with self._lock:
+            for key, job_id in list(self._by_key.items()):
+                lo, hi = _span(self._jobs[job_id])
+                if lo <= last and hi >= first:
+                    del self._by_key[key]
+
+    def purge_expired(self):
+        """Forget jobs and delete result files older than the TTL."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [j for j, job in self._jobs.items() if job['finished_at'] and job['finished_at'] < cutoff]
+            for job_id in expired:
+                job = self._jobs.pop(job_id)
+                key = json.dumps({k: job[k] for k in ('criterion', 'start', 'end', 'filters', 'layout')}, sort_keys=True)
+                if self._by_key.get(key) == job_id:
+                    del self._by_key[key]
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._jobs.clear()
+            self._by_key.clear()
+
+    def wait(self, job_id: str, timeout: float = 30.0):
+        """Block until the job leaves queued/running (used by tests and scripts)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.status(job_id)
+            if job is None or job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.01)
+        return self.status(job_id)
+
+
+def _valid_id(job_id):
+    return len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)
+
+
+def _compute_report(criterion, start, end, filters):
+    # bypasses the report cache: year-end results are large and go to disk instead
+    from app.services.reports_service import ReportsService
+    svc = ReportsService()
+    try:
+        return svc.compute_report(criterion, start, end, filters)
+    finally:
+        close = getattr(svc.repo.session, 'close', None)
+        if close:
+            close()
+
+
+def iter_file(path, chunk_size: int = CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_decompressed(path, chunk_size: int = CHUNK_SIZE):
+    with gzip.open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+report_jobs = ReportJobs(
+    directory=os.getenv('REPORTS_JOB_DIR', os.path.join(tempfile.gettempdir(), 'reports-jobs')),
+    workers=int(os.getenv('REPORTS_JOB_WORKERS', '2')),
+    ttl=float(os.getenv('REPORTS_JOB_TTL', '86400')),
+)
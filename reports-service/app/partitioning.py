@@ -0,0 +1,236 @@
+"""Monthly range partitioning of `sales` on PostgreSQL.
+
+`sales` becomes a declaratively partitioned table (PARTITION BY RANGE (date))
+with one child per month, `sales_YYYY_MM`, plus `sales_default` as a safety net
+for dates no partition covers yet. Report queries filter on `date`, so the
+planner prunes to the requested months and each write only touches one small
+month's indexes.
+
+Partitions are created ahead of time (ensure_partitions) and on demand for the
+months an ingestion batch touches (ensure_partitions_for). Old months can be
+detached and archived or dropped (apply_retention); the daily rollup keeps
+their aggregates, so reports over archived months keep working.
+
+On other databases (SQLite in tests and local runs) every function here is a
+no-op and `sales` stays a single table created by Base.metadata.create_all.
+"""
+
+import datetime
+import os
+import re
+import threading
+
+from sqlalchemy import text
+
+from app.domain.models import Sale
+
+PARTITION_RE = re.compile(r'^sales_(\d{4})_(\d{2})$')
+
+_known_months = set()
+_known_lock = threading.Lock()
+
+
+def month_start(d: datetime.date) -> datetime.date:
+    return d.replace(day=1)
+
+
+def add_months(d: datetime.date, n: int) -> datetime.date:
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return datetime.date(y, m + 1, 1)
+
+
+def months_between(first: datetime.date, last: datetime.date):
+    """Month starts from first's month through last's month, inclusive."""
+    m = month_start(first)
+    out = []
+    while m <= last:
+        out.append(m)
+        m = add_months(m, 1)
+    return out
+
+
+def _as_date(d):
+    return d if isinstance(d, datetime.date) else datetime.date.fromisoformat(str(d))
+
+
+def partition_name(month: datetime.date) -> str:
+    return f'sales_{month.year:04d}_{month.month:02d}'
+
+
+def supported(engine) -> bool:
+    return engine.dialect.name == 'postgresql'
+
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != 'postgresql':
+        return False
+    q = text("SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = 'sales' AND pg_table_is_visible(c.oid)")
+    return conn.execute(q).first() is not None
+
+
+def create_partitioned_sales(engine) -> bool:
+    """Create `sales` as a partitioned table when it does not exist yet.
+
+    Returns True when the table was created. Existing tables are left alone;
+    use migrate_to_partitioned for those."""
+    if not supported(engine):
+        return False
+    with engine.begin() as conn:
+        return _create_partitioned_sales(conn)
+
+
+def _create_partitioned_sales(conn) -> bool:
+    exists = conn.execute(text("SELECT to_regclass('sales')")).scalar()
+    if exists:
+        return False
+    conn.execute(text('''
+        CREATE TABLE sales (
+            id BIGSERIAL,
+            date DATE NOT NULL,
+            salesperson VARCHAR(100) NOT NULL,
+            product VARCHAR(100) NOT NULL,
+            zone VARCHAR(100) NOT NULL,
+            amount NUMERIC(12,2) NOT NULL,
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    '''))
+    conn.execute(text('CREATE TABLE sales_default PARTITION OF sales DEFAULT'))
+    # indexes declared on the model, created on the parent so every partition inherits them
+    for idx in Sale.__table__.indexes:
+        idx.create(conn, checkfirst=True)
+    return True
+
+
+def _create_partition(conn, month: datetime.date):
+    name = partition_name(month)
+    lo, hi = month.isoformat(), add_months(month, 1).isoformat()
+    # build the month as a standalone table, move any rows parked in the default
+    # partition, then attach; a plain CREATE ... PARTITION OF would fail if
+    # sales_default already held rows for this month
+    conn.execute(text(f'CREATE TABLE IF NOT EXISTS {name} (LIKE sales INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    # IF NOT EXISTS may have found a leftover table that still carries the check
+    conn.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT IF EXISTS {name}_range'))
+    conn.execute(text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_range CHECK (date >= DATE '{lo}' AND date < DATE '{hi}')"))
+    conn.execute(text(f"INSERT INTO {name} SELECT * FROM sales_default WHERE date >= DATE '{lo}' AND date < DATE '{hi}'"))
+    conn.execute(text(f"DELETE FROM sales_default WHERE date >= DATE '{lo}' AND date < DATE '{hi}'"))
+    conn.execute(text(f"ALTER TABLE sales ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+    # the CHECK made ATTACH skip its validation scan; the partition bound now enforces it
+    conn.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT {name}_range'))
+
+
+def existing_partitions(conn):
+    q = text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'sales'")
+    out = set()
+    for (name,) in conn.execute(q):
+        m = PARTITION_RE.match(name)
+        if m:
+            out.add(datetime.date(int(m.group(1)), int(m.group(2)), 1))
+    return out
+
+
+def ensure_partitions_for(engine, first: datetime.date, last: datetime.date):
+    """Make sure monthly partitions exist for first..last. Returns names created."""
+    if not supported(engine):
+        return []
+    first, last = _as_date(first), _as_date(last)
+    wanted = [m for m in months_between(first, last) if m not in _known_months]
+    if not wanted:
+        return []
+    with engine.begin() as conn:
+        # an unpartitioned table needs nothing; remembering the months keeps this check off later batches
+        created = _ensure_partitions(conn, wanted) if is_partitioned(conn) else []
+    with _known_lock:
+        _known_months.update(wanted)
+    return created
+
+
+def _ensure_partitions(conn, months):
+    # serialise partition DDL across workers/pods
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('sales_partitions'))"))
+    present = existing_partitions(conn)
+    created = []
+    for m in months:
+        if m not in present:
+            _create_partition(conn, m)
+            created.append(partition_name(m))
+    return created
+
+
+def ensure_partitions(engine, months_ahead: int = 3, today: datetime.date | None = None):
+    """Create partitions for the current month and the next `months_ahead` months."""
+    today = today or datetime.date.today()
+    return ensure_partitions_for(engine, month_start(today), add_months(month_start(today), months_ahead))
+
+
+def apply_retention(engine, keep_months: int, archive: bool = True, today: datetime.date | None = None):
+    """Detach monthly partitions older than keep_months.
+
+    Archived partitions are renamed sales_archive_YYYY_MM (kept for audits but
+    out of every query plan); otherwise they are dropped. Returns affected names."""
+    if not supported(engine) or keep_months <= 0:
+        return []
+    cutoff = add_months(month_start(today or datetime.date.today()), -keep_months)
+    affected = []
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return []
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('sales_partitions'))"))
+        for m in sorted(existing_partitions(conn)):
+            if m >= cutoff:
+                continue
+            name = partition_name(m)
+            conn.execute(text(f'ALTER TABLE sales DETACH PARTITION {name}'))
+            if archive:
+                conn.execute(text(f'ALTER TABLE {name} RENAME TO sales_archive_{m.year:04d}_{m.month:02d}'))
+            else:
+                conn.execute(text(f'DROP TABLE {name}'))
+            affected.append(name)
+            _known_months.discard(m)
+    return affected
+
+
+def migrate_to_partitioned(engine) -> int:
+    """Convert an existing single-table `sales` into the partitioned layout.
+
+    Renames the old table to sales_unpartitioned, creates the partitioned table
+    and its monthly partitions and copies every row, all in one transaction
+    (PostgreSQL DDL is transactional): a failure leaves `sales` as it was.
+    Returns rows copied."""
+    if not supported(engine):
+        return 0
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            return 0
+        conn.execute(text('ALTER TABLE sales RENAME TO sales_unpartitioned'))
+        conn.execute(text('ALTER INDEX IF EXISTS sales_pkey RENAME TO sales_unpartitioned_pkey'))
+        for idx in Sale.__table__.indexes:
+            conn.execute(text(f'ALTER INDEX IF EXISTS {idx.name} RENAME TO {idx.name}_unpartitioned'))
+        # the old serial sequence stays owned by sales_unpartitioned.id; the new
+        # BIGSERIAL gets its own sequence, advanced past the copied ids below
+        _create_partitioned_sales(conn)
+        lo, hi, max_id = conn.execute(text('SELECT min(date), max(date), max(id) FROM sales_unpartitioned')).first()
+        if lo is None:
+            return 0
+        months = months_between(_as_date(lo), _as_date(hi))
+        _ensure_partitions(conn, months)
+        res = conn.execute(text('INSERT INTO sales (id, date, salesperson, product, zone, amount) SELECT id, date, salesperson, product, zone, amount FROM sales_unpartitioned'))
+        conn.execute(text("SELECT setval(pg_get_serial_sequence('sales', 'id'), :v)"), {'v': max_id})
+        copied = res.rowcount
+    with _known_lock:
+        _known_months.update(months)
+    return copied
+
+
+def maintain(engine):
+    """Startup/cron hook: create upcoming partitions and apply the retention policy.
+
+    REPORTS_PARTITIONS_AHEAD (default 3) months are kept ready;
+    REPORTS_SALES_RETENTION_MONTHS (default 0 = keep everything) bounds history and
+    REPORTS_SALES_ARCHIVE=0 drops expired months instead of archiving them."""
+    created = ensure_partitions(engine, int(os.getenv('REPORTS_PARTITIONS_AHEAD', '3')))
+    expired = apply_retention(
+        engine,
+        int(os.getenv('REPORTS_SALES_RETENTION_MONTHS', '0')),
+        archive=os.getenv('REPORTS_SALES_ARCHIVE', '1') == '1',
+    )
+    return created, expired
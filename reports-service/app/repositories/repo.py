@@ -1,27 +1,307 @@
-from sqlalchemy import select, func, cast, Date
+from sqlalchemy import select, func, union_all, insert, or_
+from sqlalchemy.dialects import postgresql, sqlite
 from app.db import SessionLocal
-from app.domain.models import Sale
+from app.cache import report_cache
+from app.cube import sales_cube
+from app.jobs import report_jobs
+from app.partitioning import ensure_partitions_for
+from app.domain.models import Sale, SalesDailyRollup, RollupWatermark, RollupGap
+import csv
+import datetime
+import heapq
+import io
+import os
+import sqlite3
+import threading
+import time
+
+ROLLUP = 'sales_daily_rollup'
+SALE_COLUMNS = ('date', 'salesperson', 'product', 'zone', 'amount')
+# a missing id still absent after this long belongs to a rolled-back transaction
+GAP_SECONDS = int(os.getenv('REPORTS_ROLLUP_GAP_SECONDS', '3600'))
+# sales ids folded per transaction by the catch-up
+FOLD_CHUNK = 50000
+# id ranges OR-ed into one aggregate statement
+RANGES_PER_STATEMENT = 500
+
+
+def _missing(ids, first, last):
+    """Ranges (a, b) within first..last not covered by the sorted ids."""
+    out, expected = [], first
+    for i in ids:
+        if i > expected:
+            out.append((expected, i - 1))
+        expected = i + 1
+    if expected <= last:
+        out.append((expected, last))
+    return out
+
+
+def _present(gaps, first, last):
+    """Ranges (a, b) within first..last not covered by the sorted, disjoint gaps."""
+    out, start = [], first
+    for a, b in gaps:
+        if a > start:
+            out.append((start, a - 1))
+        start = b + 1
+    if start <= last:
+        out.append((start, last))
+    return out
+
+
+class Fold:
+    """What one fold wrote: sales rows, their date span, whether any came from
+    gaps below the watermark, and whether the watermark reached max(sales.id)."""
+    def __init__(self):
+        self.count = 0
+        self.first = self.last = None
+        self.late = False
+        self.done = True
+
+    def add(self, count, first, last):
+        if not count:
+            return
+        self.count += count
+        self.first = first if self.first is None else min(self.first, first)
+        self.last = last if self.last is None else max(self.last, last)
+
+
+def _iso(d):
+    return d.isoformat() if hasattr(d, 'isoformat') else str(d)
+
 
 class Repo:
-    def __init__(self, session=None):
+    def __init__(self, session=None, use_rollup=None):
         self.session = session or SessionLocal()
+        if use_rollup is None:
+            use_rollup = os.getenv('REPORTS_USE_ROLLUP', '1') == '1'
+        self.use_rollup = use_rollup
 
     def insert_sales_bulk(self, rows):
-        self.session.bulk_save_objects([Sale(**r) for r in rows])
-        self.session.commit()
+        self.load_sales_batch(rows)
+
+    def load_sales_batch(self, rows):
+        """Insert one batch of sale dicts and fold it into the rollup in one transaction.
+
+        PostgreSQL (psycopg2) loads through COPY FROM STDIN; other databases use a
+        single executemany of a Core INSERT. Returns the number of rows written."""
+        if not rows:
+            return 0
+        dates = [r['date'] for r in rows]
+        ensure_partitions_for(self.session.get_bind(), min(dates), max(dates))
+        # take the watermark lock first so concurrent bulk loads fold their rows in id order
+        self._lock_watermark()
+        try:
+            if not self._copy_sales(rows):
+                self.session.execute(insert(Sale), [{k: r[k] for k in SALE_COLUMNS} for r in rows])
+            # this batch plus at most one chunk of backlog; the catch-up folds the rest
+            fold = self._fold_new_sales(len(rows) + FOLD_CHUNK)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        self._invalidate_reports(fold)
+        return len(rows)
+
+    def _copy_sales(self, rows):
+        if self.session.get_bind().dialect.name != 'postgresql':
+            return False
+        dbapi_conn = self.session.connection().connection.dbapi_connection
+        cur = dbapi_conn.cursor()
+        if not hasattr(cur, 'copy_expert'):
+            cur.close()
+            return False
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        for r in rows:
+            d = r['date']
+            w.writerow([d.isoformat() if hasattr(d, 'isoformat') else d] + [r[k] for k in SALE_COLUMNS[1:]])
+        buf.seek(0)
+        try:
+            cur.copy_expert(f"COPY sales ({', '.join(SALE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+        finally:
+            cur.close()
+        return True
+
+    def _lock_watermark(self):
+        wm = self.session.execute(select(RollupWatermark).where(RollupWatermark.name == ROLLUP).with_for_update()).scalar_one_or_none()
+        if wm is None:
+            wm = RollupWatermark(name=ROLLUP, last_sale_id=0)
+            self.session.add(wm)
+            self.session.flush()
+        return wm
+
+    def catch_up_rollup(self):
+        """Fold sales with id above the watermark, or inside a pending gap below it,
+        into sales_daily_rollup.
+
+        Picks up rows written by any means (bulk loads, scripts, other services).
+        Commits every FOLD_CHUNK ids, so a large backlog holds the watermark lock
+        (and blocks bulk loads) for one chunk at a time. Returns the number of
+        sales rows folded in."""
+        total = 0
+        while True:
+            try:
+                fold = self._fold_new_sales(FOLD_CHUNK)
+                self.session.commit()
+            except Exception:
+                self.session.rollback()
+                raise
+            self._invalidate_reports(fold)
+            total += fold.count
+            if fold.done:
+                return total
+
+    def _invalidate_reports(self, fold):
+        if fold.count:
+            report_cache.invalidate_range(fold.first, fold.last)
+            report_jobs.invalidate_range(fold.first, fold.last)
+            if fold.late:
+                # the cube appends by id range above its watermark; rows below it need a reload
+                sales_cube.invalidate()
+            else:
+                sales_cube.mark_stale()
+
+    def _fold_new_sales(self, limit=None):
+        """Upsert aggregates of not-yet-folded sales and advance the watermark by at
+        most `limit` ids (no commit). Returns a Fold.
+
+        Sequence values commit out of order, so ids the watermark passes while they
+        are still absent are kept as pending gaps and folded when their rows appear.
+        Absent ids are found first and the aggregate then covers only the ids that
+        were present, so a row committing mid-fold is either folded now or left in a
+        gap, never lost or counted twice. Rows are summed by the database
+        (INSERT ... SELECT ... GROUP BY), not in Python."""
+        wm = self._lock_watermark()
+        fold = Fold()
+        self._fold_gaps(fold)
+        max_id = self.session.execute(select(func.max(Sale.id))).scalar()
+        if max_id is None or max_id <= wm.last_sale_id:
+            self.session.flush()
+            return fold
+        lo = wm.last_sale_id
+        stop = max_id if limit is None else min(max_id, lo + limit)
+        now = datetime.datetime.utcnow()
+        while lo < stop:
+            hi = min(lo + FOLD_CHUNK, stop)
+            gaps = self._absent(lo + 1, hi)
+            for first, last in gaps:
+                self.session.add(RollupGap(name=ROLLUP, first_id=first, last_id=last, recorded_at=now))
+            self._fold_ranges(_present(gaps, lo + 1, hi), fold)
+            lo = hi
+        wm.last_sale_id = stop
+        fold.done = stop >= max_id
+        self.session.flush()
+        return fold
+
+    def _absent(self, first, last):
+        """Id ranges within first..last with no sales row; a count settles the
+        usual case without reading ids."""
+        in_range = Sale.id.between(first, last)
+        if self.session.execute(select(func.count()).where(in_range)).scalar() == last - first + 1:
+            return []
+        ids = self.session.execute(select(Sale.id).where(in_range).order_by(Sale.id)).scalars().all()
+        return _missing(ids, first, last)
+
+    def _fold_ranges(self, ranges, fold):
+        """Upsert the aggregates of the sales with ids in the given (first, last) ranges."""
+        for i in range(0, len(ranges), RANGES_PER_STATEMENT):
+            cond = or_(*[Sale.id.between(a, b) for a, b in ranges[i:i + RANGES_PER_STATEMENT]])
+            count, first, last = self.session.execute(
+                select(func.count(), func.min(Sale.date), func.max(Sale.date)).where(cond)).one()
+            if count:
+                fold.add(count, first, last)
+                self._upsert_rollup_from(cond)
+
+    def _fold_gaps(self, fold):
+        """Fold sales that appeared inside pending gaps; shrink or expire the gaps."""
+        gaps = self.session.execute(select(RollupGap).where(RollupGap.name == ROLLUP)).scalars().all()
+        if not gaps:
+            return
+        ids = self.session.execute(
+            select(Sale.id).where(or_(*[Sale.id.between(g.first_id, g.last_id) for g in gaps])).order_by(Sale.id)
+        ).scalars().all()
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=GAP_SECONDS)
+        found_ranges = []
+        for g in gaps:
+            found = [i for i in ids if g.first_id <= i <= g.last_id]
+            still_missing = _missing(found, g.first_id, g.last_id)
+            found_ranges.extend(_present(still_missing, g.first_id, g.last_id))
+            if not found and g.recorded_at >= cutoff:
+                continue
+            self.session.delete(g)
+            self.session.flush()
+            if g.recorded_at >= cutoff:
+                for first, last in still_missing:
+                    self.session.add(RollupGap(name=ROLLUP, first_id=first, last_id=last, recorded_at=g.recorded_at))
+        if found_ranges:
+            self._fold_ranges(found_ranges, fold)
+            fold.late = True
+
+    def _upsert_rollup_from(self, condition):
+        """Add SUM/COUNT of the sales matching condition to the rollup in one statement
+        (PostgreSQL, SQLite); other databases upsert the grouped rows one by one."""
+        keys = (Sale.date, Sale.salesperson, Sale.product, Sale.zone)
+        grouped = select(*keys, func.sum(Sale.amount), func.count()).where(condition).group_by(*keys)
+        dialect = self.session.get_bind().dialect.name
+        t = SalesDailyRollup.__table__
+        if dialect in ('postgresql', 'sqlite'):
+            ins = (postgresql.insert(t) if dialect == 'postgresql' else sqlite.insert(t)).from_select(
+                ['date', 'salesperson', 'product', 'zone', 'total', 'count'], grouped)
+            ins = ins.on_conflict_do_update(
+                index_elements=['date', 'salesperson', 'product', 'zone'],
+                set_={'total': t.c.total + ins.excluded.total, 'count': t.c.count + ins.excluded.count},
+            )
+            self.session.execute(ins)
+            return
+        self._upsert_rollup([{'date': d, 'salesperson': sp, 'product': p, 'zone': z, 'total': total, 'count': n}
+                             for d, sp, p, z, total, n in self.session.execute(grouped)])
+
+    def _upsert_rollup(self, groups):
+        for g in groups:
+            key = (g['date'], g['salesperson'], g['product'], g['zone'])
+            existing = self.session.get(SalesDailyRollup, key)
+            if existing is None:
+                self.session.add(SalesDailyRollup(**g))
+            else:
+                existing.total = existing.total + g['total']
+                existing.count = existing.count + g['count']
+        self.session.flush()
+
+    def _source(self, start, end):
+        """Rows (date, salesperson, product, zone, total) covering start..end.
+
+        Closed days come from the rollup; today (which may still receive rows
+        not yet folded in) and later dates are read from raw sales."""
+        raw = lambda s, e: select(Sale.date.label('date'), Sale.salesperson, Sale.product, Sale.zone, Sale.amount.label('total')).where(Sale.date >= s).where(Sale.date <= e)
+        if not self.use_rollup:
+            return raw(start, end).subquery()
+        today = datetime.date.today()
+        parts = []
+        if start < today:
+            r = SalesDailyRollup
+            parts.append(select(r.date.label('date'), r.salesperson, r.product, r.zone, r.total.label('total')).where(r.date >= start).where(r.date <= min(end, today - datetime.timedelta(days=1))))
+        if end >= today:
+            parts.append(raw(max(start, today), end))
+        if len(parts) == 1:
+            return parts[0].subquery()
+        return union_all(*parts).subquery()
 
     def total_sales(self, start, end):
-        stmt = select(func.coalesce(func.sum(Sale.amount),0)).where(Sale.date >= start).where(Sale.date <= end)
+        src = self._source(start, end)
+        stmt = select(func.coalesce(func.sum(src.c.total),0))
         return float(self.session.execute(stmt).scalar() or 0)
 
     def group_top_n(self, start, end, group_by, n=5):
-        col = getattr(Sale, group_by)
-        stmt = select(col, func.sum(Sale.amount).label('total')).where(Sale.date >= start).where(Sale.date <= end).group_by(col).order_by(func.sum(Sale.amount).desc()).limit(n)
+        src = self._source(start, end)
+        col = src.c[group_by]
+        stmt = select(col, func.sum(src.c.total).label('total')).group_by(col).order_by(func.sum(src.c.total).desc()).limit(n)
         return [{group_by: r[0], 'total': float(r[1])} for r in self.session.execute(stmt).all()]
 
     def daily_series(self, start, end):
         # avoid casting which can trigger DB-specific processors; use the column directly
-        stmt = select(Sale.date.label('d'), func.sum(Sale.amount).label('total')).where(Sale.date >= start).where(Sale.date <= end).group_by(Sale.date).order_by(Sale.date)
+        src = self._source(start, end)
+        stmt = select(src.c.date.label('d'), func.sum(src.c.total).label('total')).group_by(src.c.date).order_by(src.c.date)
         rows = self.session.execute(stmt).all()
         result = []
         for r in rows:
@@ -34,8 +314,9 @@ class Repo:
         return result
 
     def grouped_daily_series(self, start, end, group_by):
-        col = getattr(Sale, group_by)
-        stmt = select(Sale.date.label('d'), col, func.sum(Sale.amount).label('total')).where(Sale.date >= start).where(Sale.date <= end).group_by(Sale.date, col).order_by(Sale.date)
+        src = self._source(start, end)
+        col = src.c[group_by]
+        stmt = select(src.c.date.label('d'), col, func.sum(src.c.total).label('total')).group_by(src.c.date, col).order_by(src.c.date)
         rows = self.session.execute(stmt).all()
         result = []
         for r in rows:
@@ -46,3 +327,94 @@ class Repo:
                 ds = str(d)
             result.append({'date': ds, group_by: r[1], 'total': float(r[2])})
         return result
+
+    def _supports_window_functions(self):
+        dialect = self.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            return sqlite3.sqlite_version_info >= (3, 25)
+        return dialect == 'postgresql'
+
+    def top_n_per_group(self, start, end, dimensions, n=5, filters=None, use_window=None):
+        """Top n values of dimensions[-1] within each combination of dimensions[:-1].
+
+        ['zone', 'product'] gives the n best products per zone in one query, ranked
+        with ROW_NUMBER() OVER (PARTITION BY zone ORDER BY total DESC); databases
+        without window functions get the same grouping ranked in Python. Rows are
+        ordered by partition then rank, ties broken by the ranked value."""
+        dimensions = list(dimensions)
+        partition, ranked = dimensions[:-1], dimensions[-1]
+        src = self._source(start, end)
+        cols = [src.c[d] for d in dimensions]
+        grouped = select(*cols, func.sum(src.c.total).label('total')).group_by(*cols)
+        for dim, values in (filters or {}).items():
+            grouped = grouped.where(src.c[dim].in_(values))
+        if use_window is None:
+            use_window = self._supports_window_functions()
+        if use_window:
+            g = grouped.subquery()
+            rn = func.row_number().over(
+                partition_by=[g.c[d] for d in partition] or None,
+                order_by=[g.c.total.desc(), g.c[ranked]],
+            ).label('rank')
+            r = select(*[g.c[d] for d in dimensions], g.c.total, rn).subquery()
+            stmt = select(r).where(r.c.rank <= n).order_by(*[r.c[d] for d in partition], r.c.rank)
+            return [{**{d: row[i] for i, d in enumerate(dimensions)}, 'total': float(row[-2]), 'rank': row[-1]}
+                    for row in self.session.execute(stmt).all()]
+        parts = {}
+        for row in self.session.execute(grouped).all():
+            parts.setdefault(tuple(row[:len(partition)]), []).append(row)
+        out = []
+        for key in sorted(parts, key=lambda k: tuple(str(v) for v in k)):
+            best = heapq.nsmallest(n, parts[key], key=lambda row: (-row[-1], str(row[-2])))
+            for rank, row in enumerate(best, start=1):
+                out.append({**{d: row[i] for i, d in enumerate(dimensions)}, 'total': float(row[-1]), 'rank': rank})
+        return out
+
+    def multi_group_daily_series(self, start, end, dimensions, filters=None):
+        """Daily totals per combination of dimensions, ordered by date then group."""
+        src = self._source(start, end)
+        cols = [src.c[d] for d in dimensions]
+        stmt = select(src.c.date, *cols, func.sum(src.c.total)).group_by(src.c.date, *cols).order_by(src.c.date, *cols)
+        for dim, values in (filters or {}).items():
+            stmt = stmt.where(src.c[dim].in_(values))
+        return [{'date': _iso(r[0]), **{d: r[i + 1] for i, d in enumerate(dimensions)}, 'total': float(r[-1])}
+                for r in self.session.execute(stmt).all()]
+
+    def daily_group_totals(self, start, end, group_by, filters=None):
+        """One grouped scan: (date, group, SUM(amount)) tuples for start..end.
+
+        filters maps dimension -> list of accepted values. Totals are returned as
+        the driver's exact numeric type so callers can re-aggregate in memory
+        without float drift."""
+        src = self._source(start, end)
+        col = src.c[group_by]
+        stmt = select(src.c.date, col, func.sum(src.c.total)).group_by(src.c.date, col)
+        for dim, values in (filters or {}).items():
+            stmt = stmt.where(src.c[dim].in_(values))
+        return [tuple(r) for r in self.session.execute(stmt).all()]
+
+
+_catchup_thread = None
+
+
+def start_rollup_catchup(interval):
+    """Fold sales written outside Repo into the rollup in a daemon thread (once per
+    process): right away, which backfills any backlog without holding up startup,
+    then every `interval` seconds."""
+    global _catchup_thread
+    if _catchup_thread is not None or interval <= 0:
+        return
+
+    def run():
+        while True:
+            repo = Repo()
+            try:
+                repo.catch_up_rollup()
+            except Exception as e:
+                print('Rollup catch-up error:', e)
+            finally:
+                repo.session.close()
+            time.sleep(interval)
+
+    _catchup_thread = threading.Thread(target=run, name='rollup-catchup', daemon=True)
+    _catchup_thread.start()
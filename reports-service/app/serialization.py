@@ -0,0 +1,50 @@
+"""Fast JSON encoding for report responses.
+
+Reports are plain dicts of lists, so they are encoded in one call (orjson when
+installed, the stdlib json module otherwise) instead of being walked field by
+field through flask_restx marshalling. The columnar shape turns the per-day
+lists into parallel arrays that chart libraries consume directly:
+
+    daily:  {"dates": [...], "totals": [...]}
+    series: {"dates": [...], "groups": [...], "totals": [...]}
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+SHAPES = ('rows', 'columnar')
+# fields of ReportResponse; the rows shape keeps the documented contract
+REPORT_FIELDS = ('criterion', 'start', 'end', 'total', 'pct_change', 'top5', 'daily')
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def columnar(report):
+    """Copy of the report with daily/series as parallel arrays (top5 stays row-wise)."""
+    out = dict(report)
+    daily = report.get('daily') or []
+    out['daily'] = {'dates': [r['date'] for r in daily], 'totals': [r['total'] for r in daily]}
+    if 'series' in report:
+        criterion = report['criterion']
+        series = report['series'] or []
+        out['series'] = {
+            'dates': [r['date'] for r in series],
+            'groups': [r[criterion] for r in series],
+            'totals': [r['total'] for r in series],
+        }
+    return out
+
+
+def report_payload(report, shape: str = 'rows'):
+    """Response body for a report: the ReportResponse fields, or the full columnar form."""
+    if shape == 'columnar':
+        return columnar(report)
+    return {k: report.get(k) for k in REPORT_FIELDS}
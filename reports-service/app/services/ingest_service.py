@@ -0,0 +1,124 @@
+import csv
+import datetime
+import json
+from decimal import Decimal, InvalidOperation
+
+from app.repositories.repo import Repo, SALE_COLUMNS
+
+MAX_ERRORS = 100
+TEXT_DIMENSIONS = ('salesperson', 'product', 'zone')
+
+
+def validate_sale(record):
+    """Return a clean sale dict or raise ValueError describing the first problem."""
+    if not isinstance(record, dict):
+        raise ValueError('record must be an object')
+    missing = [c for c in SALE_COLUMNS if record.get(c) in (None, '')]
+    if missing:
+        raise ValueError(f'missing {", ".join(missing)}')
+    try:
+        d = record['date']
+        d = d if isinstance(d, datetime.date) else datetime.date.fromisoformat(str(d).strip())
+    except ValueError:
+        raise ValueError('date must be YYYY-MM-DD')
+    out = {'date': d}
+    for dim in TEXT_DIMENSIONS:
+        v = str(record[dim]).strip()
+        if not v or len(v) > 100:
+            raise ValueError(f'{dim} must be 1-100 characters')
+        out[dim] = v
+    try:
+        amount = Decimal(str(record['amount']).strip()).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise ValueError('amount must be a number')
+    if not amount.is_finite() or abs(amount) >= Decimal('1e10'):
+        raise ValueError('amount out of range')
+    out['amount'] = amount
+    return out
+
+
+def parse_csv(lines):
+    """Yield (line_number, record) from CSV text lines with a header row."""
+    reader = csv.DictReader(lines)
+    for rec in reader:
+        yield reader.line_num, rec
+
+
+def parse_ndjson(lines):
+    """Yield (line_number, record) from newline-delimited JSON; bad JSON yields the error."""
+    for n, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield n, json.loads(line)
+        except ValueError as e:
+            yield n, e
+
+
+PARSERS = {'csv': parse_csv, 'ndjson': parse_ndjson}
+
+
+class IngestAborted(Exception):
+    """The stream stopped partway. `summary` covers what was committed before it,
+    with the failure under summary['aborted']."""
+    def __init__(self, reason: str, summary: dict):
+        super().__init__(summary['aborted']['error'])
+        self.reason = reason
+        self.summary = summary
+
+
+class IngestService:
+    def __init__(self, repo: Repo | None = None, batch_size: int = 5000):
+        self.repo = repo or Repo()
+        self.batch_size = batch_size
+
+    def ingest(self, lines, fmt: str):
+        """Validate and load a stream of sales in batches.
+
+        Each valid batch is committed (and folded into the daily rollup) before
+        the next is read, so memory stays bounded by batch_size. Returns a summary
+        with inserted/rejected counts and up to MAX_ERRORS rejected lines.
+
+        Committed batches stay committed if the stream cannot be decoded or a
+        batch fails to load; IngestAborted is raised with the summary so far and
+        `resume_after_line`, the last input line whose batch was committed (the
+        rest, plus the CSV header, can be resent)."""
+        if fmt not in PARSERS:
+            raise ValueError('format must be csv or ndjson')
+        summary = {'inserted': 0, 'rejected': 0, 'batches': 0, 'errors': []}
+        batch = []
+        committed_line = line_no = 0
+        try:
+            for line_no, rec in PARSERS[fmt](lines):
+                try:
+                    if isinstance(rec, Exception):
+                        raise ValueError(f'invalid json: {rec}')
+                    batch.append(validate_sale(rec))
+                except ValueError as e:
+                    summary['rejected'] += 1
+                    if len(summary['errors']) < MAX_ERRORS:
+                        summary['errors'].append({'line': line_no, 'error': str(e)})
+                    continue
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, summary, committed_line)
+                    committed_line, batch = line_no, []
+        except UnicodeDecodeError:
+            raise self._aborted(summary, 'decode', 'body must be UTF-8', committed_line, len(batch))
+        self._flush(batch, summary, committed_line)
+        return summary
+
+    def _flush(self, batch, summary, committed_line):
+        if not batch:
+            return
+        try:
+            summary['inserted'] += self.repo.load_sales_batch(batch)
+        except Exception as e:
+            print('Sales batch load error:', e)
+            raise self._aborted(summary, 'database', 'batch could not be loaded', committed_line, len(batch))
+        summary['batches'] += 1
+
+    @staticmethod
+    def _aborted(summary, reason, error, committed_line, pending):
+        summary['aborted'] = {'error': error, 'resume_after_line': committed_line, 'rows_not_loaded': pending}
+        return IngestAborted(reason, summary)
@@ -1,65 +1,132 @@
 import datetime
 from dateutil.relativedelta import relativedelta
-from functools import wraps
-import time
 
 from app.repositories.repo import Repo
+from app.cache import report_cache
+from app.cube import sales_cube
+import json
 
 
-def ttl_cache(ttl_seconds=60):
-    cache = {}
-    def deco(f):
-        @wraps(f)
-        def wrapped(*args, **kwargs):
-            key = (args, tuple(sorted(kwargs.items())))
-            entry = cache.get(key)
-            now = time.time()
-            if entry and now - entry[0] < ttl_seconds:
-                return entry[1]
-            val = f(*args, **kwargs)
-            cache[key] = (now, val)
-            return val
-        return wrapped
-    return deco
+CRITERIA = ('salesperson', 'product', 'zone')
+
+
+def previous_period(start: datetime.date, end: datetime.date):
+    """Window of the same length immediately before start..end."""
+    delta = end - start
+    prev_end = start - datetime.timedelta(days=1)
+    return prev_end - delta, prev_end
+
+
+def _iso(d):
+    return d.isoformat() if hasattr(d, 'isoformat') else str(d)
+
+
+def build_report(rows, criterion: str, start: datetime.date, end: datetime.date):
+    """Derive the full report from (date, group, total) rows covering the previous
+    and current windows. Everything the old per-metric queries asked the DB for
+    (totals, pct_change, top5, grouped and daily series) is computed in one pass."""
+    total = 0
+    prev_total = 0
+    by_group = {}
+    by_day = {}
+    series = []
+    for d, group, amount in rows:
+        if isinstance(d, str):
+            d = datetime.date.fromisoformat(d)
+        if d < start:
+            prev_total += amount
+            continue
+        total += amount
+        by_group[group] = by_group.get(group, 0) + amount
+        by_day[d] = by_day.get(d, 0) + amount
+        series.append((d, group, amount))
+
+    total = float(total)
+    prev_total = float(prev_total)
+    pct_change = None
+    if prev_total:
+        pct_change = (total - prev_total) / prev_total * 100.0
+
+    ranked = sorted(by_group.items(), key=lambda kv: (-kv[1], str(kv[0])))[:5]
+    series.sort(key=lambda r: (r[0], str(r[1])))
+    return {
+        'criterion': criterion,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total': total,
+        'pct_change': pct_change,
+        'top5': [{criterion: g, 'total': float(t)} for g, t in ranked],
+        'series': [{'date': _iso(d), criterion: g, 'total': float(t)} for d, g, t in series],
+        'daily': [{'date': _iso(d), 'total': float(by_day[d])} for d in sorted(by_day)],
+    }
+
+
+def normalize_filters(filters):
+    """Validate {dimension: value | [values]} and return {dimension: sorted list}."""
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise ValueError('filters must be an object')
+    out = {}
+    for dim, values in filters.items():
+        if dim not in CRITERIA:
+            raise ValueError(f'invalid filter dimension: {dim}')
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+            raise ValueError(f'invalid filter values for {dim}')
+        out[dim] = sorted(set(values))
+    return out
 
 
 class ReportsService:
     def __init__(self, repo: Repo|None=None):
         self.repo = repo or Repo()
 
-    @ttl_cache(ttl_seconds=90)
-    def generate_report(self, criterion: str, start: datetime.date, end: datetime.date):
+    def generate_report(self, criterion: str, start: datetime.date, end: datetime.date, filters=None):
         # validate criterion
-        if criterion not in ('salesperson', 'product', 'zone'):
+        if criterion not in CRITERIA:
             raise ValueError('invalid criterion')
+        filters = normalize_filters(filters)
+        # shared across service instances; identical concurrent requests compute once
+        key = (criterion, start.isoformat(), end.isoformat())
+        if filters:
+            key += (json.dumps(filters, sort_keys=True),)
+        return report_cache.get_or_compute(key, lambda: self.compute_report(criterion, start, end, filters))
 
-        total = self.repo.total_sales(start, end)
-
-        # previous period
-        delta = end - start
-        prev_end = start - datetime.timedelta(days=1)
-        prev_start = prev_end - delta
-        prev_total = self.repo.total_sales(prev_start, prev_end)
-
-        pct_change = None
-        if prev_total:
-            pct_change = (total - prev_total) / prev_total * 100.0
-
-        top5 = self.repo.group_top_n(start, end, criterion, n=5)
+    def compute_report(self, criterion: str, start: datetime.date, end: datetime.date, filters=None):
+        """Build the report from the cube or the repository, bypassing the cache."""
+        if sales_cube.enabled:
+            return sales_cube.report(criterion, start, end, filters)
+        # single grouped scan over prev_start..end instead of five range scans
+        prev_start, _ = previous_period(start, end)
+        rows = self.repo.daily_group_totals(prev_start, end, criterion, filters)
+        return build_report(rows, criterion, start, end)
 
-        series = self.repo.grouped_daily_series(start, end, criterion)
+    def top_by_group(self, dimensions, start: datetime.date, end: datetime.date, n: int = 5, filters=None, series: bool = False):
+        """Top n of dimensions[-1] per combination of the preceding dimensions,
+        e.g. ['zone', 'product'] -> best products in every zone, in one query."""
+        if not isinstance(dimensions, list) or not 1 <= len(dimensions) <= len(CRITERIA):
+            raise ValueError('dimensions must be a list of 1-3 dimensions')
+        if any(d not in CRITERIA for d in dimensions) or len(set(dimensions)) != len(dimensions):
+            raise ValueError('dimensions must be distinct values of salesperson|product|zone')
+        if not isinstance(n, int) or isinstance(n, bool) or not 1 <= n <= 100:
+            raise ValueError('n must be an integer between 1 and 100')
+        filters = normalize_filters(filters)
+        key = ('top:' + ','.join(dimensions), start.isoformat(), end.isoformat(), str(n), 'series' if series else 'top')
+        if filters:
+            key += (json.dumps(filters, sort_keys=True),)
 
-        # adapt series into timeseries buckets aggregated across groups for chart
-        # produce daily totals (for charting) aggregated
-        daily = self.repo.daily_series(start, end)
+        def compute():
+            out = {
+                'dimensions': dimensions,
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'n': n,
+                'groups': self.repo.top_n_per_group(start, end, dimensions, n, filters),
+            }
+            if series:
+                out['series'] = self.repo.multi_group_daily_series(start, end, dimensions, filters)
+            return out
 
-        return {
-            'criterion': criterion,
-            'start': start.isoformat(),
-            'end': end.isoformat(),
-            'total': total,
-            'pct_change': pct_change,
-            'top5': top5,
-            'series': series,
-            'daily': daily,
-        }
+        return report_cache.get_or_compute(key, compute)
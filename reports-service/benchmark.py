@@ -0,0 +1,248 @@
+"""Benchmark suite for reports-service at realistic data scales.
+
+Generates a deterministic sales dataset (100k, 1M or 10M rows, or --rows N),
+bulk loads it, folds it into the daily rollup once, then times every Repo
+query method and ReportsService.generate_report per criterion and window size,
+the latter with a cold and a warm report cache. Results are written as JSON
+together with the configuration that produced them (database, rollup, cube,
+partitioning), so runs can be compared with --compare.
+
+Usage:
+    DATABASE_URL=sqlite:///bench.db python benchmark.py --size 100k --reset --output bench-100k.json
+    REPORTS_USE_ROLLUP=0 python benchmark.py --size 100k --reuse --output raw.json --compare bench-100k.json
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+SIZES = {'100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+WINDOWS = (7, 30, 365)
+CRITERIA = ('salesperson', 'product', 'zone')
+CARDINALITY = {'salesperson': 50, 'product': 200, 'zone': 8}
+BATCH = 50_000
+
+
+def generate(n, seed=42, days=730, end=None):
+    """Yield lists of (date, salesperson, product, zone, amount) tuples, BATCH rows at a time.
+
+    The same (n, seed, days, end) always yields the same rows. Values are drawn with
+    random.choices over small pools, which is far cheaper than per-row randint."""
+    end = end or datetime.date.today() - datetime.timedelta(days=1)
+    rng = random.Random(seed)
+    dates = [end - datetime.timedelta(days=d) for d in range(days)]
+    pools = {dim: [f'{dim[0].upper()}{i:03d}' for i in range(k)] for dim, k in CARDINALITY.items()}
+    # skewed product popularity so top-N rankings are meaningful
+    product_weights = [1.0 / (i + 1) for i in range(CARDINALITY['product'])]
+    amounts = [round(5 + i * 0.37, 2) for i in range(2000)]
+    done = 0
+    while done < n:
+        k = min(BATCH, n - done)
+        yield list(zip(
+            rng.choices(dates, k=k),
+            rng.choices(pools['salesperson'], k=k),
+            rng.choices(pools['product'], weights=product_weights, k=k),
+            rng.choices(pools['zone'], k=k),
+            rng.choices(amounts, k=k),
+        ))
+        done += k
+
+
+def load(engine, n, seed, days):
+    """Bulk load the dataset (COPY on PostgreSQL, Core executemany elsewhere). Returns seconds."""
+    from sqlalchemy import insert
+    from app import partitioning
+    from app.domain.models import Sale
+
+    end = datetime.date.today() - datetime.timedelta(days=1)
+    partitioning.ensure_partitions_for(engine, end - datetime.timedelta(days=days - 1), end)
+    t0 = time.perf_counter()
+    for batch in generate(n, seed, days, end):
+        with engine.begin() as conn:
+            if engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2':
+                buf = io.StringIO()
+                csv.writer(buf).writerows((d.isoformat(), s, p, z, a) for d, s, p, z, a in batch)
+                buf.seek(0)
+                cur = conn.connection.dbapi_connection.cursor()
+                try:
+                    cur.copy_expert('COPY sales (date, salesperson, product, zone, amount) FROM STDIN WITH (FORMAT csv)', buf)
+                finally:
+                    cur.close()
+            else:
+                conn.execute(insert(Sale), [
+                    {'date': d, 'salesperson': s, 'product': p, 'zone': z, 'amount': a} for d, s, p, z, a in batch
+                ])
+    return time.perf_counter() - t0
+
+
+def multi_query_report(repo, criterion, start, end):
+    """The report as it was built before the single grouped scan: five range
+    queries against Repo. Kept here only as the baseline to compare against."""
+    from app.services.reports_service import previous_period
+
+    prev_start, prev_end = previous_period(start, end)
+    total = repo.total_sales(start, end)
+    prev_total = repo.total_sales(prev_start, prev_end)
+    pct_change = None
+    if prev_total:
+        pct_change = (total - prev_total) / prev_total * 100.0
+    return {
+        'criterion': criterion,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total': total,
+        'pct_change': pct_change,
+        'top5': repo.group_top_n(start, end, criterion, n=5),
+        'series': repo.grouped_daily_series(start, end, criterion),
+        'daily': repo.daily_series(start, end),
+    }
+
+
+def timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {'runs': repeat, 'min_ms': round(min(samples), 3), 'median_ms': round(statistics.median(samples), 3)}
+
+
+def run(repeat=3, use_rollup=None):
+    """Time Repo methods and generate_report (cold/warm) for every criterion and window."""
+    from app.cache import report_cache
+    from app.repositories.repo import Repo
+    from app.services.reports_service import ReportsService, previous_period
+
+    end = datetime.date.today() - datetime.timedelta(days=1)
+    repo = Repo(use_rollup=use_rollup)
+    svc = ReportsService(repo=repo)
+    results = []
+
+    def record(name, criterion, window, stats, cache=None):
+        entry = {'name': name, 'criterion': criterion, 'window_days': window, **stats}
+        if cache:
+            entry['cache'] = cache
+        results.append(entry)
+
+    try:
+        for window in WINDOWS:
+            start = end - datetime.timedelta(days=window - 1)
+            prev_start, _ = previous_period(start, end)
+            record('Repo.total_sales', None, window, timeit(lambda: repo.total_sales(start, end), repeat))
+            record('Repo.daily_series', None, window, timeit(lambda: repo.daily_series(start, end), repeat))
+            for c in CRITERIA:
+                record('Repo.group_top_n', c, window, timeit(lambda: repo.group_top_n(start, end, c, n=5), repeat))
+                record('Repo.grouped_daily_series', c, window, timeit(lambda: repo.grouped_daily_series(start, end, c), repeat))
+                record('Repo.daily_group_totals', c, window, timeit(lambda: repo.daily_group_totals(prev_start, end, c), repeat))
+                if c != 'zone':
+                    record('Repo.top_n_per_group', c, window, timeit(lambda: repo.top_n_per_group(start, end, ['zone', c], n=5), repeat))
+
+                def cold():
+                    report_cache.clear()
+                    svc.generate_report(c, start, end)
+
+                record('generate_report', c, window, timeit(cold, repeat), cache='cold')
+                svc.generate_report(c, start, end)
+                record('generate_report', c, window, timeit(lambda: svc.generate_report(c, start, end), repeat), cache='warm')
+    finally:
+        repo.session.close()
+    return results
+
+
+def config(engine, use_rollup):
+    from app import partitioning
+    from app.cube import sales_cube
+    from app.cache import report_cache
+
+    with engine.connect() as conn:
+        partitioned = partitioning.is_partitioned(conn)
+    return {
+        'database': engine.url.get_backend_name(),
+        'use_rollup': use_rollup if use_rollup is not None else os.getenv('REPORTS_USE_ROLLUP', '1') == '1',
+        'cube': sales_cube.enabled,
+        'partitioned': partitioned,
+        'cache_backend': 'redis' if report_cache.backend is not None else 'local',
+    }
+
+
+def _entry_key(e):
+    return (e['name'], e['criterion'], e['window_days'], e.get('cache'))
+
+
+def compare(current, other):
+    """Per-entry median ratios current/other (below 1.0 means current is faster)."""
+    base = {_entry_key(e): e for e in other['results']}
+    out = []
+    for e in current['results']:
+        b = base.get(_entry_key(e))
+        if b and b['median_ms'] > 0:
+            out.append({'name': e['name'], 'criterion': e['criterion'], 'window_days': e['window_days'],
+                        'cache': e.get('cache'), 'ratio': round(e['median_ms'] / b['median_ms'], 3)})
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='reports-service benchmark suite')
+    parser.add_argument('--size', choices=sorted(SIZES), default='100k')
+    parser.add_argument('--rows', type=int, help='explicit row count (overrides --size)')
+    parser.add_argument('--days', type=int, default=730, help='days of history to spread rows over')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reset', action='store_true', help='drop and recreate tables before loading')
+    parser.add_argument('--reuse', action='store_true', help='skip loading when the sales table already has the rows')
+    parser.add_argument('--no-rollup', action='store_true', help='query raw sales instead of the daily rollup')
+    parser.add_argument('--output', help='write the results JSON here')
+    parser.add_argument('--compare', help='results JSON to compare against')
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import func, select
+    from app.db import Base, engine
+    from app.domain.models import Sale
+    from app import partitioning
+    from app.repositories.repo import Repo
+
+    n = args.rows or SIZES[args.size]
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+        partitioning.create_partitioned_sales(engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(Sale)).scalar()
+    dataset = {'rows': n, 'seed': args.seed, 'days': args.days}
+    if args.reuse and existing == n:
+        dataset['loaded'] = False
+    else:
+        if existing:
+            print(f'sales already holds {existing} rows; use --reset (or --reuse with a matching size)')
+            return 2
+        dataset['load_s'] = round(load(engine, n, args.seed, args.days), 3)
+        t0 = time.perf_counter()
+        repo = Repo()
+        try:
+            repo.catch_up_rollup()
+        finally:
+            repo.session.close()
+        dataset['rollup_s'] = round(time.perf_counter() - t0, 3)
+        dataset['loaded'] = True
+
+    use_rollup = False if args.no_rollup else None
+    report = {'dataset': dataset, 'config': config(engine, use_rollup), 'results': run(args.repeat, use_rollup)}
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = {'against': args.compare, 'ratios': compare(report, json.load(f))}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
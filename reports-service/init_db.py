@@ -1,3 +1,4 @@
+import os
 import random
 from datetime import date, timedelta
 from sqlalchemy import text
@@ -6,22 +7,14 @@ from app.domain.models import Sale
 
 
 def init_db(database_url=None):
+    # on PostgreSQL create `sales` partitioned by month before create_all
+    # (which then skips it); SQLite keeps a single table
+    from app import partitioning
+    if os.getenv('REPORTS_PARTITION_SALES', '1') == '1':
+        partitioning.create_partitioned_sales(engine)
     # create tables
     Base.metadata.create_all(bind=engine)
-
-    # create a materialized view (optional) - Postgres only
-    try:
-        with engine.connect() as conn:
-            conn.execute(text('''
-            CREATE MATERIALIZED VIEW IF NOT EXISTS mv_daily_totals AS
-            SELECT date::date as d, salesperson, product, zone, sum(amount) as total
-            FROM sales
-            GROUP BY date::date, salesperson, product, zone;
-            '''))
-            conn.commit()
-    except Exception:
-        # likely sqlite - ignore
-        pass
+    partitioning.maintain(engine)
 
     # seed example data if empty
     from app.db import SessionLocal
@@ -104,6 +97,12 @@ def init_db(database_url=None):
             # if anything goes wrong here, we don't want to fail the init
             pass
 
+    # fold any sales written outside Repo.insert_sales_bulk into the daily rollup
+    from app.repositories.repo import Repo
+    folded = Repo().catch_up_rollup()
+    if folded:
+        print(f'Rolled up {folded} sales rows')
+
 
     if __name__ == '__main__':
         # When invoked as a script (e.g. in the k8s init Job) run the init
@@ -76,6 +76,9 @@ def ensure_rows():
 
     if inserted > 0:
         sess.commit()
+        # rows were added directly; fold them into the daily rollup
+        from app.repositories.repo import Repo
+        Repo(session=sess).catch_up_rollup()
     sess.close()
     return inserted
 
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Monthly partition maintenance for `sales` (PostgreSQL only). Run from a CronJob
+to create upcoming partitions and apply the retention policy, or once with
+--migrate to convert an existing single-table `sales`:
+
+  docker compose exec reports-service python scripts/partition_sales.py [--migrate]
+
+Env: REPORTS_PARTITIONS_AHEAD, REPORTS_SALES_RETENTION_MONTHS, REPORTS_SALES_ARCHIVE.
+"""
+import sys
+from app.db import engine
+from app import partitioning
+
+
+if __name__ == '__main__':
+    if not partitioning.supported(engine):
+        print('Partitioning needs PostgreSQL; nothing to do.')
+        sys.exit(0)
+    if '--migrate' in sys.argv:
+        n = partitioning.migrate_to_partitioned(engine)
+        print(f'Copied {n} rows into partitioned sales (old table kept as sales_unpartitioned).')
+    created, expired = partitioning.maintain(engine)
+    print(f'Created partitions: {", ".join(created) or "none"}')
+    print(f'Expired partitions: {", ".join(expired) or "none"}')
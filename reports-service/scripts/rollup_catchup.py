@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Fold sales rows written outside Repo.insert_sales_bulk into sales_daily_rollup.
+The service also runs it in a background thread when it starts and then every
+REPORTS_ROLLUP_CATCHUP_SECONDS; use this for a first backfill before deploying.
+Safe to run repeatedly; it only processes rows above the stored watermark or
+inside pending gaps below it:
+
+  docker compose exec reports-service python scripts/rollup_catchup.py
+"""
+from app.db import engine, Base
+from app.repositories.repo import Repo
+
+
+if __name__ == '__main__':
+    Base.metadata.create_all(bind=engine)
+    n = Repo().catch_up_rollup()
+    print(f'Rolled up {n} sales rows.')
@@ -0,0 +1,14 @@
+import os
+import pytest
+from app.cache import report_cache
+
+# tests drop and recreate tables; no background catch-up racing them
+os.environ.setdefault('REPORTS_ROLLUP_CATCHUP_SECONDS', '0')
+
+
+@pytest.fixture(autouse=True)
+def clear_report_cache():
+    # the report cache is process-wide; keep tests from seeing each other's reports
+    report_cache.clear()
+    yield
+    report_cache.clear()
@@ -1,8 +1,16 @@
 import datetime
+import os
+import pytest
+from sqlalchemy import insert
 from app.repositories.repo import Repo
 from app.db import Base, engine
+from app.domain.models import Sale
 from app.services.reports_service import ReportsService
 
+# REPORTS_BENCH_ROWS=1000000 reproduces the 1M-row comparison between engines
+BENCH_ROWS = int(os.getenv('REPORTS_BENCH_ROWS', '600'))
+
+
 def setup_function():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
@@ -16,6 +24,21 @@ def seed(repo: Repo):
             rows.append({'date': day, 'salesperson': f'S{i%5}', 'product': f'P{i%3}', 'zone': f'Z{i%4}', 'amount': 100})
     repo.insert_sales_bulk(rows)
 
+def seed_rows(n, days=60):
+    today = datetime.date.today()
+    per_day = max(1, n // days)
+    batch = []
+    with engine.begin() as conn:
+        for k in range(n):
+            batch.append({'date': today - datetime.timedelta(days=k // per_day % days), 'salesperson': f'S{k%25}', 'product': f'P{k%40}', 'zone': f'Z{k%6}', 'amount': 10 + k % 90})
+            if len(batch) >= 50000:
+                conn.execute(insert(Sale), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Sale), batch)
+    # rows went in through Core; fold them into the daily rollup like the catch-up job would
+    Repo().catch_up_rollup()
+
 def test_report_perf(benchmark):
     repo = Repo()
     seed(repo)
@@ -25,3 +48,55 @@ def test_report_perf(benchmark):
     def run():
         svc.generate_report('product', start, end)
     benchmark(run)
+
+@pytest.mark.parametrize('engine_name', ['single_scan', 'multi_query', 'cube'])
+def test_report_engine_perf(benchmark, engine_name):
+    seed_rows(BENCH_ROWS)
+    svc = ReportsService(repo=Repo())
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=29)
+    benchmark.group = f'generate_report {BENCH_ROWS} rows'
+    if engine_name == 'cube':
+        pytest.importorskip('numpy')
+        from app.cube import SalesCube
+        cube = SalesCube(refresh_interval=3600)
+        cube.load()
+        run = lambda: cube.report('product', start, end)
+    elif engine_name == 'single_scan':
+        # bypass the TTL cache so every round hits the database
+        run = lambda: svc.compute_report('product', start, end)
+    else:
+        from benchmark import multi_query_report
+        run = lambda: multi_query_report(svc.repo, 'product', start, end)
+    benchmark(run)
+
+
+def test_generator_is_deterministic_and_fast_batches():
+    import benchmark
+    end = datetime.date(2025, 6, 30)
+    a = [r for b in benchmark.generate(120_000, seed=1, days=90, end=end) for r in b]
+    b = [r for b in benchmark.generate(120_000, seed=1, days=90, end=end) for r in b]
+    assert len(a) == 120_000 and a == b
+    assert a != [r for b in benchmark.generate(120_000, seed=2, days=90, end=end) for r in b]
+    assert min(r[0] for r in a) == end - datetime.timedelta(days=89) and max(r[0] for r in a) == end
+    assert len({r[2] for r in a}) <= benchmark.CARDINALITY['product']
+
+
+def test_suite_writes_comparable_json(tmp_path):
+    import json
+    import benchmark
+    out = tmp_path / 'bench.json'
+    assert benchmark.main(['--rows', '3000', '--days', '60', '--repeat', '1', '--reset', '--output', str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert report['dataset']['rows'] == 3000 and report['dataset']['loaded']
+    assert report['config']['database'] == 'sqlite' and report['config']['use_rollup']
+    names = {e['name'] for e in report['results']}
+    assert {'Repo.total_sales', 'Repo.group_top_n', 'Repo.daily_group_totals', 'generate_report'} <= names
+    caches = {e['cache'] for e in report['results'] if e['name'] == 'generate_report'}
+    assert caches == {'cold', 'warm'}
+    # reuse the loaded dataset with the rollup off and compare against the first run
+    out2 = tmp_path / 'raw.json'
+    assert benchmark.main(['--rows', '3000', '--repeat', '1', '--reuse', '--no-rollup', '--output', str(out2), '--compare', str(out)]) == 0
+    raw = json.loads(out2.read_text())
+    assert not raw['dataset']['loaded'] and not raw['config']['use_rollup']
+    assert len(raw['comparison']['ratios']) == len(report['results'])
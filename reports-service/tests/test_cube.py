@@ -0,0 +1,164 @@
+import datetime
+import pytest
+from app.db import Base, engine
+from app.repositories.repo import Repo
+from app.services import reports_service
+from app.services.reports_service import ReportsService
+
+np = pytest.importorskip('numpy')
+from app.cube import SalesCube
+
+
+def setup_function():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _seed():
+    today = datetime.date.today()
+    rows = []
+    for d in range(1, 25):
+        for i in range(9):
+            rows.append({'date': today - datetime.timedelta(days=d), 'salesperson': f'S{i % 3}', 'product': f'P{(i + d) % 5}', 'zone': ('North', 'South')[i % 2], 'amount': 10 + i * 1.25 + d})
+    Repo().insert_sales_bulk(rows)
+    return today
+
+
+def _assert_same(a, b, criterion):
+    assert a['total'] == pytest.approx(b['total'])
+    assert a['pct_change'] == pytest.approx(b['pct_change'])
+    assert a['daily'] == b['daily']
+    assert a['top5'] == b['top5']
+    assert a['series'] == b['series']
+
+
+@pytest.mark.parametrize('criterion,filters', [
+    ('product', None),
+    ('salesperson', {'zone': ['North']}),
+    ('product', {'zone': ['South'], 'salesperson': ['S0', 'S2']}),
+])
+def test_cube_matches_sql(criterion, filters):
+    today = _seed()
+    end = today - datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=9)
+    cube = SalesCube()
+    sql = ReportsService(repo=Repo()).compute_report(criterion, start, end, filters)
+    _assert_same(cube.report(criterion, start, end, filters), sql, criterion)
+
+
+def test_cube_refreshes_incrementally_after_ingestion():
+    today = _seed()
+    cube = SalesCube(refresh_interval=3600)
+    day = today - datetime.timedelta(days=2)
+    before = cube.report('zone', day, day)
+    loaded_rows = len(cube.cols['day'])
+    repo = Repo()
+    repo.insert_sales_bulk([{'date': day, 'salesperson': 'S9', 'product': 'P9', 'zone': 'East', 'amount': 100}])
+    cube.mark_stale()
+    after = cube.report('zone', day, day)
+    assert after['total'] == pytest.approx(before['total'] + 100)
+    assert {'zone': 'East', 'total': 100.0} in after['top5']
+    # only the new cell was appended, nothing reloaded
+    assert len(cube.cols['day']) == loaded_rows + 1
+
+
+def test_service_uses_enabled_cube(monkeypatch):
+    today = _seed()
+    cube = SalesCube()
+    monkeypatch.setattr(reports_service, 'sales_cube', cube)
+
+    class NoRepo:
+        def daily_group_totals(self, *a, **kw):
+            raise AssertionError('SQL path used')
+
+    end = today - datetime.timedelta(days=1)
+    r = ReportsService(repo=NoRepo()).generate_report('zone', end - datetime.timedelta(days=6), end, {'product': 'P1'})
+    assert r['total'] > 0
+
+
+def test_invalid_filter_dimension():
+    with pytest.raises(ValueError):
+        ReportsService(repo=Repo()).generate_report('zone', datetime.date(2025, 1, 1), datetime.date(2025, 1, 7), {'color': ['red']})
+
+
+def test_concurrent_refreshes_append_the_delta_once():
+    import threading
+    import time
+    from app.db import SessionLocal
+
+    today = _seed()
+    day = today - datetime.timedelta(days=2)
+
+    class SlowSession:
+        # widens the window between the delta query and the append
+        def __init__(self):
+            self.s = SessionLocal()
+
+        def execute(self, *a, **kw):
+            result = self.s.execute(*a, **kw)
+            time.sleep(0.02)
+            return result
+
+        def close(self):
+            self.s.close()
+
+
+    cube = SalesCube(session_factory=SlowSession, refresh_interval=3600)
+    before = cube.report('zone', day, day)['total']
+    Repo().insert_sales_bulk([{'date': day, 'salesperson': 'S9', 'product': 'P9', 'zone': 'East', 'amount': 100}])
+    cube.mark_stale()
+    threads = [threading.Thread(target=cube.ensure_fresh) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cube.report('zone', day, day)['total'] == pytest.approx(before + 100)
+
+
+def test_rows_folded_below_the_watermark_reload_the_cube(monkeypatch):
+    from sqlalchemy import insert
+    from app.domain.models import Sale
+
+    day = datetime.date.today() - datetime.timedelta(days=1)
+    row = lambda sid, amount: {'id': sid, 'date': day, 'salesperson': 'S0', 'product': 'P0', 'zone': 'North', 'amount': amount}
+    with engine.begin() as conn:
+        conn.execute(insert(Sale), [row(1, 1), row(3, 1)])
+    Repo().catch_up_rollup()
+    cube = SalesCube(refresh_interval=3600)
+    monkeypatch.setattr('app.repositories.repo.sales_cube', cube)
+    assert cube.report('zone', day, day)['total'] == 2
+    with engine.begin() as conn:
+        conn.execute(insert(Sale), [row(2, 5)])
+    Repo().catch_up_rollup()
+    assert cube.needs_reload
+    assert cube.report('zone', day, day)['total'] == 7
+
+
+def test_fold_committed_during_load_is_not_counted_twice(monkeypatch):
+    from app.db import SessionLocal
+
+    today = _seed()
+    day = today - datetime.timedelta(days=2)
+    expected = ReportsService().compute_report('zone', day, day)['total'] + 100
+    folds = []
+
+    class FoldAfterFirstRead:
+        # a bulk load commits (and folds) right after the cube's first statement
+        def __init__(self):
+            self.s = SessionLocal()
+
+        def execute(self, *a, **kw):
+            result = self.s.execute(*a, **kw).freeze()
+            if not folds:
+                folds.append(1)
+                Repo().insert_sales_bulk([{'date': day, 'salesperson': 'S9', 'product': 'P9', 'zone': 'East', 'amount': 100}])
+            return result()
+
+        def close(self):
+            self.s.close()
+
+    cube = SalesCube(session_factory=FoldAfterFirstRead, refresh_interval=3600)
+    monkeypatch.setattr('app.repositories.repo.sales_cube', cube)
+    cube.load()
+    cube.refresh()
+    assert cube.report('zone', day, day)['total'] == pytest.approx(expected)
@@ -0,0 +1,86 @@
+import datetime
+import random
+from sqlalchemy import event
+from app import create_app
+from app.db import Base, engine
+from app.repositories.repo import Repo
+from app.services.reports_service import ReportsService
+
+
+def _seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    today = datetime.date.today()
+    rows = [{'date': today - datetime.timedelta(days=rng.randint(1, 20)), 'salesperson': f'S{rng.randint(0, 3)}',
+             'product': f'P{rng.randint(0, 9)}', 'zone': rng.choice(['North', 'South', 'East']), 'amount': rng.randint(1, 500)}
+            for _ in range(400)]
+    Repo().insert_sales_bulk(rows)
+    return rows, today - datetime.timedelta(days=20), today - datetime.timedelta(days=1)
+
+
+def _expected(rows, dims, n):
+    sums = {}
+    for r in rows:
+        k = tuple(r[d] for d in dims)
+        sums[k] = sums.get(k, 0) + r['amount']
+    parts = {}
+    for k, t in sums.items():
+        parts.setdefault(k[:-1], []).append((k, t))
+    out = []
+    for p in sorted(parts):
+        best = sorted(parts[p], key=lambda kt: (-kt[1], kt[0][-1]))[:n]
+        out += [(k, float(t), i) for i, (k, t) in enumerate(best, start=1)]
+    return out
+
+
+def test_window_and_python_paths_match_brute_force():
+    rows, start, end = _seed()
+    repo = Repo()
+    for dims in (['zone', 'product'], ['salesperson', 'zone', 'product'], ['product']):
+        want = _expected(rows, dims, 3)
+        for use_window in (True, False):
+            got = repo.top_n_per_group(start, end, dims, n=3, use_window=use_window)
+            assert [(tuple(g[d] for d in dims), g['total'], g['rank']) for g in got] == want, (dims, use_window)
+
+
+def test_top_per_zone_is_one_select_and_filters_apply():
+    rows, start, end = _seed()
+    selects = []
+
+    def count(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            selects.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        r = ReportsService().top_by_group(['zone', 'product'], start, end, n=2, filters={'salesperson': 'S1'})
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert len(selects) == 1 and 'ROW_NUMBER' in selects[0].upper()
+    assert r['groups'] == [dict(zip(('zone', 'product', 'total', 'rank'), (*k, t, i)))
+                           for k, t, i in _expected([x for x in rows if x['salesperson'] == 'S1'], ['zone', 'product'], 2)]
+
+
+def test_series_and_validation():
+    rows, start, end = _seed()
+    svc = ReportsService()
+    r = svc.top_by_group(['zone', 'salesperson'], start, end, n=1, series=True)
+    assert sum(s['total'] for s in r['series']) == float(sum(x['amount'] for x in rows))
+    assert {s['zone'] for s in r['series']} == {'North', 'South', 'East'}
+    for dims, n in ((['zone', 'zone'], 5), (['region'], 5), ('zone', 5), (['zone'], 0), (['zone'], True)):
+        try:
+            svc.top_by_group(dims, start, end, n=n)
+            assert False, (dims, n)
+        except ValueError:
+            pass
+
+
+def test_top_endpoint():
+    _, start, end = _seed()
+    client = create_app().test_client()
+    resp = client.post('/api/v1/reports/top', json={'dimensions': ['zone', 'product'], 'start': start.isoformat(), 'end': end.isoformat(), 'n': 3})
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert len(data['groups']) == 9 and 'series' not in data
+    assert client.post('/api/v1/reports/top', json={'dimensions': ['bad'], 'start': '2025-01-01', 'end': '2025-01-02'}).status_code == 400
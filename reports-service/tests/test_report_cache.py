@@ -0,0 +1,129 @@
+import datetime
+import threading
+import time
+from app.cache import ReportCache, RedisBackend, report_cache
+from app.db import Base, engine
+from app.repositories.repo import Repo
+from app.services.reports_service import ReportsService
+
+
+def _key(start, end, criterion='product'):
+    return (criterion, start.isoformat(), end.isoformat())
+
+
+def test_lru_is_bounded():
+    c = ReportCache(maxsize=2, ttl=60)
+    for i in range(5):
+        c.set(('product', '2025-01-0%d' % (i + 1), '2025-01-09'), i)
+    assert len(c) == 2
+
+
+def test_ttl_expires(monkeypatch):
+    c = ReportCache(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr('app.cache.time.monotonic', lambda: now[0])
+    c.set(('zone', '2025-01-01', '2025-01-07'), {'total': 1})
+    assert c.get(('zone', '2025-01-01', '2025-01-07')) == {'total': 1}
+    now[0] += 11
+    assert c.get(('zone', '2025-01-01', '2025-01-07')) is None
+
+
+def test_single_flight_computes_once():
+    c = ReportCache()
+    calls = []
+    gate = threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(2)
+        return {'total': 42}
+
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(c.get_or_compute(('zone', '2025-01-01', '2025-01-07'), compute))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert out == [{'total': 42}] * 8
+
+
+def test_shared_across_service_instances_and_invalidated_by_ingestion():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    day = datetime.date.today() - datetime.timedelta(days=3)
+    Repo().insert_sales_bulk([{'date': day, 'salesperson': 'A', 'product': 'P', 'zone': 'N', 'amount': 10}])
+    start, end = day - datetime.timedelta(days=2), day
+    r1 = ReportsService().generate_report('product', start, end)
+    assert report_cache.get(_key(start, end)) is not None
+    # a far-away range is kept, the touched one is dropped
+    far = _key(day - datetime.timedelta(days=400), day - datetime.timedelta(days=390))
+    report_cache.set(far, {'total': 0})
+    Repo().insert_sales_bulk([{'date': day, 'salesperson': 'A', 'product': 'P', 'zone': 'N', 'amount': 5}])
+    assert report_cache.get(_key(start, end)) is None
+    assert report_cache.get(far) is not None
+    r2 = ReportsService().generate_report('product', start, end)
+    assert r2['total'] == r1['total'] + 5
+
+
+def test_ingestion_into_previous_window_invalidates():
+    c = ReportCache()
+    key = ('zone', '2025-01-08', '2025-01-14')
+    c.set(key, {'total': 1})
+    # 2025-01-03 lies in the comparison window 2025-01-01..2025-01-07
+    c.invalidate_range(datetime.date(2025, 1, 3), datetime.date(2025, 1, 3))
+    assert c.get(key) is None
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def get(self, k):
+        return self.data.get(k)
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def set(self, k, v, ex=None):
+        self.data[k] = v
+
+    def incr(self, k):
+        self.calls.append(('incr', k))
+        self.data[k] = str(int(self.data.get(k, 0)) + 1).encode()
+        return int(self.data[k])
+
+
+def test_redis_backend_shares_and_invalidates():
+    redis = FakeRedis()
+    pod_a = ReportCache(backend=RedisBackend(redis))
+    pod_b = ReportCache(backend=RedisBackend(redis))
+    key = ('product', '2025-01-01', '2025-01-07')
+    pod_a.set(key, {'total': 3})
+    assert pod_b.get(key) == {'total': 3}
+    pod_b.invalidate_range(datetime.date(2025, 1, 5), datetime.date(2025, 1, 5))
+    assert ReportCache(backend=RedisBackend(redis)).get(key) is None
+    pod_b.set(key, {'total': 4})
+    assert ReportCache(backend=RedisBackend(redis)).get(key) == {'total': 4}
+
+
+def test_redis_invalidation_bumps_months_without_scanning():
+    redis = FakeRedis()
+    backend = RedisBackend(redis)
+    # window Mar 1-31 depends on Jan 29 .. Mar 31 through the comparison period
+    march = ('product', '2025-03-01', '2025-03-31')
+    june = ('product', '2025-06-01', '2025-06-30')
+    backend.set(march, {'total': 1})
+    backend.set(june, {'total': 2})
+
+    backend.invalidate_range(datetime.date(2025, 1, 30), datetime.date(2025, 2, 2))
+    assert redis.calls == [('incr', 'reports:v:2025-01'), ('incr', 'reports:v:2025-02')]
+    assert backend.get(march) is None
+    assert backend.get(june) == {'total': 2}
+
+    backend.invalidate_range(datetime.date(2024, 12, 31), datetime.date(2024, 12, 31))
+    backend.set(march, {'total': 5})
+    assert backend.get(march) == {'total': 5}
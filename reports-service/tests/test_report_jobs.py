@@ -0,0 +1,148 @@
+import datetime
+import gzip
+import json
+import threading
+
+from app import create_app
+from app.db import Base, engine
+from app.jobs import ReportJobs, report_jobs
+from app.repositories.repo import Repo
+
+D = datetime.date
+
+
+def _report(criterion, start, end, filters):
+    days = (end - start).days + 1
+    series = [{'date': (start + datetime.timedelta(days=i)).isoformat(), criterion: 'G', 'total': float(i)} for i in range(days)]
+    return {'criterion': criterion, 'start': start.isoformat(), 'end': end.isoformat(), 'total': 1.0,
+            'pct_change': None, 'top5': [], 'series': series, 'daily': [{'date': r['date'], 'total': r['total']} for r in series]}
+
+
+def _read(jobs, job_id):
+    with gzip.open(jobs.result_path(job_id)) as f:
+        return json.load(f)
+
+
+def test_job_runs_and_persists_compressed(tmp_path):
+    jobs = ReportJobs(str(tmp_path), compute=_report)
+    job = jobs.submit('zone', D(2024, 1, 1), D(2024, 12, 31))
+    assert job['status'] in ('queued', 'running', 'done')
+    done = jobs.wait(job['job_id'])
+    assert done['status'] == 'done' and done['size'] > 0
+    data = _read(jobs, job['job_id'])
+    assert len(data['series']) == 366
+    # the sidecar lets a fresh process find the finished job
+    again = ReportJobs(str(tmp_path), compute=_report)
+    assert again.status(job['job_id'])['status'] == 'done'
+    assert again.result_path(job['job_id'])
+
+
+def test_other_workers_see_every_state_through_the_sidecar(tmp_path):
+    started, gate = threading.Event(), threading.Event()
+
+    def compute(*args):
+        started.set()
+        gate.wait(2)
+        return _report(*args)
+
+    jobs = ReportJobs(str(tmp_path), compute=compute)
+    other_worker = ReportJobs(str(tmp_path), compute=_report)
+    job_id = jobs.submit('zone', D(2024, 1, 1), D(2024, 1, 31))['job_id']
+    assert other_worker.status(job_id)['status'] in ('queued', 'running')
+    assert started.wait(2)
+    assert other_worker.status(job_id)['status'] == 'running'
+    assert other_worker.result_path(job_id) is None
+    gate.set()
+    assert other_worker.wait(job_id)['status'] == 'done'
+    assert other_worker.result_path(job_id)
+
+
+def test_failure_is_visible_to_other_workers(tmp_path):
+    def compute(*args):
+        raise RuntimeError('boom')
+
+    jobs = ReportJobs(str(tmp_path), compute=compute)
+    job_id = jobs.submit('zone', D(2024, 1, 1), D(2024, 1, 31))['job_id']
+    job = ReportJobs(str(tmp_path)).wait(job_id)
+    assert job['status'] == 'failed' and job['error'] == 'boom'
+
+
+def test_identical_requests_reuse_the_job(tmp_path):
+    calls = []
+    gate = threading.Event()
+
+    def compute(*args):
+        calls.append(args)
+        gate.wait(2)
+        return _report(*args)
+
+    jobs = ReportJobs(str(tmp_path), compute=compute)
+    a = jobs.submit('product', D(2024, 1, 1), D(2024, 6, 30), {'zone': ['North']})
+    b = jobs.submit('product', D(2024, 1, 1), D(2024, 6, 30), {'zone': ['North']})
+    other = jobs.submit('product', D(2024, 1, 1), D(2024, 6, 30), layout='columnar')
+    gate.set()
+    assert a['job_id'] == b['job_id'] != other['job_id']
+    jobs.wait(a['job_id'])
+    jobs.wait(other['job_id'])
+    assert jobs.submit('product', D(2024, 1, 1), D(2024, 6, 30), {'zone': ['North']})['status'] == 'done'
+    assert len(calls) == 2
+
+
+def test_invalidation_and_failures_are_not_reused(tmp_path):
+    fail = [True]
+
+    def compute(*args):
+        if fail[0]:
+            raise RuntimeError('boom')
+        return _report(*args)
+
+    jobs = ReportJobs(str(tmp_path), compute=compute)
+    job = jobs.wait(jobs.submit('zone', D(2025, 1, 8), D(2025, 1, 14))['job_id'])
+    assert job['status'] == 'failed' and job['error'] == 'boom'
+    fail[0] = False
+    ok = jobs.wait(jobs.submit('zone', D(2025, 1, 8), D(2025, 1, 14))['job_id'])
+    assert ok['job_id'] != job['job_id'] and ok['status'] == 'done'
+    # 2025-01-03 is in the comparison window, so new data there means a new job
+    jobs.invalidate_range(D(2025, 1, 3), D(2025, 1, 3))
+    fresh = jobs.submit('zone', D(2025, 1, 8), D(2025, 1, 14))
+    assert fresh['job_id'] != ok['job_id']
+    # the old result stays downloadable by id
+    assert jobs.result_path(ok['job_id'])
+
+
+def test_columnar_layout(tmp_path):
+    jobs = ReportJobs(str(tmp_path), compute=_report)
+    job = jobs.wait(jobs.submit('zone', D(2025, 1, 1), D(2025, 1, 3), layout='columnar')['job_id'])
+    c = _read(jobs, job['job_id'])
+    assert c['series'] == {'dates': ['2025-01-01', '2025-01-02', '2025-01-03'], 'groups': ['G'] * 3, 'totals': [0.0, 1.0, 2.0]}
+    assert c['daily']['totals'] == [0.0, 1.0, 2.0]
+
+
+def test_job_endpoints_end_to_end(tmp_path, monkeypatch):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    day = datetime.date.today() - datetime.timedelta(days=3)
+    Repo().insert_sales_bulk([{'date': day, 'salesperson': 'A', 'product': 'P', 'zone': 'N', 'amount': 10}])
+    monkeypatch.setattr(report_jobs, 'directory', str(tmp_path))
+    report_jobs.clear()
+    client = create_app().test_client()
+
+    assert client.post('/api/v1/reports/jobs', json={'criterion': 'bad', 'start': '2025-01-01', 'end': '2025-01-02'}).status_code == 400
+    assert client.post('/api/v1/reports/jobs', json={'criterion': 'zone', 'start': '2025-01-01', 'end': '2025-01-02', 'layout': 'x'}).status_code == 400
+    body = {'criterion': 'zone', 'start': (day - datetime.timedelta(days=5)).isoformat(), 'end': day.isoformat()}
+    resp = client.post('/api/v1/reports/jobs', json=body)
+    assert resp.status_code in (200, 202)
+    job_id = resp.get_json()['job_id']
+    report_jobs.wait(job_id)
+    status = client.get(f'/api/v1/reports/jobs/{job_id}').get_json()
+    assert status['status'] == 'done' and status['links']['result'].endswith('/result')
+
+    plain = client.get(f'/api/v1/reports/jobs/{job_id}/result')
+    assert plain.status_code == 200 and plain.get_json()['total'] == 10.0
+    zipped = client.get(f'/api/v1/reports/jobs/{job_id}/result', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(zipped.data))['total'] == 10.0
+
+    assert client.post('/api/v1/reports/jobs', json=body).status_code == 200
+    assert client.get('/api/v1/reports/jobs/' + '0' * 32).status_code == 404
+    report_jobs.clear()
@@ -30,3 +30,39 @@ def test_generate_report_basic():
     assert 'total' in r
     assert isinstance(r['top5'], list)
     assert isinstance(r['daily'], list)
+
+
+def test_single_scan_matches_multi_query_with_one_select():
+    from sqlalchemy import event
+    repo = Repo()
+    today = datetime.date.today()
+    rows = []
+    for d in range(20):
+        for i in range(7):
+            rows.append({'date': today - datetime.timedelta(days=d), 'salesperson': f'S{i % 3}', 'product': f'P{i % 4}', 'zone': f'Z{i % 2}', 'amount': 10 + i + d})
+    repo.insert_sales_bulk(rows)
+    svc = ReportsService(repo=repo)
+    end = today - datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=6)
+
+    selects = []
+
+    def count(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            selects.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        fast = svc.compute_report('product', start, end)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert len(selects) == 1
+
+    from benchmark import multi_query_report
+    slow = multi_query_report(repo, 'product', start, end)
+    assert fast['total'] == slow['total']
+    assert abs(fast['pct_change'] - slow['pct_change']) < 1e-9
+    assert fast['daily'] == slow['daily']
+    assert sorted(fast['top5'], key=lambda r: r['product']) == sorted(slow['top5'], key=lambda r: r['product'])
+    key = lambda r: (r['date'], r['product'])
+    assert sorted(fast['series'], key=key) == sorted(slow['series'], key=key)
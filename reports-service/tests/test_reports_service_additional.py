@@ -4,30 +4,14 @@ from app.services.reports_service import ReportsService
 
 
 class StubRepo:
-    def __init__(self, total=0, prev_total=0, top5=None, series=None, daily=None):
-        self._total = total
-        self._prev_total = prev_total
-        self._top5 = top5 or []
-        self._series = series or []
-        self._daily = daily or []
-        self.calls = {'total_sales': 0}
+    def __init__(self, rows=None):
+        # (date, group, total) rows over the previous and current windows
+        self._rows = rows or []
+        self.calls = {'daily_group_totals': 0}
 
-    def total_sales(self, start, end):
-        # alternate behavior: first call returns _total, second call (for prev) returns _prev_total
-        self.calls['total_sales'] += 1
-        # if called once, return current total, if called twice, return prev_total
-        if self.calls['total_sales'] == 1:
-            return float(self._total)
-        return float(self._prev_total)
-
-    def group_top_n(self, start, end, group_by, n=5):
-        return self._top5
-
-    def grouped_daily_series(self, start, end, group_by):
-        return self._series
-
-    def daily_series(self, start, end):
-        return self._daily
+    def daily_group_totals(self, start, end, group_by, filters=None):
+        self.calls['daily_group_totals'] += 1
+        return [r for r in self._rows if start <= r[0] <= end]
 
 
 def test_invalid_criterion_raises():
@@ -43,7 +27,7 @@ def test_invalid_criterion_raises():
 
 def test_pct_change_none_when_prev_zero():
     # prev_total = 0 should make pct_change None
-    repo = StubRepo(total=100.0, prev_total=0.0, top5=[{'product': 'X', 'total': 100.0}], daily=[{'date': '2025-01-01', 'total': 50.0}])
+    repo = StubRepo([(datetime.date(2025, 1, 1), 'X', 50.0), (datetime.date(2025, 1, 3), 'X', 50.0)])
     svc = ReportsService(repo=repo)
     start = datetime.date(2025, 1, 1)
     end = datetime.date(2025, 1, 7)
@@ -51,12 +35,12 @@ def test_pct_change_none_when_prev_zero():
     assert r['total'] == 100.0
     assert r['pct_change'] is None
     assert r['top5'] == [{'product': 'X', 'total': 100.0}]
-    assert r['daily'] == [{'date': '2025-01-01', 'total': 50.0}]
+    assert r['daily'] == [{'date': '2025-01-01', 'total': 50.0}, {'date': '2025-01-03', 'total': 50.0}]
 
 
 def test_pct_change_computed_and_cache_prevents_duplicate_repo_calls(monkeypatch):
     # prev_total non-zero -> pct_change computed; also exercise TTL cache
-    repo = StubRepo(total=300.0, prev_total=100.0, top5=[{'product': 'A', 'total': 300.0}], daily=[{'date': '2025-01-02', 'total': 150.0}])
+    repo = StubRepo([(datetime.date(2024, 12, 28), 'A', 100.0), (datetime.date(2025, 1, 2), 'A', 300.0)])
     svc = ReportsService(repo=repo)
     start = datetime.date(2025, 1, 1)
     end = datetime.date(2025, 1, 7)
@@ -74,6 +58,5 @@ def test_pct_change_computed_and_cache_prevents_duplicate_repo_calls(monkeypatch
     r2 = svc.generate_report('product', start, end)
     assert r2 == r1
 
-    # ensure repo.total_sales was called only twice total (one for total, one for prev) during first generate
-    # subsequent cached call should not invoke repo.total_sales again
-    assert repo.calls['total_sales'] == 2
+    # one grouped scan covers both windows; the cached call does not reach the repo again
+    assert repo.calls['daily_group_totals'] == 1
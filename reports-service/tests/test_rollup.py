@@ -0,0 +1,168 @@
+import datetime
+from sqlalchemy import insert, event
+from app.db import Base, engine, SessionLocal
+from app.domain.models import Sale, SalesDailyRollup
+from app.repositories.repo import Repo
+
+
+def setup_function():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _rows(today):
+    rows = []
+    for d in range(0, 10):
+        for i in range(6):
+            rows.append({'date': today - datetime.timedelta(days=d), 'salesperson': f'S{i % 2}', 'product': f'P{i % 3}', 'zone': 'North', 'amount': 5 + i})
+    return rows
+
+
+def test_bulk_insert_maintains_rollup():
+    today = datetime.date.today()
+    repo = Repo()
+    repo.insert_sales_bulk(_rows(today))
+    s = SessionLocal()
+    try:
+        r = s.get(SalesDailyRollup, (today, 'S0', 'P0', 'North'))
+        # only i=0 maps to (S0, P0) on a given day
+        assert r.count == 1 and float(r.total) == 5.0
+        assert sum(x.count for x in s.query(SalesDailyRollup)) == 60
+    finally:
+        s.close()
+    # a second batch accumulates into existing rollup rows
+    repo.insert_sales_bulk([{'date': today, 'salesperson': 'S0', 'product': 'P0', 'zone': 'North', 'amount': 7}])
+    s = SessionLocal()
+    try:
+        r = s.get(SalesDailyRollup, (today, 'S0', 'P0', 'North'))
+        assert r.count == 2 and float(r.total) == 12.0
+    finally:
+        s.close()
+
+
+def test_catch_up_picks_rows_written_elsewhere():
+    today = datetime.date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(Sale), _rows(today))
+    repo = Repo()
+    assert repo.catch_up_rollup() == 60
+    assert repo.catch_up_rollup() == 0
+
+
+def test_rollup_results_match_raw_sales():
+    today = datetime.date.today()
+    Repo().insert_sales_bulk(_rows(today))
+    start, end = today - datetime.timedelta(days=8), today
+    rolled, raw = Repo(use_rollup=True), Repo(use_rollup=False)
+    assert rolled.total_sales(start, end) == raw.total_sales(start, end)
+    assert rolled.daily_series(start, end) == raw.daily_series(start, end)
+    assert rolled.group_top_n(start, end, 'product') == raw.group_top_n(start, end, 'product')
+    key = lambda r: (r['date'], r['zone'])
+    assert sorted(rolled.grouped_daily_series(start, end, 'zone'), key=key) == sorted(raw.grouped_daily_series(start, end, 'zone'), key=key)
+
+
+def test_closed_days_do_not_scan_sales():
+    today = datetime.date.today()
+    Repo().insert_sales_bulk(_rows(today))
+    seen = []
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        Repo().total_sales(today - datetime.timedelta(days=5), today - datetime.timedelta(days=1))
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    assert 'sales_daily_rollup' in seen[-1]
+    assert 'FROM sales ' not in seen[-1] + ' '
+
+
+def _sale(sid, today, amount=1):
+    return {'id': sid, 'date': today - datetime.timedelta(days=1), 'salesperson': 'S0', 'product': 'P0', 'zone': 'North', 'amount': amount}
+
+
+def _rolled_total(day):
+    s = SessionLocal()
+    try:
+        return sum(float(r.total) for r in s.query(SalesDailyRollup).filter(SalesDailyRollup.date == day))
+    finally:
+        s.close()
+
+
+def test_rows_committed_below_the_watermark_are_folded_later():
+    from app.domain.models import RollupGap
+    today = datetime.date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(Sale), [_sale(i, today) for i in (1, 2, 3, 6, 7)])
+    repo = Repo()
+    assert repo.catch_up_rollup() == 5
+    s = SessionLocal()
+    assert [(g.first_id, g.last_id) for g in s.query(RollupGap)] == [(4, 5)]
+    s.close()
+
+    # a concurrent writer's transaction commits after the watermark passed its id
+    with engine.begin() as conn:
+        conn.execute(insert(Sale), [_sale(5, today, 10)])
+    assert repo.catch_up_rollup() == 1
+    assert _rolled_total(today - datetime.timedelta(days=1)) == 15.0
+    s = SessionLocal()
+    assert [(g.first_id, g.last_id) for g in s.query(RollupGap)] == [(4, 4)]
+    s.close()
+    assert repo.catch_up_rollup() == 0
+
+
+def test_expired_gaps_are_dropped(monkeypatch):
+    from app.domain.models import RollupGap
+    from app.repositories import repo as repo_module
+    today = datetime.date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(Sale), [_sale(i, today) for i in (1, 3)])
+    Repo().catch_up_rollup()
+    monkeypatch.setattr(repo_module, 'GAP_SECONDS', -1)
+    Repo().catch_up_rollup()
+    s = SessionLocal()
+    assert s.query(RollupGap).count() == 0
+    s.close()
+
+
+def test_catch_up_commits_per_chunk_and_sums_in_sql(monkeypatch):
+    from app.repositories import repo as repo_module
+    today = datetime.date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(Sale), [_sale(i, today, i) for i in (1, 2, 3, 4, 6)])
+    monkeypatch.setattr(repo_module, 'FOLD_CHUNK', 2)
+    repo = Repo()
+    commits, seen = [], []
+    event.listen(repo.session, 'after_commit', lambda session: commits.append(1))
+    capture = lambda conn, cursor, statement, params, context, executemany: seen.append(statement)
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        assert repo.catch_up_rollup() == 5
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    assert len(commits) == 3
+    assert any('INSERT INTO sales_daily_rollup' in st and 'GROUP BY' in st for st in seen)
+    # no statement reads the sale rows themselves back into Python
+    assert not any('sales.amount' in st and 'sum(' not in st.lower() for st in seen)
+    assert _rolled_total(today - datetime.timedelta(days=1)) == 16.0
+
+
+def test_app_startup_does_not_block_on_catch_up(monkeypatch):
+    import time
+    from app import create_app
+    from app.repositories import repo as repo_module
+    today = datetime.date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(Sale), [_sale(i, today, 2) for i in (1, 2)])
+    monkeypatch.setenv('REPORTS_ROLLUP_CATCHUP_SECONDS', '0')
+    create_app()
+    assert _rolled_total(today - datetime.timedelta(days=1)) == 0
+
+    # the catch-up thread folds the backlog as soon as it starts
+    monkeypatch.setattr(repo_module, '_catchup_thread', None)
+    repo_module.start_rollup_catchup(3600)
+    deadline = time.monotonic() + 10
+    while _rolled_total(today - datetime.timedelta(days=1)) != 4.0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _rolled_total(today - datetime.timedelta(days=1)) == 4.0
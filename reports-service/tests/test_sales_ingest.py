@@ -0,0 +1,111 @@
+import datetime
+from decimal import Decimal
+from app import create_app
+from app.db import Base, engine, SessionLocal
+from app.domain.models import Sale, SalesDailyRollup
+from app.services.ingest_service import IngestService, validate_sale
+
+
+def setup_function():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def test_validate_sale():
+    ok = validate_sale({'date': '2025-01-02', 'salesperson': ' Ann ', 'product': 'P', 'zone': 'N', 'amount': '10.006'})
+    assert ok['date'] == datetime.date(2025, 1, 2) and ok['salesperson'] == 'Ann'
+    assert ok['amount'] == Decimal('10.01')
+    for bad in ({'date': '2025-13-01', 'salesperson': 'a', 'product': 'p', 'zone': 'z', 'amount': 1},
+                {'date': '2025-01-01', 'salesperson': 'a', 'product': 'p', 'zone': 'z', 'amount': 'x'},
+                {'date': '2025-01-01', 'salesperson': 'a', 'product': 'p', 'amount': 1}):
+        try:
+            validate_sale(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_csv_stream_in_batches_updates_rollup():
+    lines = ['date,salesperson,product,zone,amount\n']
+    for i in range(25):
+        lines.append(f'2025-02-0{1 + i % 3},S{i % 2},P,North,{i}\n')
+    lines.append('2025-02-01,S0,P,North,abc\n')
+    summary = IngestService(batch_size=10).ingest(iter(lines), 'csv')
+    assert summary['inserted'] == 25
+    assert summary['batches'] == 3
+    assert summary['rejected'] == 1
+    assert summary['errors'][0]['line'] == 27
+    s = SessionLocal()
+    try:
+        assert s.query(Sale).count() == 25
+        assert sum(r.count for r in s.query(SalesDailyRollup)) == 25
+    finally:
+        s.close()
+
+
+def test_bulk_endpoint_ndjson():
+    client = create_app().test_client()
+    body = '\n'.join([
+        '{"date": "2025-03-01", "salesperson": "A", "product": "P1", "zone": "N", "amount": 12.5}',
+        '{"date": "2025-03-01", "salesperson": "B", "product": "P2", "zone": "S", "amount": 7}',
+        'not json',
+        '',
+    ])
+    r = client.post('/api/v1/sales/bulk', data=body, content_type='application/x-ndjson')
+    assert r.status_code == 200
+    j = r.get_json()
+    assert j['inserted'] == 2 and j['rejected'] == 1
+    r = client.post('/api/v1/reports', json={'criterion': 'zone', 'start': '2025-03-01', 'end': '2025-03-01'})
+    assert r.get_json()['total'] == 19.5
+
+
+def test_bulk_endpoint_rejects_unknown_format():
+    client = create_app().test_client()
+    r = client.post('/api/v1/sales/bulk', data='x', content_type='text/plain')
+    assert r.status_code == 415
+
+
+def _ndjson_lines(n, day='2025-04-01'):
+    return [f'{{"date": "{day}", "salesperson": "A", "product": "P", "zone": "N", "amount": {i}}}'.encode()
+            for i in range(1, n + 1)]
+
+
+def test_bulk_endpoint_reports_progress_on_bad_encoding():
+    client = create_app().test_client()
+    body = b'\n'.join(_ndjson_lines(3) + [b'{"date": "2025-04-01", "salesperson": "\xff"}'] + _ndjson_lines(2))
+    r = client.post('/api/v1/sales/bulk?batch_size=2', data=body, content_type='application/x-ndjson')
+    assert r.status_code == 400
+    j = r.get_json()
+    assert j['inserted'] == 2 and j['batches'] == 1
+    assert j['aborted'] == {'error': 'body must be UTF-8', 'resume_after_line': 2, 'rows_not_loaded': 1}
+    s = SessionLocal()
+    try:
+        assert s.query(Sale).count() == 2
+    finally:
+        s.close()
+
+
+def test_bulk_endpoint_reports_progress_on_database_error(monkeypatch):
+    from app.repositories.repo import Repo
+    load = Repo.load_sales_batch
+    calls = []
+
+    def failing_second_batch(self, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError('connection lost')
+        return load(self, rows)
+
+    monkeypatch.setattr(Repo, 'load_sales_batch', failing_second_batch)
+    client = create_app().test_client()
+    body = b'\n'.join(_ndjson_lines(3) + [b'not json'] + _ndjson_lines(3))
+    r = client.post('/api/v1/sales/bulk?batch_size=3', data=body, content_type='application/x-ndjson')
+    assert r.status_code == 500
+    j = r.get_json()
+    assert j['inserted'] == 3 and j['rejected'] == 1 and j['errors'][0]['line'] == 4
+    assert j['aborted'] == {'error': 'batch could not be loaded', 'resume_after_line': 3, 'rows_not_loaded': 3}
+    s = SessionLocal()
+    try:
+        assert s.query(Sale).count() == 3
+    finally:
+        s.close()
@@ -0,0 +1,48 @@
+import datetime
+import json
+from flask_restx import marshal
+from app import create_app
+from app import serialization
+from app.controllers.api import report_resp
+from app.services.reports_service import build_report
+
+START, END = datetime.date(2025, 1, 1), datetime.date(2025, 3, 31)
+
+
+def _report():
+    rows = [(START + datetime.timedelta(days=i), f'P{i % 4}', 10 + i % 7) for i in range(-90, 90)]
+    return build_report(rows, 'product', START, END)
+
+
+def test_rows_shape_matches_marshalled_response():
+    r = _report()
+    assert json.loads(serialization.dumps(serialization.report_payload(r))) == json.loads(json.dumps(marshal(r, report_resp)))
+
+
+def test_stdlib_fallback(monkeypatch):
+    r = serialization.report_payload(_report())
+    fast = serialization.dumps(r)
+    monkeypatch.setattr(serialization, 'orjson', None)
+    assert json.loads(serialization.dumps(r)) == json.loads(fast)
+
+
+def test_columnar_shape():
+    r = _report()
+    c = serialization.columnar(r)
+    assert c['daily']['dates'] == [d['date'] for d in r['daily']]
+    assert c['daily']['totals'] == [d['total'] for d in r['daily']]
+    assert len(c['series']['dates']) == len(c['series']['groups']) == len(r['series'])
+    assert c['top5'] == r['top5'] and c['total'] == r['total']
+
+
+def test_endpoint_shapes(monkeypatch):
+    import app.controllers.api as api_mod
+    monkeypatch.setattr(api_mod.ReportsService, 'generate_report', lambda self, c, s, e: _report())
+    client = create_app().test_client()
+    body = {'criterion': 'product', 'start': START.isoformat(), 'end': END.isoformat()}
+    rows = client.post('/api/v1/reports', json=body)
+    assert rows.status_code == 200 and rows.mimetype == 'application/json'
+    assert isinstance(rows.get_json()['daily'], list) and 'series' not in rows.get_json()
+    cols = client.post('/api/v1/reports', json={**body, 'shape': 'columnar'}).get_json()
+    assert set(cols['daily']) == {'dates', 'totals'} and set(cols['series']) == {'dates', 'groups', 'totals'}
+    assert client.post('/api/v1/reports', json={**body, 'shape': 'xml'}).status_code == 400
@@ -7,6 +7,8 @@ from urllib import request as urlreq, error as urlerror
 
 bp = Blueprint("api", __name__, url_prefix="/api")
 svc = RolesService()
+ACCESS_CONTROL_BATCH_MAX = int(os.getenv("ACCESS_CONTROL_BATCH_MAX", "1000"))
+USERS_PAGE_MAX = int(os.getenv("USERS_PAGE_MAX", "500"))
 
 @bp.get("/health")
 def health():
@@ -30,7 +32,22 @@ def as_bool(x, default=False):
 @bp.get("/users-with-roles")
 @require_auth
 def users_with_roles():
-    return jsonify(svc.list_users_with_roles())
+    # sin `limit` se devuelven todos (compatibilidad); con `limit` la página sigue por
+    # ?after_id=<X-Next-After-Id> hasta que la cabecera no venga
+    after_id = request.args.get("after_id", type=int)
+    limit = request.args.get("limit", type=int)
+    if (after_id is None and "after_id" in request.args) or (limit is None and "limit" in request.args):
+        return {"error":"BAD_REQUEST","detail":"after_id y limit deben ser enteros"}, 400
+    if limit is not None and not 1 <= limit <= USERS_PAGE_MAX:
+        return {"error":"BAD_REQUEST","detail":f"limit debe estar entre 1 y {USERS_PAGE_MAX}"}, 400
+    flat = request.args.get("mode") == "join"
+
+    # se pide uno de más para saber si hay otra página
+    users = svc.list_users_with_roles(after_id, limit + 1 if limit else None, flat=flat)
+    resp = jsonify(users[:limit] if limit else users)
+    if limit and len(users) > limit:
+        resp.headers["X-Next-After-Id"] = str(users[limit - 1]["id"])
+    return resp
 
 @bp.put("/users/<int:uid>/roles-permissions")
 @require_auth
@@ -144,3 +161,24 @@ def access_control():
     if err: return err
     r = svc.access_control(data["email"],data["rol"],data["action"])
     return dict(email=r.email, rol=r.rol, action=r.action, permission=r.permission)
+
+##Verifica varios (email, rol, action) en una sola llamada
+@bp.post("/access-control/batch")
+@require_auth
+def access_control_batch():
+    data = get_json()
+    err = require_fields(data, ["checks"])
+    if err: return err
+    if not isinstance(data["checks"], list):
+        return {"error":"BAD_REQUEST","detail":"checks debe ser lista"}, 400
+    if len(data["checks"]) > ACCESS_CONTROL_BATCH_MAX:
+        return {"error":"BAD_REQUEST","detail":f"máximo {ACCESS_CONTROL_BATCH_MAX} checks"}, 400
+
+    checks = []
+    for it in data["checks"]:
+        if not isinstance(it, dict) or any(f not in it for f in ("email","rol","action")):
+            return {"error":"BAD_REQUEST","detail":"cada item requiere email, rol y action"}, 400
+        if not all(isinstance(it[f], str) for f in ("email","rol","action")):
+            return {"error":"BAD_REQUEST","detail":"email, rol y action deben ser texto"}, 400
+        checks.append((it["email"], it["rol"], it["action"]))
+    return {"results": svc.access_control_many(checks)}
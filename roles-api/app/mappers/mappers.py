@@ -18,3 +18,22 @@ def map_user_with_roles(user: User) -> dict:
             for a in user.roles_assocs
         ],
     }
+
+
+def map_users_with_roles_rows(rows) -> list[dict]:
+    """Nest the flat rows of Repo.users_with_roles_rows (ordered by user) in one pass."""
+    out = []
+    for uid, names, email, rid, rname, rdesc, can_create, can_edit, can_delete, can_view in rows:
+        if not out or out[-1]["id"] != uid:
+            out.append({"id": uid, "names": names, "email": email, "roles": []})
+        if rid is not None:
+            out[-1]["roles"].append({
+                "id": rid,
+                "name": rname,
+                "description": rdesc,
+                "can_create": bool(can_create),
+                "can_edit": bool(can_edit),
+                "can_delete": bool(can_delete),
+                "can_view": bool(can_view),
+            })
+    return out
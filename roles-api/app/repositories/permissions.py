@@ -0,0 +1,106 @@
+"""In-memory permission matrix for access-control checks.
+
+All assignments are compiled once into `(email, role name) -> (create, edit,
+delete, view)`, so a check is a dict lookup instead of three queries. The
+matrix is rebuilt lazily on the first check after `invalidate()`, which the
+repository calls whenever users or role assignments change. Changes made by
+another replica are picked up after PERMISSION_MATRIX_TTL seconds (default
+5, 0 rebuilds on every check); until then that replica answers with the old
+permissions.
+"""
+import itertools
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+from app.domain.models import User, Role, UserRole
+
+# action -> position in the permission tuple
+ACTIONS = {"create": 0, "edit": 1, "delete": 2, "view": 3}
+
+
+class AccessCheck(NamedTuple):
+    email: str
+    rol: str
+    action: str
+    permission: bool
+    error: str | None = None
+
+
+class PermissionMatrix:
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        # (matrix, known emails, known role names), swapped as a whole on rebuild
+        self._state = ({}, frozenset(), frozenset())
+        self._built_at = None
+        # bumped by every invalidate(); a rebuild that raced with a write is not kept as fresh
+        self._generations = itertools.count(1)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._generation = next(self._generations)  # atomic under the GIL, unlike +=
+        self._built_at = None
+
+    def _fresh(self):
+        return self._built_at is not None and time.monotonic() - self._built_at < self.ttl
+
+    def load(self, session):
+        """Rebuild from the database when invalidated or older than the TTL."""
+        if self._fresh():
+            return
+        with self._lock:
+            if self._fresh():
+                return
+            generation = self._generation
+            rows = session.execute(
+                select(User.email, Role.name, UserRole.can_create, UserRole.can_edit,
+                       UserRole.can_delete, UserRole.can_view)
+                .join(UserRole, UserRole.user_id == User.id)
+                .join(Role, Role.id == UserRole.role_id)
+            ).all()
+            self._state = (
+                {(email, role): tuple(bool(p) for p in perms) for email, role, *perms in rows},
+                frozenset(session.execute(select(User.email)).scalars()),
+                frozenset(session.execute(select(Role.name)).scalars()),
+            )
+            # invalidated while reading: serve this build once, rebuild on the next check
+            self._built_at = time.monotonic() if generation == self._generation else None
+
+    def check(self, email, rol, action) -> AccessCheck:
+        """Raises ValueError("role_not_found") or ValueError("invalid_action"); an unknown
+        user or a role the user does not hold is denied."""
+        return self._check(self._state, email, rol, action)
+
+    def check_many(self, checks) -> list:
+        """Check (email, rol, action) tuples against one snapshot; errors are reported
+        per item in `error` instead of raised."""
+        state = self._state
+        results = []
+        for email, rol, action in checks:
+            try:
+                results.append(self._check(state, email, rol, action))
+            except ValueError as e:
+                results.append(AccessCheck(email, rol, action, False, str(e)))
+        return results
+
+    @staticmethod
+    def _check(state, email, rol, action):
+        perms_by_key, emails, roles = state
+        if email not in emails:
+            return AccessCheck(email, rol, action, False)
+        if rol not in roles:
+            raise ValueError("role_not_found")
+        perms = perms_by_key.get((email, rol))
+        if perms is None:
+            return AccessCheck(email, rol, action, False)
+        if action not in ACTIONS:
+            raise ValueError("invalid_action")
+        return AccessCheck(email, rol, action, perms[ACTIONS[action]])
+
+
+# shared by every Repo so an invalidation from any session is seen by all
+matrix = PermissionMatrix(float(os.getenv("PERMISSION_MATRIX_TTL", "5")))
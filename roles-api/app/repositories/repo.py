@@ -1,13 +1,42 @@
 from sqlalchemy import select, delete
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
 from app.db import SessionLocal
 from app.domain.models import User, Role, UserRole
+from app.repositories.permissions import matrix
 
 class Repo:
     def __init__(self, session=None):
         self.session = session or SessionLocal()
 
     def list_users(self): return self.session.execute(select(User)).scalars().all()
+
+    def list_users_with_roles(self, after_id:int|None=None, limit:int|None=None):
+        """Users ordered by id, with roles_assocs and their role loaded in two extra queries.
+        Keyset page: ids greater than after_id, at most limit users."""
+        q = (select(User)
+             .options(selectinload(User.roles_assocs).selectinload(UserRole.role))
+             .order_by(User.id)
+             .execution_options(populate_existing=True))
+        if after_id is not None: q = q.where(User.id > after_id)
+        if limit is not None: q = q.limit(limit)
+        return self.session.execute(q).scalars().all()
+
+    def users_with_roles_rows(self, after_id:int|None=None, limit:int|None=None):
+        """One row per (user, role) in a single query, ordered by user id; users without
+        roles come back once with NULL role columns. The keyset page applies to users."""
+        page = select(User.id).order_by(User.id)
+        if after_id is not None: page = page.where(User.id > after_id)
+        if limit is not None: page = page.limit(limit)
+        page = page.subquery()
+        q = (select(User.id, User.names, User.email,
+                    Role.id, Role.name, Role.description,
+                    UserRole.can_create, UserRole.can_edit, UserRole.can_delete, UserRole.can_view)
+             .join(page, page.c.id == User.id)
+             .outerjoin(UserRole, UserRole.user_id == User.id)
+             .outerjoin(Role, Role.id == UserRole.role_id)
+             .order_by(User.id, UserRole.id))
+        return self.session.execute(q).all()
     def get_user(self, uid:int): return self.session.get(User, uid)
     def create_user(self, names:str, email:str, password:str|None=None):
         # check for existing email first to avoid unique constraint exceptions
@@ -19,6 +48,7 @@ class Repo:
             u = User(names=names, email=email, password=password)
             self.session.add(u)
             self.session.commit()
+            matrix.invalidate()
             self.session.refresh(u)
             return u
         except IntegrityError:
@@ -32,7 +62,8 @@ class Repo:
 
     def list_roles(self): return self.session.execute(select(Role)).scalars().all()
     def create_role(self, name:str, description:str|None=None):
-        r = Role(name=name, description=description); self.session.add(r); self.session.commit(); self.session.refresh(r); return r
+        r = Role(name=name, description=description); self.session.add(r); self.session.commit()
+        matrix.invalidate(); self.session.refresh(r); return r
     def get_role(self, rid:int): return self.session.get(Role, rid)
     def get_role_by_name(self, name: str):
         return self.session.execute(select(Role).filter_by(name=name)).scalars().first()
@@ -42,6 +73,7 @@ class Repo:
         if not u: return None
         self.session.execute(delete(UserRole).where(UserRole.user_id==uid))
         self.session.commit()
+        matrix.invalidate()
         for it in items:
             r = self.get_role(it["role_id"])
             if not r: 
@@ -54,34 +86,13 @@ class Repo:
                 can_view=bool(it.get("can_view", True)),
             )
             self.session.add(assoc)
-        self.session.commit(); self.session.refresh(u); return u
+        self.session.commit(); matrix.invalidate(); self.session.refresh(u); return u
     
     def access_control(self, email, rol, action):
-        u = self.session.execute(select(User).filter_by(email=email)).scalars().first()
-        if not u:
-            return {"error": "user_not_exist"}, 200
-        
-        role = self.session.execute(select(Role).filter_by(name=rol)).scalars().first()
-        if not role:
-            raise ValueError("role_not_found")
-        
-        user_role = self.session.execute(
-            select(UserRole).filter_by(user_id=u.id, role_id=role.id)
-        ).scalars().first()
-        
-        if not user_role:
-            return type('Obj', (object,), {'email': email, 'rol': rol, 'action': action, 'permission': False})
-        
-        permission = False
-        if action == "create":
-            permission = user_role.can_create
-        elif action == "edit":
-            permission = user_role.can_edit
-        elif action == "delete":
-            permission = user_role.can_delete
-        elif action == "view":
-            permission = user_role.can_view
-        else:
-            raise ValueError("invalid_action")
-        
-        return type('Obj', (object,), {'email': email, 'rol': rol, 'action': action, 'permission': permission})
+        # O(1) lookup in the shared permission matrix (rebuilt after writes, see permissions.py)
+        matrix.load(self.session)
+        return matrix.check(email, rol, action)
+
+    def access_control_many(self, checks):
+        matrix.load(self.session)
+        return matrix.check_many(checks)
@@ -1,5 +1,5 @@
 from app.repositories.repo import Repo
-from app.mappers.mappers import map_user_with_roles
+from app.mappers.mappers import map_user_with_roles, map_users_with_roles_rows
 
 class RolesService:
     def __init__(self, repo: Repo|None=None):
@@ -22,8 +22,11 @@ class RolesService:
             if admin_role and u3:
                 self.repo.set_user_roles(u3.id, [{"role_id": admin_role.id, "can_create": True, "can_edit": True, "can_delete": True, "can_view": True}])
 
-    def list_users_with_roles(self):
-        return [map_user_with_roles(u) for u in self.repo.list_users()]
+    def list_users_with_roles(self, after_id:int|None=None, limit:int|None=None, flat:bool=False):
+        # flat: a single JOIN query; otherwise User + two selectin queries (never one per user)
+        if flat:
+            return map_users_with_roles_rows(self.repo.users_with_roles_rows(after_id, limit))
+        return [map_user_with_roles(u) for u in self.repo.list_users_with_roles(after_id, limit)]
 
     def set_user_roles(self, uid:int, assignments:list[dict]):
         u = self.repo.set_user_roles(uid, assignments)
@@ -42,28 +45,10 @@ class RolesService:
     
     # Nuevo método para verificar control de acceso
     def access_control(self, email, rol, action):
-        # repo.access_control may return different shapes:
-        # - (dict, status) when user not found
-        # - a dict on some error paths
-        # - a class (created via type('Obj', ...)) which needs instantiation
-        # - an already-instantiated object
-        res = self.repo.access_control(email, rol, action)
+        return self.repo.access_control(email, rol, action)
 
-        # If repo returned a tuple like (dict, status) or a plain dict,
-        # normalize to an object with permission=False so controller can
-        # safely read attributes.
-        if isinstance(res, tuple) and len(res) >= 1 and isinstance(res[0], dict):
-            return type('Obj', (object,), {'email': email, 'rol': rol, 'action': action, 'permission': False})()
-        if isinstance(res, dict):
-            return type('Obj', (object,), {'email': email, 'rol': rol, 'action': action, 'permission': False})()
-
-        # If repo returned a class, instantiate it. If instantiation fails,
-        # fall back to a safe object.
-        if isinstance(res, type):
-            try:
-                return res()
-            except Exception:
-                return type('Obj', (object,), {'email': email, 'rol': rol, 'action': action, 'permission': False})()
-
-        # Otherwise assume it's already an object with the expected attrs.
-        return res
+    def access_control_many(self, checks:list[tuple]):
+        return [
+            {k: v for k, v in r._asdict().items() if k != "error" or v}
+            for r in self.repo.access_control_many(checks)
+        ]
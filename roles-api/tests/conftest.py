@@ -1,5 +1,7 @@
 import os, pytest, jwt, importlib.util, sys
+from contextlib import contextmanager
 from pathlib import Path
+from sqlalchemy import event
 
 SECRET = os.getenv("JWT_SECRET", "supersecret")
 
@@ -36,6 +38,23 @@ def app():
 def client(app):
     return app.test_client()
 
+@pytest.fixture()
+def recorded_queries(app):
+    """`with recorded_queries() as statements:` collects the SQL sent to the DB."""
+    from app.db import engine
+
+    @contextmanager
+    def record():
+        statements = []
+        def on_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+    return record
+
 def make_token(role="security_admin", sub="admin"):
     return jwt.encode({"sub": sub, "role": role}, SECRET, algorithm="HS256")
 
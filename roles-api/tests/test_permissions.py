@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+
+def auth(t):
+    return {"Authorization": f"Bearer {t}"}
+
+
+@pytest.fixture()
+def assigned(app):
+    # unique names: the test DB file persists between runs
+    from app.services.roles_service import RolesService
+    svc = RolesService()
+    tag = int(time.time() * 1000)
+    role = svc.create_role(f"PermRole{tag}", "desc")
+    user = svc.create_user("Perm User", f"perm{tag}@example.com", "pw")
+    svc.set_user_roles(user.id, [{"role_id": role.id, "can_create": False, "can_edit": True,
+                                  "can_delete": False, "can_view": True}])
+    return svc, user, role
+
+
+def test_checks_are_served_from_the_matrix(assigned, recorded_queries):
+    svc, user, role = assigned
+    svc.access_control(user.email, role.name, "view")  # builds the matrix
+
+    with recorded_queries() as statements:
+        assert svc.access_control(user.email, role.name, "edit").permission is True
+        assert svc.access_control(user.email, role.name, "create").permission is False
+        assert svc.access_control("nobody@example.com", role.name, "view").permission is False
+        assert svc.access_control(user.email, "Admin", "view").permission is False
+        with pytest.raises(ValueError, match="role_not_found"):
+            svc.access_control(user.email, "NoSuchRole", "view")
+        with pytest.raises(ValueError, match="invalid_action"):
+            svc.access_control(user.email, role.name, "fly")
+    assert statements == []
+
+    # a rebuild is a fixed three queries, however many users and roles exist
+    from app.repositories.permissions import matrix
+    matrix.invalidate()
+    with recorded_queries() as statements:
+        svc.access_control(user.email, role.name, "edit")
+        svc.access_control(user.email, role.name, "view")
+    assert len(statements) == 3
+
+
+def test_write_during_rebuild_is_not_cached_as_fresh(assigned):
+    from app.repositories.permissions import PermissionMatrix
+    svc, user, role = assigned
+    m = PermissionMatrix(ttl=3600)
+
+    class WriteWhileReading:
+        # a permission write lands after the rebuild has read the old rows
+        def __init__(self, session):
+            self.session = session
+            self.calls = 0
+
+        def execute(self, stmt):
+            result = self.session.execute(stmt)
+            self.calls += 1
+            if self.calls == 1:
+                m.invalidate()
+            return result
+
+    m.load(WriteWhileReading(svc.repo.session))
+    assert m.check(user.email, role.name, "edit").permission is True
+    assert not m._fresh()
+
+    m.load(svc.repo.session)
+    assert m._fresh()
+
+
+def test_set_user_roles_and_create_user_invalidate(assigned):
+    svc, user, role = assigned
+    assert svc.access_control(user.email, role.name, "delete").permission is False
+    svc.set_user_roles(user.id, [{"role_id": role.id, "can_delete": True}])
+    assert svc.access_control(user.email, role.name, "delete").permission is True
+
+    email = f"late{int(time.time() * 1000)}@example.com"
+    assert svc.access_control(email, "Admin", "view").permission is False
+    svc.create_user("Late", email, "pw", role_name="Admin")
+    assert svc.access_control(email, "Admin", "view").permission is True
+
+
+def test_batch_endpoint(client, admin_token, assigned):
+    _, user, role = assigned
+    checks = [
+        {"email": user.email, "rol": role.name, "action": "edit"},
+        {"email": user.email, "rol": role.name, "action": "delete"},
+        {"email": "nobody@example.com", "rol": role.name, "action": "view"},
+        {"email": user.email, "rol": "NoSuchRole", "action": "view"},
+        {"email": user.email, "rol": role.name, "action": "fly"},
+    ]
+    r = client.post("/api/access-control/batch", headers=auth(admin_token), json={"checks": checks})
+    assert r.status_code == 200
+    results = r.get_json()["results"]
+    assert [x["permission"] for x in results] == [True, False, False, False, False]
+    assert [x.get("error") for x in results] == [None, None, None, "role_not_found", "invalid_action"]
+    assert results[0] == {"email": user.email, "rol": role.name, "action": "edit", "permission": True}
+
+
+def test_batch_endpoint_validation(client, admin_token):
+    assert client.post("/api/access-control/batch", json={"checks": []}).status_code == 401
+    r = client.post("/api/access-control/batch", headers=auth(admin_token), json={"checks": "x"})
+    assert r.status_code == 400
+    r = client.post("/api/access-control/batch", headers=auth(admin_token), json={"checks": [{"email": "a"}]})
+    assert r.status_code == 400
+    for bad in ({"email": ["a"], "rol": "r", "action": "view"},
+                {"email": "a", "rol": {"x": 1}, "action": "view"},
+                {"email": "a", "rol": "r", "action": 1}):
+        r = client.post("/api/access-control/batch", headers=auth(admin_token), json={"checks": [bad]})
+        assert r.status_code == 400 and r.get_json()["detail"] == "email, rol y action deben ser texto"